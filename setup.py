@@ -9,8 +9,15 @@ setup(
         "torch>=2.3.0",
         "transformers>=4.40.0",
         "openai==1.69.0",
+        "httpx>=0.27.0",
         "pydantic>=2.0.0",
         "scikit-learn>=1.4.0",
         "numpy>=1.26.0"
     ],
+    extras_require={
+        # Enables the /metrics endpoint (see src/utils/metrics.py)
+        "metrics": ["prometheus-client>=0.17.0"],
+        # EMBEDDING_BACKEND=onnx (see src/utils/vector_db.py); export additionally needs torch/transformers/onnx
+        "onnx": ["onnxruntime>=1.17.0", "tokenizers>=0.15.0", "onnx>=1.15.0"],
+    },
 ) 
\ No newline at end of file
@@ -1,34 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, Tuple
 import logging
 import base64
-import time
-from openai import OpenAI
+import hashlib
+import asyncio
 import os
+import time
+
+from openai import BadRequestError
 
 from config.settings import (
     MODEL_ID,
-    INFERENCE_SERVER_URL,
     MAX_RETRIES,
     RETRY_DELAY,
     REQUEST_TIMEOUT,
-    MAX_TOKENS,
-    TEMPERATURE
+    RESPONSE_CACHE_ENABLED,
+    SEMANTIC_CACHE_ENABLED,
+    COALESCE_ENABLED
 )
-from utils.vector_db import VectorDBManager
+from services.inference_client import get_inference_client
+from services.health_monitor import get_health_monitor
+from services.admission import get_admission_controller, AdmissionRejected
+from services.response_cache import get_response_cache, replay_stream
+from services.semantic_cache import get_semantic_cache
+from services.coalescer import get_coalescer
+from services.retrieval import get_retrieval_service
+from services.prompt_assembly import assemble_messages, format_context
+from services.context_budget import fit_context, ContextBudgetExceeded
+from services.generation_profiles import GenerationProfile, select_profile
+from models.classification import AgentType
+from utils.vector_db import get_vector_db
+from utils.metrics import time_stage, record_generation, record_retry
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client with vLLM API endpoint
-client = OpenAI(
-    api_key="EMPTY",  # vLLM doesn't require an actual API key
-    base_url=INFERENCE_SERVER_URL,
-    timeout=REQUEST_TIMEOUT
-)
-
-# Initialize vector database manager
-vector_db = VectorDBManager()
-
 # Helper function to encode image to base64
 def encode_image_to_base64(image_data):
     """Encode image bytes to base64 string"""
@@ -36,6 +42,9 @@ def encode_image_to_base64(image_data):
 
 class BaseAgent(ABC):
     """Base class for all specialized agents"""
+
+    # Agent type used for admission bulkheads and metrics; subclasses override
+    agent_type: AgentType = AgentType.GENERAL
     
     def __init__(self, name: str = "", description: str = ""):
         self.name = name
@@ -67,18 +76,20 @@ class BaseAgent(ABC):
     def get_system_prompt(self) -> str:
         """Return the specialized system prompt for this agent"""
         pass
+
+    def prompt_version(self) -> str:
+        """Short hash of the system prompt; cached answers are only reused for the same prompt"""
+        return hashlib.sha256(self.get_system_prompt().encode("utf-8")).hexdigest()[:12]
     
-    def get_relevant_context(self, query: str) -> str:
-        """Get relevant context from vector database"""
+    async def retrieve_context(self, query: str) -> List[Tuple[str, float]]:
+        """Get (text, relevance score) chunks for the query, best first, via the batched retrieval service"""
         try:
-            relevant_docs = vector_db.get_relevant_documents(query)
-            if relevant_docs:
-                return "\n\nRelevant context:\n" + "\n".join(relevant_docs)
-            return ""
+            with time_stage("similarity_search", self.agent_type):
+                return await get_retrieval_service().search(query)
         except Exception as e:
             logger.error(f"Error getting relevant context: {str(e)}")
-            return ""
-    
+            return []
+
     def needs_additional_input(self) -> bool:
         """Check if the agent needs more information from the user"""
         if not self.required_inputs:
@@ -115,9 +126,30 @@ class BaseAgent(ABC):
             
         return result
     
-    async def get_response(self, messages: List[Dict[str, str]], attachments=None) -> str:
-        """Get a response from the LLM using this agent's specialized prompt"""
+    async def get_response(
+        self, messages: List[Dict[str, str]], attachments=None, context: Optional[str] = None, history=None
+    ) -> str:
+        """Get the complete response from the LLM by draining stream_response"""
+        chunks = []
+        async for token in self.stream_response(messages, attachments, context, history):
+            chunks.append(token)
+        return "".join(chunks)
+
+    async def stream_response(
+        self, messages: List[Dict[str, str]], attachments=None, context: Optional[str] = None, history=None
+    ) -> AsyncIterator[str]:
+        """Stream response deltas from the LLM using this agent's specialized prompt.
+
+        ``context`` may carry (text, score) chunks prefetched by the message
+        pipeline; when None, retrieval runs here through the batched retrieval service. ``history`` is the
+        session's HistoryManager; its summary and budgeted recent turns are sent
+        between the system prompt and the question.
+        """
         try:
+            # Ensure messages is a list of dictionaries with role and content
+            if not isinstance(messages, list):
+                messages = [{"role": "user", "content": str(messages)}]
+
             # Process attachments if any (for multimodal input)
             if attachments and len(attachments) > 0:
                 try:
@@ -153,71 +185,108 @@ class BaseAgent(ABC):
                     if not messages[-1]["content"]:
                         messages[-1]["content"] = f"[Image attachment error: {str(img_err)}]"
             
-            # Ensure messages is a list of dictionaries with role and content
-            if not isinstance(messages, list):
-                messages = [{"role": "user", "content": str(messages)}]
-            
-            # Add system prompt if not present
-            if not any(msg["role"] == "system" for msg in messages):
-                messages.insert(0, {"role": "system", "content": self.get_system_prompt()})
+            # A caller-supplied system prompt (e.g. a rebuilt slot prompt) wins over the agent's
+            system_prompt = next(
+                (msg["content"] for msg in messages if msg["role"] == "system"), self.get_system_prompt()
+            )
+
+            # The budgeted conversation history, then any turns the caller placed before the question
+            history_messages, summary = [], ""
+            if history is not None:
+                summary = history.get_summary()
+                history_messages = history.get_messages()
+            history_messages += [msg for msg in messages[:-1] if msg["role"] != "system"]
             
+            user_text = messages[-1]["content"]
+
+            # Paraphrases of earlier first-turn questions to a factual agent reuse the cached
+            # answer, skipping generation (the pipeline has already retrieved context by now)
+            question_embedding = None
+            # Never wait for the index here; caches are skipped until startup finishes loading it
+            vector_db = get_vector_db(block=False)
+            semantic_cache = get_semantic_cache()
+            if (
+                SEMANTIC_CACHE_ENABLED and semantic_cache.applies_to(self.agent_type) and vector_db is not None
+                and not attachments and isinstance(user_text, str) and not history_messages and not summary
+            ):
+                semantic_cache.sync_index_version(vector_db.index_version)
+                try:
+                    with span("embed_question"):
+                        question_embedding = await asyncio.to_thread(vector_db.embed_query, user_text)
+                except Exception as embed_err:
+                    logger.warning(f"Semantic cache lookup skipped: {str(embed_err)}")
+                if question_embedding is not None:
+                    cached = semantic_cache.lookup(self.agent_type, self.prompt_version(), user_text, question_embedding)
+                    if cached is not None:
+                        logger.info(f"Semantic cache hit for {self.name} agent")
+                        async for chunk in replay_stream(cached):
+                            yield chunk
+                        return
+
             # Get relevant context from vector database for the last user message
-            if messages[-1]["role"] == "user":
-                context = self.get_relevant_context(messages[-1]["content"])
-                if context:
-                    messages[-1]["content"] += context
-            
-            # First, test if the server is reachable with a quick timeout
+            if messages[-1]["role"] == "user" and isinstance(user_text, str):
+                if context is None:
+                    with span("retrieve", agent_type=self.agent_type.value):
+                        context = await self.retrieve_context(user_text)
+            else:
+                context = None
+
+            # Serve repeated questions from the exact-match response cache (text-only requests)
+            request_key = None
+            if vector_db is not None and not attachments and isinstance(user_text, str):
+                response_cache = get_response_cache()
+                response_cache.sync_index_version(vector_db.index_version)
+                request_key = response_cache.make_key(
+                    self.agent_type, system_prompt, user_text, format_context(context), history_messages, summary
+                )
+                if RESPONSE_CACHE_ENABLED:
+                    cached = await response_cache.get(request_key)
+                    if cached is not None:
+                        logger.info(f"Response cache hit for {self.name} agent")
+                        async for chunk in replay_stream(cached):
+                            yield chunk
+                        return
+
+            # Decode budget, temperature and stop sequences for this agent and question
+            profile = select_profile(self.agent_type, user_text if isinstance(user_text, str) else "")
+
+            # Nothing leaves over the context window: drop weakest chunks, then oldest history
             try:
-                test_client = OpenAI(
-                    api_key="EMPTY",
-                    base_url=INFERENCE_SERVER_URL,
-                    timeout=3.0  # Very short timeout just for connectivity check
+                budget = fit_context(
+                    system_prompt, user_text, history_messages, summary, list(context or []), profile.max_tokens
                 )
-                test_client.models.list()
-                logger.info("LLM server is reachable")
-            except Exception as conn_err:
-                logger.error(f"Cannot reach LLM server: {str(conn_err)}")
-                return "I'm having trouble connecting to the AI service. The LLM server appears to be unreachable. Please check that it's running at the configured URL."
-                
-            # If server is reachable, proceed with retries
-            last_error = None
-            for attempt in range(MAX_RETRIES):
-                try:
-                    # Make the inference request using the OpenAI client
-                    response = client.chat.completions.create(
-                        model=MODEL_ID,
-                        messages=messages,
-                        max_tokens=MAX_TOKENS,
-                        temperature=TEMPERATURE
-                    )
-                    
-                    # Extract and log the response content
-                    reply = response.choices[0].message.content
-                    logger.info(f"Inference response from {self.name} agent")
-                    return reply
-                    
-                except Exception as e:
-                    last_error = e
-                    logger.error(f"Attempt {attempt + 1}/{MAX_RETRIES} failed: {str(e)}")
-                    if attempt < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
-                        continue
-                    else:
-                        # If we've exhausted retries, return a user-friendly error
-                        error_message = (
-                            "I apologize, but I'm having trouble generating a response. "
-                            "This could be due to:\n"
-                            "1. The request is taking too long\n"
-                            "2. The server is overloaded\n"
-                            "3. The query is too complex\n\n"
-                            "Please try:\n"
-                            "1. Simplifying your question\n"
-                            "2. Breaking it into smaller parts\n"
-                            "3. Trying again in a few moments\n\n"
-                            f"Error details: {str(last_error)}"
-                        )
-                        return error_message
+            except ContextBudgetExceeded as too_long:
+                # Not a backend failure: the question itself leaves no room for an answer
+                logger.warning(f"Request from {self.name} agent doesn't fit the context window: {str(too_long)}")
+                yield (
+                    "Your question (or its attachment) is too long for me to answer in one go. "
+                    "Please shorten it, or split it into smaller questions, and try again."
+                )
+                return
+            if budget.max_tokens != profile.max_tokens:
+                profile = profile.model_copy(update={"max_tokens": budget.max_tokens})
+
+            # Most to least stable (base, agent suffix, history, context, question) for vLLM prefix caching
+            messages = assemble_messages(
+                system_prompt, user_text, budget.history, budget.summary, format_context(budget.chunks)
+            )
+
+            async def on_complete(text: str) -> None:
+                """Populate the caches once, from whichever caller actually ran the generation"""
+                if RESPONSE_CACHE_ENABLED and request_key is not None:
+                    await response_cache.set(request_key, text)
+                if question_embedding is not None:
+                    semantic_cache.store(self.agent_type, self.prompt_version(), user_text, question_embedding, text)
+
+            # Identical in-flight requests share one vLLM generation and its token stream
+            if COALESCE_ENABLED and request_key is not None:
+                tokens = get_coalescer().stream(
+                    request_key, lambda: self._stream_completion(messages, on_complete, profile)
+                )
+            else:
+                tokens = self._stream_completion(messages, on_complete, profile)
+            async for token in tokens:
+                yield token
                         
         except Exception as e:
             error_message = (
@@ -229,7 +298,135 @@ class BaseAgent(ABC):
                 f"Error details: {str(e)}\n\n"
                 "Please try again in a few moments or contact support if the issue persists."
             )
-            return error_message
+            yield error_message
+
+    async def _stream_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        on_complete: Optional[Callable[[str], Awaitable[None]]] = None,
+        profile: Optional[GenerationProfile] = None,
+    ) -> AsyncIterator[str]:
+        """Run the streaming vLLM request with admission, circuit breaking and retries"""
+        profile = profile or select_profile(self.agent_type)
+        inference = get_inference_client()
+        health = get_health_monitor()
+        admission = get_admission_controller()
+
+        last_error = None
+        for attempt in range(MAX_RETRIES):
+            # Fail fast from the cached circuit-breaker state instead of probing the server
+            if not health.allow_request():
+                logger.error("Circuit breaker open; skipping inference request")
+                yield "I'm having trouble connecting to the AI service. The LLM server appears to be unreachable. Please check that it's running at the configured URL."
+                return
+            # A half-open trial must be released however this attempt ends
+            trial = health.is_trial()
+
+            emitted = False
+            generated = []
+            started = time.perf_counter()
+            first_token_at = None
+            try:
+                # Not made current: this generator may be resumed from another task (see coalescer)
+                with span(
+                    "inference", activate=False, agent_type=self.agent_type.value, attempt=attempt + 1,
+                    max_tokens=profile.max_tokens, intent=profile.intent or "",
+                ) as attempt_span:
+                    # Hold an admission slot for the whole stream so vLLM load stays bounded
+                    async with admission.admit(self.agent_type):
+                        attempt_span.set_attribute("admission_wait_ms", round((time.perf_counter() - started) * 1000, 2))
+                        # Make a streaming inference request so deltas reach the UI as vLLM decodes them
+                        stream = await inference.chat_completion(
+                            model=MODEL_ID,
+                            messages=messages,
+                            timeout=REQUEST_TIMEOUT,
+                            stream=True,
+                            **profile.request_kwargs(),
+                        )
+                        async for chunk in stream:
+                            if not chunk.choices:
+                                continue
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                emitted = True
+                                generated.append(delta)
+                                yield delta
+                    attempt_span.set_attribute("tokens", len(generated))
+                    if first_token_at is not None:
+                        attempt_span.set_attribute("ttft_ms", round((first_token_at - started) * 1000, 2))
+                
+                health.record_success()
+                if first_token_at is not None:
+                    # TTFT includes time queued for admission; each streamed delta counts as a token
+                    record_generation(
+                        self.agent_type, first_token_at - started, time.perf_counter() - started, len(generated)
+                    )
+                logger.info(f"Inference response streamed from {self.name} agent")
+                if on_complete is not None and generated:
+                    await on_complete("".join(generated))
+                return
+
+            except AdmissionRejected as rejected:
+                # Not a backend failure: don't trip the breaker or retry into a full queue
+                yield (
+                    "The assistant is handling a lot of requests right now. "
+                    f"Please try again in about {int(rejected.retry_after + 0.5)} seconds."
+                )
+                return
+                
+            except Exception as e:
+                last_error = e
+                logger.error(f"Attempt {attempt + 1}/{MAX_RETRIES} failed: {str(e)}")
+                if isinstance(e, BadRequestError):
+                    # The server rejected the request itself; resending the same request can't succeed
+                    yield f"I couldn't process this request: {str(e)}"
+                    return
+                health.record_failure()
+                if emitted:
+                    # Tokens already reached the user; a retry would duplicate them
+                    yield f"\n\n[Response interrupted: {str(last_error)}]"
+                    return
+                if attempt < MAX_RETRIES - 1:
+                    record_retry(self.agent_type)
+                    with span("retry_backoff", delay=RETRY_DELAY):
+                        await asyncio.sleep(RETRY_DELAY)
+                    continue
+                else:
+                    # If we've exhausted retries, return a user-friendly error
+                    error_message = (
+                        "I apologize, but I'm having trouble generating a response. "
+                        "This could be due to:\n"
+                        "1. The request is taking too long\n"
+                        "2. The server is overloaded\n"
+                        "3. The query is too complex\n\n"
+                        "Please try:\n"
+                        "1. Simplifying your question\n"
+                        "2. Breaking it into smaller parts\n"
+                        "3. Trying again in a few moments\n\n"
+                        f"Error details: {str(last_error)}"
+                    )
+                    yield error_message
+                    return
+
+            finally:
+                if trial:
+                    health.release_trial()
+
+    def get_state(self) -> Dict[str, Any]:
+        """Serializable slot-filling state, saved to the session state backend"""
+        return {
+            "collected_inputs": dict(self.collected_inputs),
+            "waiting_for_input": self.waiting_for_input,
+            "current_input_key": self.current_input_key,
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Restore slot-filling state produced by get_state"""
+        self.collected_inputs = dict(state.get("collected_inputs", {}))
+        self.waiting_for_input = state.get("waiting_for_input", False)
+        self.current_input_key = state.get("current_input_key")
 
     def reset(self):
         """Reset the agent state for a new conversation"""
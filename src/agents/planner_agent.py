@@ -3,13 +3,16 @@ import logging
 from .base_agent import BaseAgent
 from models.query_models import QueryResponse
 from models.classification import PromptClassifier, AgentType
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
 class PlannerAgent(BaseAgent):
     """Super agent that decomposes a high-level user goal into sub-tasks and dispatches to specialized agents."""
 
-    def __init__(self):
+    agent_type = AgentType.PLANNER
+
+    def __init__(self, classifier: Optional[PromptClassifier] = None, sub_agents: Optional[Dict[str, BaseAgent]] = None):
         super().__init__(name="Planner", description="High-level planner agent")
         self.system_prompt = (
             "You are an advanced AI planning assistant. Given a user's overall goal, you break it into logical steps, "
@@ -20,41 +23,50 @@ class PlannerAgent(BaseAgent):
         self.required_inputs = [
             {"key": "goal", "question": "What is your overall goal?"}
         ]
-        # Internal classifier to route tasks
-        self.classifier = PromptClassifier()
+        # Classifier to route tasks; defaults to the shared registry classifier on first use
+        self.classifier = classifier
+        # Sibling agents of the same session that sub-tasks are dispatched to
+        self.sub_agents = sub_agents
 
     def get_system_prompt(self) -> str:
         return self.system_prompt
 
-    async def get_response(self, messages, attachments=None):
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
         """Once we have the goal, plan and call sub-agents."""
         if not self.collected_inputs.get("goal"):
-            return "Please provide your goal first."
+            yield "Please provide your goal first."
+            return
 
         goal = self.collected_inputs["goal"]
         # Use classifier to decide which agent is best
-        from agents.registry import agents  # late import to avoid circular dep
-        classification = self.classifier.classify_message(goal)
-        chosen_agent_type: AgentType = classification.agent_type
-        if chosen_agent_type == AgentType.PLANNER:
-            # Fallback to general if planner loops
-            chosen_agent_type = AgentType.GENERAL
-        sub_agent = agents[chosen_agent_type]
-        sub_agent.reset()
-        # Feed the goal to sub-agent
-        result = sub_agent.process_input(goal)
+        if self.sub_agents is None or self.classifier is None:
+            from agents.registry import create_session_agents, get_classifier  # late import to avoid circular dep
+            self.sub_agents = self.sub_agents if self.sub_agents is not None else create_session_agents()
+            self.classifier = self.classifier or get_classifier()
+        with span("planner_dispatch") as dispatch_span:
+            classification = self.classifier.classify_message(goal)
+            chosen_agent_type: AgentType = classification.agent_type
+            if chosen_agent_type == AgentType.PLANNER:
+                # Fallback to general if planner loops
+                chosen_agent_type = AgentType.GENERAL
+            dispatch_span.set_attribute("sub_agent", chosen_agent_type.value)
+            sub_agent = self.sub_agents[chosen_agent_type]
+            sub_agent.reset()
+            # Feed the goal to sub-agent
+            result = sub_agent.process_input(goal)
         if result["type"] == "input_request":
             # propagate question to user
             question = result["next_question"]
             # store sub-agent reference in collected_inputs for follow-up (simple)
             self.current_sub_agent = sub_agent
-            return question
+            yield question
         else:
-            response = await sub_agent.get_response(goal)
-            summary = (
+            # Emit the summary header first, then forward the sub-agent's tokens as they arrive
+            yield (
                 f"### Plan Execution Summary\n"
                 f"Goal: {goal}\n\n"
                 f"Delegated to **{chosen_agent_type.value}** agent.\n\n"
-                f"---\n{response}"
+                f"---\n"
             )
-            return summary 
\ No newline at end of file
+            async for token in sub_agent.stream_response(goal, history=history):
+                yield token
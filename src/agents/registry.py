@@ -1,4 +1,7 @@
-# flake8: noqa
+import logging
+import threading
+from typing import Dict, Optional, Type
+from .base_agent import BaseAgent
 from .specialized_agents import (
     EmailComposeAgent,
     ResearchPaperAgent,
@@ -10,20 +13,59 @@ from .vision_agent import VisionAgent
 from .planner_agent import PlannerAgent
 from models.classification import PromptClassifier, AgentType
 
-# Initialize the classifier
-classifier = PromptClassifier()
-
-# Initialize all agents
-agents = {
-    AgentType.EMAIL: EmailComposeAgent(),
-    AgentType.RESEARCH: ResearchPaperAgent(),
-    AgentType.ACADEMIC: AcademicConceptsAgent(),
-    AgentType.REDIRECT: RedirectAgent(),
-    AgentType.PLANNER: PlannerAgent(),
-    AgentType.GENERAL: GeneralAgent(),
-    AgentType.VISION: VisionAgent()
+logger = logging.getLogger(__name__)
+
+# The classifier is shared by every session (agents only hold per-session slot state)
+# and built on first use so importing the registry stays cheap
+_classifier: Optional[PromptClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> PromptClassifier:
+    """Return the shared PromptClassifier, building it on first use"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = PromptClassifier()
+    return _classifier
+
+# Agent classes by type
+AGENT_CLASSES: Dict[AgentType, Type[BaseAgent]] = {
+    AgentType.EMAIL: EmailComposeAgent,
+    AgentType.RESEARCH: ResearchPaperAgent,
+    AgentType.ACADEMIC: AcademicConceptsAgent,
+    AgentType.REDIRECT: RedirectAgent,
+    AgentType.PLANNER: PlannerAgent,
+    AgentType.GENERAL: GeneralAgent,
+    AgentType.VISION: VisionAgent
 }
 
+
+class SessionAgents(dict):
+    """
+    Per-session agent instances, created on first use.
+
+    Agents carry the mutable slot-filling state (collected_inputs, waiting_for_input,
+    current_input_key), so each chat session gets its own. System prompts, the
+    classifier and the inference client are module-level and shared.
+    """
+
+    def __missing__(self, agent_type: AgentType) -> BaseAgent:
+        agent_type = AgentType(agent_type)
+        if agent_type == AgentType.PLANNER:
+            agent = PlannerAgent(classifier=get_classifier(), sub_agents=self)
+        else:
+            agent = AGENT_CLASSES[agent_type]()
+        self[agent_type] = agent
+        return agent
+
+
+def create_session_agents() -> SessionAgents:
+    """Create the agent set for a new chat session"""
+    return SessionAgents()
+
+
 def determine_agent_type(message: str, has_attachment: bool=False) -> str:
     """
     Determine which agent should handle the message using the classification system.
@@ -37,13 +79,22 @@ def determine_agent_type(message: str, has_attachment: bool=False) -> str:
     """
     if has_attachment:
         return AgentType.VISION
-    result = classifier.classify_message(message)
+
+    # Cheap keyword shortcuts before running the classifier
+    lower_msg = message.lower()
+    code_kw = ["code", "script", "function", "algorithm", "snippet"]
+    email_kw = ["email", "compose", "draft", "extension"]
+    if any(w in lower_msg for w in code_kw):
+        return AgentType.GENERAL
+    if any(w in lower_msg for w in email_kw):
+        return AgentType.EMAIL
+
+    result = get_classifier().classify_message(message)
     
-    # Log classification details
-    print(f"Classified as: {result.agent_type}")
-    print(f"Confidence score: {result.confidence_score}")
-    print(f"Matched keywords: {result.matched_keywords}")
-    print(f"Alternative agents: {result.alternative_agents}")
+    logger.debug(
+        f"Classified as {result.agent_type} (confidence {result.confidence_score}, "
+        f"keywords {result.matched_keywords}, alternatives {result.alternative_agents})"
+    )
     
     # Return the agent type
     return result.agent_type 
\ No newline at end of file
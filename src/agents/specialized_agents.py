@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional
 from .base_agent import BaseAgent
+from models.classification import AgentType
 from models.query_models import EmailQuery, QueryResponse, ResearchQuery, AcademicQuery, RedirectQuery
 from config.prompts import (
     EMAIL_AGENT_PROMPT,
@@ -11,6 +12,8 @@ from config.prompts import (
 
 class EmailComposeAgent(BaseAgent):
     """Agent specialized in composing professional academic emails."""
+
+    agent_type = AgentType.EMAIL
     
     def __init__(self):
         super().__init__()
@@ -98,8 +101,8 @@ class EmailComposeAgent(BaseAgent):
 """
         return formatted
 
-    # Override get_response to use collected_inputs when available
-    async def get_response(self, messages, attachments=None):
+    # Override stream_response to use collected_inputs when available
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
         if not isinstance(messages, list) and self.collected_inputs:
             # Build context string from collected inputs
             context_lines = "\n".join([f"{k.replace('_',' ').title()}: {v}" for k, v in self.collected_inputs.items()])
@@ -108,11 +111,16 @@ class EmailComposeAgent(BaseAgent):
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": user_prompt}
             ]
-        return await super().get_response(messages, attachments)
+            # Context prefetched for the raw question doesn't match the rebuilt prompt
+            context = None
+        async for token in super().stream_response(messages, attachments, context, history):
+            yield token
 
 
 class ResearchPaperAgent(BaseAgent):
     """Agent specialized in helping with research paper composition and analysis."""
+
+    agent_type = AgentType.RESEARCH
     
     def __init__(self):
         super().__init__()
@@ -199,7 +207,7 @@ class ResearchPaperAgent(BaseAgent):
 """
         return formatted
 
-    async def get_response(self, messages, attachments=None):
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
         if not isinstance(messages, list) and self.collected_inputs:
             context_lines = "\n".join([f"{k.replace('_',' ').title()}: {v}" for k, v in self.collected_inputs.items()])
             user_prompt = f"Please provide guidance for writing a research paper with the following context:\n{context_lines}"
@@ -207,11 +215,16 @@ class ResearchPaperAgent(BaseAgent):
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": user_prompt}
             ]
-        return await super().get_response(messages, attachments)
+            # Context prefetched for the raw question doesn't match the rebuilt prompt
+            context = None
+        async for token in super().stream_response(messages, attachments, context, history):
+            yield token
 
 
 class AcademicConceptsAgent(BaseAgent):
     """Agent specialized in explaining academic concepts and theories."""
+
+    agent_type = AgentType.ACADEMIC
     
     def __init__(self):
         super().__init__()
@@ -297,7 +310,7 @@ class AcademicConceptsAgent(BaseAgent):
 """
         return formatted
 
-    async def get_response(self, messages, attachments=None):
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
         if not isinstance(messages, list) and self.collected_inputs:
             context_lines = "\n".join([f"{k.replace('_',' ').title()}: {v}" for k, v in self.collected_inputs.items()])
             user_prompt = f"Please explain the following academic concept with the given context:\n{context_lines}"
@@ -305,11 +318,16 @@ class AcademicConceptsAgent(BaseAgent):
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": user_prompt}
             ]
-        return await super().get_response(messages, attachments)
+            # Context prefetched for the raw question doesn't match the rebuilt prompt
+            context = None
+        async for token in super().stream_response(messages, attachments, context, history):
+            yield token
 
 
 class RedirectAgent(BaseAgent):
     """Agent specialized in redirecting users to appropriate UNT resources."""
+
+    agent_type = AgentType.REDIRECT
     
     def __init__(self):
         super().__init__()
@@ -394,7 +412,7 @@ class RedirectAgent(BaseAgent):
 """
         return formatted
 
-    async def get_response(self, messages, attachments=None):
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
         if not isinstance(messages, list) and self.collected_inputs:
             context_lines = "\n".join([f"{k.replace('_',' ').title()}: {v}" for k, v in self.collected_inputs.items()])
             user_prompt = f"Please provide information about UNT resources with the following context:\n{context_lines}"
@@ -402,11 +420,16 @@ class RedirectAgent(BaseAgent):
                 {"role": "system", "content": self.system_prompt},
                 {"role": "user", "content": user_prompt}
             ]
-        return await super().get_response(messages, attachments)
+            # Context prefetched for the raw question doesn't match the rebuilt prompt
+            context = None
+        async for token in super().stream_response(messages, attachments, context, history):
+            yield token
 
 
 class GeneralAgent(BaseAgent):
     """General purpose UNT assistant for queries that don't fit specialized categories"""
+
+    agent_type = AgentType.GENERAL
     
     def __init__(self):
         super().__init__(
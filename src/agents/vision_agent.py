@@ -1,6 +1,7 @@
 import logging
 from .base_agent import BaseAgent
 from config.prompts import BASE_PROMPT_TEMPLATE
+from models.classification import AgentType
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,8 @@ VISION_SYSTEM_PROMPT = (
 )
 
 class VisionAgent(BaseAgent):
+    agent_type = AgentType.VISION
+
     def __init__(self):
         super().__init__(name="Vision Agent", description="Describes user images")
         self.system_prompt = VISION_SYSTEM_PROMPT
@@ -24,10 +27,11 @@ class VisionAgent(BaseAgent):
     def get_system_prompt(self):
         return self.system_prompt
 
-    async def get_response(self, messages, attachments=None):
-        """Get response with enhanced image handling capabilities"""
+    async def stream_response(self, messages, attachments=None, context=None, history=None):
+        """Stream response with enhanced image handling capabilities"""
         if not attachments:
-            return "Please attach an image for me to analyze. I can extract text, describe content, analyze data, process documents, or examine technical details."
+            yield "Please attach an image for me to analyze. I can extract text, describe content, analyze data, process documents, or examine technical details."
+            return
         
         # Add specific instructions based on original query (if message is a string)
         if isinstance(messages, str) and messages:
@@ -47,7 +51,8 @@ class VisionAgent(BaseAgent):
         
         # Proceed with standard processing
         try:
-            return await super().get_response(messages, attachments)
+            async for token in super().stream_response(messages, attachments, context, history):
+                yield token
         except Exception as e:
             logger.error(f"Error in vision processing: {str(e)}")
-            return f"I encountered an error while processing your image: {str(e)}. Please try again with a clearer image or a different format." 
\ No newline at end of file
+            yield f"I encountered an error while processing your image: {str(e)}. Please try again with a clearer image or a different format." 
\ No newline at end of file
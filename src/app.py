@@ -1,23 +1,38 @@
 import os
 import logging
+import time
+from functools import lru_cache
 import chainlit as cl
-from openai import OpenAI
-from vllm.deploy import VLLMEngine, EngineArgs
 from config.settings import (
     CHAINLIT_HOST,
     CHAINLIT_PORT,
     INFERENCE_SERVER_URL,
-    REQUEST_TIMEOUT,
     MODEL_ID,
-    REWRITE_MODEL_ID,
     ENABLE_Q_REWRITE,
     CUDA_DEVICE,                  # GPU device index (e.g., "0")
     VLLM_MAX_TOKENS,              # Maximum tokens per request
     VLLM_NUM_GPUS,                # Number of GPUs for tensor parallelism
     VLLM_NUM_THREADS_PER_GPU,     # Threads per GPU for prefill/scheduling
 )
-from agents.registry import agents, determine_agent_type
+from agents.registry import determine_agent_type, get_classifier
+from services.health_monitor import get_health_monitor
+from services.startup import get_startup, healthz
+from services.admission import get_admission_controller
+from services.query_rewriter import get_query_rewriter
+from services.response_cache import get_response_cache
+from services.semantic_cache import get_semantic_cache
+from services.coalescer import get_coalescer
+from services.retrieval import get_retrieval_service
+from services.inference_client import bind_routing_key, get_inference_client
+from services.pipeline import MessagePipeline
+from services.session_state import get_state_backend, serialize_session, restore_session, SessionStateUnavailable
+from utils.tokenizer import load_tokenizer
+from utils.vector_db import get_vector_db
+from utils.server_routes import add_route
+from utils.metrics import metrics_endpoint, record_stage, register_stats_source
+from utils.tracing import install_request_id_logging, span, start_trace
 from models.classification import AgentType
+from config.prompts import STARTER_PROMPTS
 
 # ------------------------------------------------------------
 # CUDA + vLLM Kernel-Level Configuration
@@ -52,81 +67,156 @@ os.environ.setdefault("VLLM_USE_PRECOMPILED", "0")
 # ------------------------------------------------------------
 # Initialize vLLM engine with tensor parallel settings
 # ------------------------------------------------------------
-_engine_args = EngineArgs(
-    model=MODEL_ID,
-    max_tokens=VLLM_MAX_TOKENS,
-    tensor_parallel_size=VLLM_NUM_GPUS,  # shards model weights across GPUs
-    prefill_scheduler="priority",        # schedule token prefill across threads/GPUs
-    sampling_params={"temperature": 0.7, "top_p": 0.95},
-)
-vllm_engine = VLLMEngine(_engine_args)
+@lru_cache(maxsize=1)
+def get_vllm_engine():
+    """Build the vLLM engine on first use (loaded in the background by the startup orchestrator)."""
+    from vllm.deploy import VLLMEngine, EngineArgs
+
+    engine_args = EngineArgs(
+        model=MODEL_ID,
+        max_tokens=VLLM_MAX_TOKENS,
+        tensor_parallel_size=VLLM_NUM_GPUS,  # shards model weights across GPUs
+        prefill_scheduler="priority",        # schedule token prefill across threads/GPUs
+        sampling_params={"temperature": 0.7, "top_p": 0.95},
+    )
+    return VLLMEngine(engine_args)
 
 # ------------------------------------------------------------
 # Standard Chainlit & Logging Setup
 # ------------------------------------------------------------
+# force: config.settings already called basicConfig on import, which would make this a no-op
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    format="%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s",
+    force=True,
 )
+# Every log line carries the request id of the message being handled ("-" outside one)
+install_request_id_logging()
 logger = logging.getLogger(__name__)
 
+# ------------------------------------------------------------
+# Background startup: heavy components load in parallel while the
+# server already accepts connections; readiness is served on /healthz
+# ------------------------------------------------------------
+startup = get_startup()
+startup.register("vector_db", get_vector_db)
+startup.register("classifier", get_classifier)
+# Optional: token counting uses a character estimate until the tokenizer has
+# loaded, and generation goes through the vLLM server, so neither blocks readiness
+startup.register("tokenizer", load_tokenizer, required=False)
+startup.register("vllm_engine", get_vllm_engine, required=False)
+startup.start()
+add_route("/healthz", healthz)
+
+# ------------------------------------------------------------
+# Prometheus metrics on /metrics; components' own counters are read at scrape time
+# ------------------------------------------------------------
+register_stats_source("admission", lambda: get_admission_controller().snapshot())
+register_stats_source("rewrite", lambda: get_query_rewriter().stats)
+register_stats_source("response_cache", lambda: get_response_cache().stats)
+register_stats_source(
+    "semantic_cache", lambda: {**get_semantic_cache().stats, "hit_rate": get_semantic_cache().hit_rate}
+)
+register_stats_source("coalescer", lambda: {**get_coalescer().stats, "in_flight": get_coalescer().in_flight})
+register_stats_source("retrieval", lambda: get_retrieval_service().stats)
+register_stats_source(
+    "vector_db", lambda: get_vector_db(block=False).cache_stats() if get_vector_db(block=False) else {}
+)
+register_stats_source("replicas", lambda: {
+    f"{replica['url']}:{stat}": value
+    for replica in get_inference_client().replica_snapshot()
+    for stat, value in replica.items() if stat != "url"
+})
+add_route("/metrics", metrics_endpoint)
+
+# Pipeline stage names (see services/pipeline.py) as exported metric stages
+PIPELINE_STAGE_METRICS = {
+    "rewrite": "rewrite",
+    "classify": "classify",
+    "classify_refined": "classify",
+    "retrieve": "retrieve",
+    "retrieve_refined": "retrieve",
+    "total": "pipeline",
+}
+
 
-@cl.cache
-def get_session_context():
-    """Maintain active agent and conversation history per session."""
-    return {"active_agent": "general", "conversation_history": []}
+STATE_UNAVAILABLE_MESSAGE = (
+    "Sorry, I can't reach this conversation's saved state right now, so I can't answer without "
+    "losing its context. Please try again in a moment."
+)
+STATE_NOT_SAVED_MESSAGE = (
+    "Note: this exchange couldn't be saved, so I may not remember it in my next answer."
+)
+
+
+def get_session_id():
+    """Stable id for the conversation, shared by every worker that serves it."""
+    return cl.context.session.id
+
+
+async def load_session_context():
+    """Load active agent, conversation history and agent state from the state backend."""
+    return restore_session(await get_state_backend().load(get_session_id()))
+
+
+async def save_session_context(context):
+    """Persist the session context; bumps the revision so stale background saves are skipped."""
+    context["revision"] = context.get("revision", 0) + 1
+    await get_state_backend().save(get_session_id(), serialize_session(context))
+
+
+def summary_saver(session_id, context):
+    """Callback that persists a background summary unless a newer message already saved state."""
+    async def _save():
+        backend = get_state_backend()
+        try:
+            stored = await backend.load(session_id)
+            if stored is None:
+                # The chat ended (or expired) meanwhile; don't bring its state back
+                return
+            if stored.get("revision") != context["revision"]:
+                logger.info("Session advanced during summarization; summary will be recomputed")
+                return
+            await backend.save(session_id, serialize_session(context))
+        except SessionStateUnavailable as e:
+            # The turns are still in the saved history; the next message summarizes them again
+            logger.warning(f"Background summary not saved: {str(e)}")
+    return _save
 
 
 @cl.set_starters
 async def set_starters():
     """Welcome screen starter prompts."""
     return [
-        cl.Starter(
-            label="Email to Professor",
-            message=(
-                "Help me compose a professional email to my professor requesting an extension "
-                "for my term paper due to health issues."
-            ),
-            icon="/public/icons/email.svg",
-        ),
-        cl.Starter(
-            label="Research Paper Assistant",
-            message=(
-                "I need help structuring my research paper on climate change impacts. "
-                "Can you provide an outline with sections I should include?"
-            ),
-            icon="/public/icons/research.svg",
-        ),
-        cl.Starter(
-            label="Academic concepts",
-            message="Explain the concept of quantum mechanics and its fundamental principles.",
-            icon="/public/icons/academic.svg",
-        ),
-        cl.Starter(
-            label="Graduate Admissions Info",
-            message=(
-                "Where can I find information about graduate admissions requirements for the CS department?"
-            ),
-            icon="/public/icons/url.svg",
-        ),
+        cl.Starter(label=starter["label"], message=starter["message"], icon=starter["icon"])
+        for starter in STARTER_PROMPTS
     ]
 
 
 def verify_llm_server():
-    """Ping the vLLM/OpenAI-compatible server to ensure readiness."""
-    try:
-        vllm_engine.list_models()  # triggers internal CUDA kernels for health check
-        logger.info("vLLM server is reachable")
+    """Report whether the vLLM server is usable from the cached health-monitor state."""
+    monitor = get_health_monitor()
+    if monitor.is_available():
         return True
-    except Exception as e:
-        logger.error(f"Cannot reach vLLM server at {INFERENCE_SERVER_URL}: {e}")
-        return False
+    logger.error(f"vLLM server at {INFERENCE_SERVER_URL} is {monitor.state.value}: {monitor.last_error}")
+    return False
 
 
 @cl.on_chat_start
 async def on_chat_start():
     """At session start, verify the LLM server and warn if unreachable."""
     logger.info("New chat session started")
+    get_health_monitor().start()
+    try:
+        context = await load_session_context()
+        await save_session_context(context)
+    except SessionStateUnavailable as e:
+        logger.error(f"Session state unavailable at chat start: {str(e)}")
+        await cl.Message(content=STATE_UNAVAILABLE_MESSAGE).send()
+    if not startup.ready:
+        await cl.Message(
+            content=f"Warming up (loading {', '.join(startup.loading())}); your first answer may take a little longer."
+        ).send()
     if not verify_llm_server():
         await cl.Message(
             content=(
@@ -136,13 +226,68 @@ async def on_chat_start():
         ).send()
 
 
+@cl.on_chat_end
+async def on_chat_end():
+    """Drop the finished session's state instead of leaving it to the TTL."""
+    try:
+        await get_state_backend().delete(get_session_id())
+    except SessionStateUnavailable as e:
+        logger.warning(f"Session state not deleted, it will expire: {str(e)}")
+
+
 @cl.on_message
 async def handle_message(message: cl.Message):
     """Main message handler: agent selection, optional rewrite, and vLLM inference."""
     user_input = message.content.strip()
-    logger.info(f"Received user input: {user_input}")
+    # One trace per message; its id is the request id in log lines and vLLM request headers
+    with start_trace("handle_message", session_id=get_session_id()) as trace:
+        logger.info(f"Received user input: {user_input}")
+        # Keeps the conversation on one replica in session routing mode (vLLM prefix-cache reuse)
+        bind_routing_key(get_session_id())
+
+        # Only the first messages after a cold start wait here, bounded by STARTUP_READY_TIMEOUT
+        if not startup.ready:
+            with span("startup_wait"):
+                ready = await startup.wait_ready()
+            if not ready:
+                failed = startup.failed()
+                if failed:
+                    notice = (
+                        f"Some services failed to load ({', '.join(failed)}) and are being retried; "
+                        "this answer may be incomplete or fail."
+                    )
+                else:
+                    notice = f"Still loading ({', '.join(startup.loading())}); this answer may be slower or less complete."
+                logger.warning(f"Answering before startup finished: {notice}")
+                await cl.Message(content=notice).send()
+
+        # State lives in the backend, not this worker, so any worker can serve the message
+        started = time.perf_counter()
+        with span("load_session"):
+            try:
+                context = await load_session_context()
+            except SessionStateUnavailable as e:
+                # Answering without the stored state would silently start the conversation over
+                logger.error(str(e))
+                await cl.Message(content=STATE_UNAVAILABLE_MESSAGE).send()
+                return
+        try:
+            await respond(message, user_input, context)
+        finally:
+            with span("save_session"):
+                try:
+                    await save_session_context(context)
+                except SessionStateUnavailable as e:
+                    logger.error(str(e))
+                    await cl.Message(content=STATE_NOT_SAVED_MESSAGE).send()
+            agent_type = context["active_agent"]
+            trace.set_attribute("agent_type", str(getattr(agent_type, "value", agent_type)))
+            record_stage("handle_message", agent_type, time.perf_counter() - started)
+
 
-    context = get_session_context()
+async def respond(message: cl.Message, user_input: str, context):
+    """Route the message to an agent and stream its reply, updating the session context."""
+    agents = context["agents"]
     current_agent_type = context["active_agent"]
     current_agent = agents[current_agent_type]
 
@@ -157,83 +302,59 @@ async def handle_message(message: cl.Message):
         current_agent = agents[AgentType.VISION]
         logger.info("Switched to Vision agent due to image attachment")
 
-    # Optional question rewrite step
-    refined_input = user_input
-    if ENABLE_Q_REWRITE:
-        try:
-            rewriter = OpenAI(
-                api_key="EMPTY",
-                base_url=INFERENCE_SERVER_URL,
-                timeout=REQUEST_TIMEOUT,
-            )
-            rewrite_prompt = (
-                "Rewrite the question for clarity without adding new facts:\n\nQuestion: "
-                + user_input
-            )
-            rewrite_resp = rewriter.chat.completions.create(
-                model=REWRITE_MODEL_ID,
-                messages=[{"role": "user", "content": rewrite_prompt}],
-                max_tokens=64,
-                temperature=0.2,
-            )
-            refined_input = rewrite_resp.choices[0].message.content.strip()
-            logger.info(f"Question refined to: {refined_input}")
-        except Exception as e:
-            logger.warning(f"Rewrite failed: {e}; using original input.")
-
-    # Agent detection based on keywords and attachments
+    # Rewrite, classification and retrieval run as concurrent stages; classification
+    # and retrieval start on the raw input while the (optional) rewrite is in flight
+    classify = None
     if not current_agent.waiting_for_input and not has_attach:
-        lower_ref = refined_input.lower()
-        code_kw = ["code", "script", "function", "algorithm", "snippet"]
-        email_kw = ["email", "compose", "draft", "extension"]
-        if any(w in lower_ref for w in code_kw):
-            detected = AgentType.GENERAL
-        elif any(w in lower_ref for w in email_kw):
-            detected = AgentType.EMAIL
-        else:
-            detected = determine_agent_type(refined_input, has_attachment=has_attach)
-        if detected != current_agent_type:
-            current_agent.reset()
-            context["active_agent"] = detected
-            current_agent_type = detected
-            current_agent = agents[detected]
-            logger.info(f"Switched to {current_agent.name} agent")
-
-    # Append to conversation history
-    context["conversation_history"].append({"role": "user", "content": refined_input})
+        classify = determine_agent_type
+    retrieve = None if has_attach else current_agent.retrieve_context
+    with span("pipeline"):
+        pipeline = await MessagePipeline(
+            classify=classify, retrieve=retrieve, rewrite=ENABLE_Q_REWRITE
+        ).run(user_input)
+    refined_input = pipeline.refined_input
+
+    if pipeline.agent_type is not None and pipeline.agent_type != current_agent_type:
+        detected = pipeline.agent_type
+        current_agent.reset()
+        context["active_agent"] = detected
+        current_agent_type = detected
+        current_agent = agents[detected]
+        logger.info(f"Switched to {current_agent.name} agent")
+
+    for stage, ms in pipeline.timings.items():
+        record_stage(PIPELINE_STAGE_METRICS.get(stage, stage), current_agent_type, ms / 1000)
 
     # Generate response using vLLM engine (invokes CUDA kernels internally)
-    result = current_agent.process_input(refined_input, engine=vllm_engine)
+    with span("process_input", agent_type=current_agent_type.value):
+        result = current_agent.process_input(refined_input)
 
     # Skip interactive prompts
     if result["type"] == "input_request":
         result["type"] = "final_response"
 
+    # Backend availability is enforced by the health monitor's circuit breaker
+    # inside the agent, so no synchronous probe is needed on the request path
     if result["type"] == "final_response":
-        if not verify_llm_server():
-            await cl.Message(
-                content=(
-                    "The LLM server appears to be offline or unreachable. "
-                    "Please try again later or contact an administrator."
-                )
-            ).send()
-            return
-
         msg = cl.Message(content="")
         await msg.send()
 
-        # Stream tokens at moderate rate
-        response = await current_agent.get_response(
-            refined_input, attachments, engine=vllm_engine
-        )
-        import asyncio
-        for char in response:
-            await msg.stream_token(char)
-            await asyncio.sleep(0.01)
+        # Forward real deltas from vLLM to the UI as they are decoded
+        chunks = []
+        with span("generate", agent_type=current_agent_type.value):
+            async for token in current_agent.stream_response(
+                refined_input, attachments, context=pipeline.context, history=context["history"]
+            ):
+                chunks.append(token)
+                await msg.stream_token(token)
         await msg.update()
+        response = "".join(chunks)
 
-        context["conversation_history"].append(
-            {"role": "assistant", "content": response}
+        # Record the exchange, then fold turns beyond the token budget into the
+        # rolling summary in the background so it is ready before the next turn
+        context["history"].add_turn(refined_input, response)
+        context["history"].schedule_summary(
+            on_done=summary_saver(get_session_id(), context), session_id=get_session_id()
         )
 
 
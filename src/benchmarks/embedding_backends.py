@@ -0,0 +1,175 @@
+"""
+Export, verify and benchmark the ONNX query-embedding backend.
+
+    cd src
+    python -m benchmarks.embedding_backends export            # one-time: export, quantize, verify
+    python -m benchmarks.embedding_backends verify --corpus sample.txt
+    python -m benchmarks.embedding_backends bench --k 5
+
+``export`` writes an int8 dynamically quantized ONNX model, the fast
+tokenizer and its settings to ONNX_EMBEDDING_PATH. It then checks cosine
+agreement with the torch model on a sample corpus, the same check ``verify``
+runs. ``bench`` compares single-query latency, batch throughput and
+recall@k against the FAISS index for both backends, treating the torch
+backend's results as ground truth. Export and the torch side need torch and
+transformers; the serving path with EMBEDDING_BACKEND=onnx needs only
+onnxruntime and tokenizers.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.load_test import QUESTIONS
+from config.prompts import STARTER_PROMPTS
+from config.settings import EMBEDDING_MODEL_ID, ONNX_EMBEDDING_PATH, VECTOR_DB_PATH
+from utils.vector_db import ONNX_CONFIG_FILE, ONNX_MODEL_FILE, OnnxEmbeddings, make_embeddings
+
+logger = logging.getLogger(__name__)
+
+# sentence-transformers truncates all-mpnet-base-v2 inputs at 384 tokens
+MAX_SEQ_LENGTH = 384
+
+
+def sample_corpus(path: str = None, from_index: int = 0) -> List[str]:
+    """Corpus lines from a file, else the benchmark questions and starter prompts, plus indexed chunks"""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = QUESTIONS + [prompt["message"] for prompt in STARTER_PROMPTS]
+    if from_index:
+        store = load_index(make_embeddings("torch"))
+        texts += [doc.page_content for doc in list(store.docstore._dict.values())[:from_index]]
+    return texts
+
+
+def load_index(embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS.load_local(VECTOR_DB_PATH, embeddings, allow_dangerous_deserialization=True)
+
+
+def export(output: str, model_id: str = EMBEDDING_MODEL_ID) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+    sample = tokenizer(["a sample query for tracing"], return_tensors="pt")
+    fp32_path = os.path.join(output, "model.fp32.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+    # Dynamic quantization: int8 weights, activations quantized per batch at run time
+    quantize_dynamic(fp32_path, os.path.join(output, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    tokenizer.save_pretrained(output)
+    with open(os.path.join(output, ONNX_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "model_id": model_id,
+            "max_length": MAX_SEQ_LENGTH,
+            "pad_token": tokenizer.pad_token,
+            "pad_id": tokenizer.pad_token_id,
+        }, f, indent=2)
+    logger.info(f"Exported int8 ONNX embedding model to {output}")
+
+
+def verify(model_dir: str, corpus: List[str], min_cosine: float) -> bool:
+    """Cosine agreement between the torch and ONNX embeddings of every corpus text"""
+    reference = np.asarray(make_embeddings("torch").embed_documents(corpus))
+    candidate = np.asarray(OnnxEmbeddings(model_dir).embed_documents(corpus))
+    # Both backends return unit vectors
+    cosines = (reference * candidate).sum(axis=1)
+    worst = int(np.argmin(cosines))
+    print(
+        f"cosine agreement over {len(corpus)} texts: min {cosines.min():.4f}, mean {cosines.mean():.4f}, "
+        f"p5 {np.percentile(cosines, 5):.4f}"
+    )
+    if cosines[worst] < min_cosine:
+        print(f"FAILED: below {min_cosine} for {corpus[worst][:80]!r}")
+        return False
+    return True
+
+
+def bench(model_dir: str, queries: List[str], k: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    backends = {"torch": make_embeddings("torch"), "onnx": OnnxEmbeddings(model_dir)}
+    store = load_index(backends["torch"]) if os.path.exists(VECTOR_DB_PATH) else None
+    report: Dict[str, Dict[str, float]] = {}
+    neighbours: Dict[str, np.ndarray] = {}
+    for name, embeddings in backends.items():
+        embeddings.embed_query(queries[0])  # warm-up
+        single = []
+        for _ in range(repeats):
+            for query in queries:
+                started = time.perf_counter()
+                embeddings.embed_query(query)
+                single.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        vectors = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+        batch_seconds = time.perf_counter() - started
+        report[name] = {
+            "p50_ms": round(statistics.median(single), 2),
+            "p95_ms": round(float(np.percentile(single, 95)), 2),
+            "batch_queries_per_s": round(len(queries) / batch_seconds, 1),
+        }
+        if store is not None:
+            neighbours[name] = store.index.search(vectors, k)[1]
+
+    if store is not None:
+        # The index was built with the torch model, so its neighbours are the ground truth
+        overlaps = [
+            len(set(truth) & set(found)) / k for truth, found in zip(neighbours["torch"], neighbours["onnx"])
+        ]
+        report["onnx"][f"recall@{k}"] = round(statistics.mean(overlaps), 4)
+    else:
+        logger.warning(f"No FAISS index at {VECTOR_DB_PATH}; skipping recall")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ONNX query-embedding backend tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("export", "verify", "bench"):
+        command = sub.add_parser(name)
+        command.add_argument("--model-dir", default=ONNX_EMBEDDING_PATH)
+        command.add_argument("--corpus", help="Text file, one sample per line (default: built-in questions)")
+        command.add_argument("--from-index", type=int, default=0, help="Also sample this many indexed chunks")
+    for name in ("export", "verify"):
+        sub.choices[name].add_argument("--min-cosine", type=float, default=0.99)
+    sub.choices["export"].add_argument("--model-id", default=EMBEDDING_MODEL_ID)
+    sub.choices["bench"].add_argument("--k", type=int, default=5)
+    sub.choices["bench"].add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    corpus = sample_corpus(args.corpus, args.from_index)
+    if args.command == "export":
+        export(args.model_dir, args.model_id)
+    if args.command in ("export", "verify"):
+        sys.exit(0 if verify(args.model_dir, corpus, args.min_cosine) else 1)
+    print(json.dumps(bench(args.model_dir, corpus, args.k, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
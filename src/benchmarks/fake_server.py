@@ -0,0 +1,285 @@
+"""
+Fake OpenAI-compatible inference server for load tests.
+
+Serves /v1/models and /v1/chat/completions (streaming and non-streaming)
+with a configurable prefill latency, decode rate and error rate, so the
+app's concurrency behaviour can be measured on a CPU-only machine. Built on
+plain asyncio streams so it needs no web framework.
+
+    python -m benchmarks.fake_server --port 5001 --prefill-latency 0.3 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the university of north texas offers graduate and undergraduate programs across many colleges "
+    "students can register for courses through the portal and contact their advisor for help with "
+    "deadlines financial aid housing research assistantships and academic policies on campus"
+).split()
+
+
+@dataclass
+class CompletionPlan:
+    """What the server sends for one request: either an error or tokens with their timing"""
+    tokens: List[str] = field(default_factory=list)
+    # Delay before the first token, then the gap before each following token (seconds)
+    prefill: float = 0.0
+    gaps: List[float] = field(default_factory=list)
+    error_status: Optional[int] = None
+
+
+class SyntheticProfile:
+    """Generates completions with a fixed latency profile"""
+
+    def __init__(
+        self,
+        prefill_latency: float = 0.2,
+        prefill_jitter: float = 0.05,
+        tokens_per_second: float = 40.0,
+        response_tokens: int = 120,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.prefill_latency = prefill_latency
+        self.prefill_jitter = prefill_jitter
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def plan(self, request: Dict[str, Any]) -> CompletionPlan:
+        if self._random.random() < self.error_rate:
+            return CompletionPlan(error_status=500)
+        count = min(self.response_tokens, int(request.get("max_tokens") or self.response_tokens))
+        tokens = [self._random.choice(_WORDS) + " " for _ in range(max(1, count))]
+        gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        prefill = max(0.0, self.prefill_latency + self._random.uniform(-self.prefill_jitter, self.prefill_jitter))
+        return CompletionPlan(tokens=tokens, prefill=prefill, gaps=[gap] * (len(tokens) - 1))
+
+
+class FakeOpenAIServer:
+    """Minimal HTTP/1.1 keep-alive server speaking the OpenAI chat completions protocol"""
+
+    def __init__(
+        self,
+        source,
+        host: str = "127.0.0.1",
+        port: int = 5001,
+        model: str = "fake-model",
+        streaming: bool = True,
+    ):
+        # source.plan(request_body) -> CompletionPlan
+        self.source = source
+        self.host = host
+        self.port = port
+        self.model = model
+        # With streaming off, stream=True requests still get SSE, but only after the whole completion
+        self.streaming = streaming
+        self.stats: Dict[str, int] = {"requests": 0, "errors": 0, "tokens": 0}
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Fake inference server listening on http://{self.host}:{self.port}/v1")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # ---- HTTP plumbing ------------------------------------------------------------
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+        return method, path.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _head(status: int, headers: Dict[str, str]) -> bytes:
+        reason = {200: "OK", 404: "Not Found", 500: "Internal Server Error"}.get(status, "Error")
+        lines = [f"HTTP/1.1 {status} {reason}"] + [f"{k}: {v}" for k, v in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(self._head(status, {"Content-Type": "application/json", "Content-Length": str(len(body))}) + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._route(writer, method, path, headers, body)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, writer, method: str, path: str, headers: Dict[str, str], body: bytes) -> None:
+        if method == "GET" and path in ("/v1/models", "/models"):
+            await self._send_json(writer, 200, {
+                "object": "list",
+                "data": [{"id": self.model, "object": "model", "owned_by": "benchmark"}],
+            })
+        elif method == "GET" and path == "/health":
+            await self._send_json(writer, 200, {"status": "ok"})
+        elif method == "POST" and path in ("/v1/chat/completions", "/chat/completions"):
+            await self._chat_completion(writer, json.loads(body or b"{}"), headers)
+        else:
+            await self._send_json(writer, 404, {"error": {"message": f"No route for {method} {path}"}})
+
+    # ---- Completions --------------------------------------------------------------
+
+    async def _chat_completion(self, writer, request: Dict[str, Any], headers: Dict[str, str]) -> None:
+        self.stats["requests"] += 1
+        plan = self.source.plan(request)
+        if plan.error_status is not None:
+            self.stats["errors"] += 1
+            await asyncio.sleep(plan.prefill)
+            await self._send_json(writer, plan.error_status, {
+                "error": {"message": "Injected failure", "type": "server_error", "code": plan.error_status},
+            })
+            return
+        self.stats["tokens"] += len(plan.tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = request.get("model") or self.model
+        if request.get("stream"):
+            await self._stream(writer, plan, completion_id, model)
+        else:
+            await self._pace(plan)
+            text = "".join(plan.tokens)
+            await self._send_json(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(plan.tokens), "total_tokens": len(plan.tokens)},
+            })
+
+    async def _pace(self, plan: CompletionPlan, emit=None) -> None:
+        """Wait out the plan's timing against an absolute schedule so sleep overshoot doesn't accumulate"""
+        started = time.perf_counter()
+        due = plan.prefill
+        for index, token in enumerate(plan.tokens):
+            if index:
+                due += plan.gaps[index - 1] if index - 1 < len(plan.gaps) else 0.0
+            delay = started + due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if emit is not None:
+                await emit(token)
+
+    async def _stream(self, writer, plan: CompletionPlan, completion_id: str, model: str) -> None:
+        writer.write(self._head(200, {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Transfer-Encoding": "chunked",
+        }))
+        created = int(time.time())
+        buffered: List[bytes] = []
+
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+            payload = json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+            data = f"data: {payload}\n\n".encode("utf-8")
+            return f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n"
+
+        async def send(chunk: bytes) -> None:
+            if self.streaming:
+                writer.write(chunk)
+                await writer.drain()
+            else:
+                buffered.append(chunk)
+
+        await send(event({"role": "assistant", "content": ""}))
+
+        async def emit(token: str) -> None:
+            await send(event({"content": token}))
+
+        await self._pace(plan, emit)
+        await send(event({}, "stop"))
+        done = b"data: [DONE]\n\n"
+        await send(f"{len(done):x}\r\n".encode("latin-1") + done + b"\r\n")
+        if buffered:
+            writer.write(b"".join(buffered))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Latency-profile options shared with the load-test driver"""
+    parser.add_argument("--prefill-latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--prefill-jitter", type=float, default=0.05, help="Uniform +/- jitter on prefill (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Decode rate per request")
+    parser.add_argument("--response-tokens", type=int, default=120, help="Tokens per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--no-stream", action="store_true", help="Buffer streamed responses until complete")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args: argparse.Namespace) -> SyntheticProfile:
+    return SyntheticProfile(
+        prefill_latency=args.prefill_latency,
+        prefill_jitter=args.prefill_jitter,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible streaming server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--model", default="fake-model")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    server = FakeOpenAIServer(
+        profile_from_args(args), host=args.host, port=args.port, model=args.model, streaming=not args.no_stream
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Load-test driver for the Chainlit message path.
+
+Simulates N concurrent chat sessions, each sending a series of messages
+through the real ``app.handle_message`` -> agent -> retrieval path, against
+the bundled fake inference server (or any OpenAI-compatible URL). Reports
+throughput, TTFT and total-latency percentiles, and event-loop lag; a lag
+spike means something is blocking the loop.
+
+    cd src && python -m benchmarks.load_test --sessions 32 --messages 4 --tokens-per-second 40
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_server import add_server_arguments
+
+QUESTIONS = [
+    "How do I apply to the computer science masters program?",
+    "What are the deadlines for fall registration?",
+    "Where is the financial aid office located?",
+    "Explain what a p-value means in statistics.",
+    "Can you help me write an email to my professor asking for an extension?",
+    "What research opportunities are there for undergraduates?",
+    "How do I find a thesis advisor?",
+    "What is the difference between supervised and unsupervised learning?",
+    "Which scholarships are available for international students?",
+    "How do I reset my EUID password?",
+]
+
+
+@dataclass
+class MessageResult:
+    session: int
+    ttft: Optional[float]
+    total: float
+    tokens: int
+    error: Optional[str] = None
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("load_test_current")
+
+
+class BenchMessage:
+    """Stands in for cl.Message: inbound messages carry content; outbound ones time the stream"""
+
+    def __init__(self, content: str = "", **kwargs: Any):
+        self.content = content
+        self.attachments = None
+
+    async def send(self) -> "BenchMessage":
+        return self
+
+    async def stream_token(self, token: str) -> None:
+        record = _current.get(None)
+        if record is not None:
+            if record["first_token"] is None:
+                record["first_token"] = time.perf_counter()
+            record["tokens"] += 1
+
+    async def update(self) -> None:
+        pass
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic sleeper"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _wait_for_port(host: str, port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake inference server did not start on {host}:{port}")
+
+
+def start_fake_server(args: argparse.Namespace) -> subprocess.Popen:
+    """Run the fake (or replay) server in its own process so it doesn't share the app's event loop"""
+    if args.replay:
+        command = [
+            sys.executable, "-m", "benchmarks.replay_server",
+            "--host", "127.0.0.1", "--port", str(args.port), "--recording", args.replay,
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "benchmarks.fake_server",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--prefill-latency", str(args.prefill_latency),
+            "--prefill-jitter", str(args.prefill_jitter),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--response-tokens", str(args.response_tokens),
+            "--error-rate", str(args.error_rate),
+        ]
+        if args.no_stream:
+            command.append("--no-stream")
+        if args.seed is not None:
+            command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    _wait_for_port("127.0.0.1", args.port)
+    return process
+
+
+def configure_environment(args: argparse.Namespace, server_url: str) -> None:
+    """Settings are read from the environment at import time, so this runs before importing the app"""
+    # INFERENCE_SERVER_URLS takes precedence over INFERENCE_SERVER_URL, so an exported
+    # replica list would otherwise send the benchmark to the real servers
+    os.environ["INFERENCE_SERVER_URLS"] = server_url
+    os.environ["INFERENCE_SERVER_URL"] = server_url.split(",")[0].strip()
+    os.environ.setdefault("STATE_BACKEND", "memory")
+    os.environ.setdefault("ENABLE_Q_REWRITE", "true" if args.rewrite else "false")
+    if not args.with_caches:
+        # Measure the backend path, not cache hits on a small question set
+        for name in ("RESPONSE_CACHE_ENABLED", "SEMANTIC_CACHE_ENABLED", "COALESCE_ENABLED"):
+            os.environ.setdefault(name, "false")
+
+
+def import_app(args: argparse.Namespace):
+    """Import the Chainlit app with UI objects replaced by benchmark stand-ins"""
+    if args.retrieval == "off":
+        import utils.vector_db as vector_db_module
+        vector_db_module.get_vector_db = lambda block=True: None
+
+    import app
+    from agents.base_agent import BaseAgent
+
+    if args.retrieval == "off":
+        async def no_context(self, query):
+            return []
+        BaseAgent.retrieve_context = no_context
+
+    app.cl.Message = BenchMessage
+    session_id: contextvars.ContextVar = contextvars.ContextVar("load_test_session")
+    app.get_session_id = lambda: session_id.get()
+    logging.getLogger().setLevel(args.log_level)
+    return app, session_id
+
+
+async def run_session(app, session_id, index: int, args: argparse.Namespace, results: List[MessageResult]) -> None:
+    session_id.set(f"load-test-{index}")
+    rng = random.Random((args.seed or 0) + index)
+    await app.on_chat_start()
+    for _ in range(args.messages):
+        record = {"first_token": None, "tokens": 0}
+        _current.set(record)
+        started = time.perf_counter()
+        error = None
+        try:
+            await app.handle_message(BenchMessage(rng.choice(QUESTIONS)))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        results.append(MessageResult(
+            session=index,
+            ttft=record["first_token"] - started if record["first_token"] is not None else None,
+            total=finished - started,
+            tokens=record["tokens"],
+            error=error,
+        ))
+        if args.think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def summarize(results: List[MessageResult], lag: List[float], elapsed: float) -> Dict[str, Any]:
+    ttfts = [r.ttft for r in results if r.ttft is not None]
+    totals = [r.total for r in results]
+
+    def pcts(values: List[float]) -> Dict[str, Optional[float]]:
+        return {f"p{p}": percentile(values, p) for p in (50, 95, 99)} | {"max": max(values) if values else None}
+
+    return {
+        "messages": len(results),
+        "errors": sum(1 for r in results if r.error),
+        "elapsed_s": elapsed,
+        "throughput_msg_s": len(results) / elapsed if elapsed else 0.0,
+        "throughput_tokens_s": sum(r.tokens for r in results) / elapsed if elapsed else 0.0,
+        "ttft_s": pcts(ttfts),
+        "total_s": pcts(totals),
+        "loop_lag_s": pcts(lag),
+    }
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    def fmt(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:9.1f}"
+
+    print(f"\nmessages: {summary['messages']}  errors: {summary['errors']}  elapsed: {summary['elapsed_s']:.1f}s")
+    print(f"throughput: {summary['throughput_msg_s']:.2f} msg/s, {summary['throughput_tokens_s']:.1f} tokens/s")
+    print(f"{'(ms)':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for label, key in (("TTFT", "ttft_s"), ("total", "total_s"), ("loop lag", "loop_lag_s")):
+        row = summary[key]
+        print(f"{label:<12}" + "".join(f"{fmt(row[p]):>10}" for p in ("p50", "p95", "p99", "max")))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    app, session_id = import_app(args)
+    results: List[MessageResult] = []
+    monitor = LoopLagMonitor()
+    monitor.start()
+    started = time.perf_counter()
+    # Each session runs in its own task (and context), like separate websocket connections
+    await asyncio.gather(*(
+        asyncio.ensure_future(run_session(app, session_id, i, args, results)) for i in range(args.sessions)
+    ))
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+    summary = summarize(results, monitor.samples, elapsed)
+    summary["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+    summary["results"] = [asdict(r) for r in results]
+    return summary
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Drive concurrent simulated sessions through handle_message")
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent simulated chat sessions")
+    parser.add_argument("--messages", type=int, default=3, help="Messages sent by each session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a session's messages (s)")
+    parser.add_argument("--server-url", default=None,
+                        help="Use this OpenAI-compatible URL (or comma-separated replica URLs) instead of the fake server")
+    parser.add_argument("--port", type=int, default=5001, help="Port for the bundled fake server")
+    parser.add_argument("--replay", default=None,
+                        help="Serve completions recorded via INFERENCE_RECORD_PATH instead of synthetic ones")
+    parser.add_argument("--retrieval", choices=("real", "off"), default="real",
+                        help="'off' skips FAISS retrieval when no index is available")
+    parser.add_argument("--rewrite", action="store_true", help="Enable the query rewrite step")
+    parser.add_argument("--with-caches", action="store_true", help="Keep response/semantic caches and coalescing on")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", default=None, help="Also write the summary and per-message results here")
+    add_server_arguments(parser)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    server = None
+    server_url = args.server_url
+    if server_url is None:
+        server = start_fake_server(args)
+        server_url = f"http://127.0.0.1:{args.port}/v1"
+    try:
+        configure_environment(args, server_url)
+        summary = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_report(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Replay recorded inference traffic with its original timing.
+
+Serves completions captured with INFERENCE_RECORD_PATH (see
+services/traffic_recorder.py) through the fake OpenAI-compatible server,
+matched by request hash, with the recorded time to first token and
+inter-token gaps. App-side changes can then be benchmarked against real
+latency distributions without GPUs.
+
+    python -m benchmarks.replay_server --recording traffic.jsonl --port 5001
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from benchmarks.fake_server import CompletionPlan, FakeOpenAIServer, SyntheticProfile
+from services.traffic_recorder import request_key
+
+logger = logging.getLogger(__name__)
+
+
+class ReplaySource:
+    """Plans completions from a recording; repeated requests cycle through their recorded variants"""
+
+    def __init__(self, path: str, on_miss: str = "synthetic", time_scale: float = 1.0):
+        self.on_miss = on_miss
+        self.time_scale = time_scale
+        self.records: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records[record["key"]].append(record)
+        self._next: Dict[str, int] = defaultdict(int)
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0}
+        self._fallback = self._fallback_profile()
+        logger.info(f"Loaded {sum(len(v) for v in self.records.values())} recorded completions from {path}")
+
+    def _fallback_profile(self) -> SyntheticProfile:
+        """Synthetic profile with the recording's median prefill, decode rate and length"""
+        records = [r for variants in self.records.values() for r in variants]
+        prefills = [r["prefill"] for r in records] or [0.2]
+        gaps = [gap for r in records for gap in r["gaps"]]
+        lengths = [len(r["tokens"]) for r in records if r["stream"]] or [120]
+        median_gap = statistics.median(gaps) if gaps else 0.025
+        return SyntheticProfile(
+            prefill_latency=statistics.median(prefills) * self.time_scale,
+            prefill_jitter=0.0,
+            tokens_per_second=1.0 / (median_gap * self.time_scale) if median_gap > 0 else 0.0,
+            response_tokens=int(statistics.median(lengths)),
+        )
+
+    def plan(self, request: Dict[str, Any]) -> CompletionPlan:
+        key = request_key(request)
+        variants = self.records.get(key)
+        if not variants:
+            self.stats["misses"] += 1
+            if self.on_miss == "error":
+                return CompletionPlan(error_status=404)
+            return self._fallback.plan(request)
+        self.stats["hits"] += 1
+        record = variants[self._next[key] % len(variants)]
+        self._next[key] += 1
+        tokens = record["tokens"]
+        if not record["stream"] and not request.get("stream"):
+            # A non-streamed recording only knows the total time
+            return CompletionPlan(tokens=tokens, prefill=record["total"] * self.time_scale)
+        return CompletionPlan(
+            tokens=tokens,
+            prefill=record["prefill"] * self.time_scale,
+            gaps=[gap * self.time_scale for gap in record["gaps"]],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded completions with their original timing")
+    parser.add_argument("--recording", required=True, help="JSON-lines file written via INFERENCE_RECORD_PATH")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--model", default="fake-model")
+    parser.add_argument("--on-miss", choices=("synthetic", "error"), default="synthetic",
+                        help="Unrecorded requests get a synthetic completion with the recording's median timing, "
+                             "or an error")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiply recorded delays (e.g. 0.5 = 2x faster)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    source = ReplaySource(args.recording, on_miss=args.on_miss, time_scale=args.time_scale)
+    server = FakeOpenAIServer(source, host=args.host, port=args.port, model=args.model)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info(f"Replay stats: {source.stats}")
+
+
+if __name__ == "__main__":
+    main()
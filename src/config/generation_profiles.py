@@ -0,0 +1,53 @@
+from config.settings import MAX_TOKENS, TEMPERATURE
+
+# Generation profiles per agent type (see services/generation_profiles.py).
+# max_tokens is the budget for a typical answer from that agent; intents below
+# and explicit length requests in the question move it within the global bounds.
+GENERATION_PROFILES = {
+    "email": {
+        "max_tokens": 600,
+        "temperature": 0.4,
+        # Stop at the chatter models tend to add after the signature block
+        "stop": ["\n\nLet me know if you", "\n\nI hope this helps"],
+    },
+    "redirect": {"max_tokens": 400, "temperature": 0.1},
+    "academic": {"max_tokens": 1200, "temperature": 0.2},
+    "research": {"max_tokens": 1600, "temperature": 0.3},
+    "planner": {"max_tokens": 1200, "temperature": 0.2},
+    "vision": {"max_tokens": 1024, "temperature": 0.1},
+    "general": {"max_tokens": MAX_TOKENS, "temperature": TEMPERATURE},
+}
+
+DEFAULT_GENERATION_PROFILE = {"max_tokens": MAX_TOKENS, "temperature": TEMPERATURE, "stop": []}
+
+# Per-intent overrides, matched as regexes against the lower-cased question; first match wins
+INTENT_PROFILES = [
+    {
+        "intent": "code",
+        "patterns": [r"\b(code|script|function|implementation|program)\b.*\b(write|generate|implement|complete)\b",
+                     r"\b(write|generate|implement)\b.*\b(code|script|function|program)\b"],
+        "max_tokens": 3200,
+        "temperature": 0.1,
+    },
+    {
+        "intent": "long_form",
+        "patterns": [r"\b(in detail|detailed|comprehensive|in depth|in-depth|thorough)\b",
+                     r"\b(outline|essay|report|step[- ]by[- ]step|full guide)\b"],
+        "max_tokens": 2400,
+    },
+    {
+        "intent": "brief",
+        "patterns": [r"\b(briefly|brief|short answer|quick question|one sentence|in a few words|tl;?dr)\b",
+                     r"^(what|where) is the (link|url|website|phone number|email address)\b"],
+        "max_tokens": 200,
+    },
+]
+
+# Hard bounds for any request; the upper one matches the limit promised in BASE_PROMPT_TEMPLATE
+MIN_GENERATION_TOKENS = 128
+MAX_GENERATION_TOKENS = 3200
+
+# Tokens per English word for turning "in 300 words" into a token budget, plus headroom
+TOKENS_PER_WORD = 1.4
+LENGTH_REQUEST_HEADROOM = 64
+WORDS_PER_PAGE = 500
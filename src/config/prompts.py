@@ -174,4 +174,36 @@ REDIRECT_AGENT_PROMPT = (
     "- Student Health Center\n"
     "- Career Center\n"
     "- Registrar's Office"
-) 
\ No newline at end of file
+)
+
+# Welcome screen starter prompts (also used as the known-questions set by the query rewriter)
+STARTER_PROMPTS = [
+    {
+        "label": "Email to Professor",
+        "message": (
+            "Help me compose a professional email to my professor requesting an extension "
+            "for my term paper due to health issues."
+        ),
+        "icon": "/public/icons/email.svg",
+    },
+    {
+        "label": "Research Paper Assistant",
+        "message": (
+            "I need help structuring my research paper on climate change impacts. "
+            "Can you provide an outline with sections I should include?"
+        ),
+        "icon": "/public/icons/research.svg",
+    },
+    {
+        "label": "Academic concepts",
+        "message": "Explain the concept of quantum mechanics and its fundamental principles.",
+        "icon": "/public/icons/academic.svg",
+    },
+    {
+        "label": "Graduate Admissions Info",
+        "message": (
+            "Where can I find information about graduate admissions requirements for the CS department?"
+        ),
+        "icon": "/public/icons/url.svg",
+    },
+]
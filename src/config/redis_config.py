@@ -7,6 +7,13 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
 REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+# Keep cache lookups from stalling requests when Redis is slow or unreachable
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+# After a failed connect, caches stay in-process for this long before reconnecting
+REDIS_RECONNECT_INTERVAL = float(os.getenv("REDIS_RECONNECT_INTERVAL", "30"))
+# Session state can't fall back to anything, so its client waits longer and retries
+REDIS_STATE_SOCKET_TIMEOUT = float(os.getenv("REDIS_STATE_SOCKET_TIMEOUT", "5"))
+REDIS_STATE_RETRIES = int(os.getenv("REDIS_STATE_RETRIES", "3"))
 
 # Redis connection URL
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
@@ -18,7 +25,9 @@ REDIS_KEY_PREFIXES = {
     "conversation": "conv:",
     "user": "user:",
     "agent": "agent:",
-    "vector": "vector:"
+    "vector": "vector:",
+    "rewrite": "rewrite:",
+    "response": "response:"
 }
 
 # Logging Configuration
@@ -52,12 +61,14 @@ def setup_logging() -> None:
     logging.info("Logging system initialized")
 
 # Redis connection configuration
-def get_redis_config() -> Dict[str, Any]:
+def get_redis_config(socket_timeout: float = REDIS_SOCKET_TIMEOUT) -> Dict[str, Any]:
     """Get Redis configuration dictionary"""
     return {
         "host": REDIS_HOST,
         "port": REDIS_PORT,
         "db": REDIS_DB,
         "password": REDIS_PASSWORD,
+        "socket_timeout": socket_timeout,
+        "socket_connect_timeout": socket_timeout,
         "decode_responses": True
     } 
\ No newline at end of file
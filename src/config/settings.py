@@ -12,6 +12,13 @@ MAX_RETRIES = int(os.getenv("MAX_RETRIES", "2"))
 RETRY_DELAY = int(os.getenv("RETRY_DELAY", "1"))
 # Shorter timeout to prevent UI hanging on slow responses
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "10"))
+# Shared inference client connection pool (see services/inference_client.py)
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "100"))
+INFERENCE_KEEPALIVE_CONNECTIONS = int(os.getenv("INFERENCE_KEEPALIVE_CONNECTIONS", "20"))
+INFERENCE_KEEPALIVE_EXPIRY = float(os.getenv("INFERENCE_KEEPALIVE_EXPIRY", "30"))
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "3"))
+# HTTP/2 is only used when the optional `h2` package is installed
+INFERENCE_HTTP2 = os.getenv("INFERENCE_HTTP2", "true").lower() in ("1", "true", "yes")
 CHAINLIT_HOST = os.getenv("CHAINLIT_HOST", "0.0.0.0")
 CHAINLIT_PORT = int(os.getenv("CHAINLIT_PORT", "8000"))
 
@@ -28,10 +35,143 @@ logger.info(f"Using vector database at: {VECTOR_DB_PATH}")
 MAX_TOKENS = 512  # Reduced from 1024 to 512 for faster responses
 TEMPERATURE = 0.2  # Reduced to 0.2 for more focused and deterministic responses
 
+# Per-session conversation history cap (messages kept in memory per session)
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "20"))
+# Tokenizer used for prompt budgeting (defaults to the served model's tokenizer)
+TOKENIZER_ID = os.getenv("TOKENIZER_ID", MODEL_ID)
+# Token budget for verbatim history sent with each request; older turns are summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1024"))
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "256"))
+
+# Where per-session state lives: "memory" (single worker) or "redis" (N workers, no sticky sessions)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+SESSION_STATE_TTL = int(os.getenv("SESSION_STATE_TTL", "86400"))
+# Bound on sessions the in-memory backend holds (least recently used are evicted first)
+SESSION_STATE_MAX_SESSIONS = int(os.getenv("SESSION_STATE_MAX_SESSIONS", "10000"))
+
 # Question rewrite settings
 REWRITE_MODEL_ID = os.getenv("REWRITE_MODEL_ID", MODEL_ID)
 # Enable/disable question rewriting step (set ENV ENABLE_Q_REWRITE=false to turn off)
 ENABLE_Q_REWRITE = os.getenv("ENABLE_Q_REWRITE", "true").lower() in ("1", "true", "yes")
+# Hard latency budget (seconds); the original question is used if the rewrite is slower
+REWRITE_LATENCY_BUDGET = float(os.getenv("REWRITE_LATENCY_BUDGET", "0.8"))
+REWRITE_CACHE_SIZE = int(os.getenv("REWRITE_CACHE_SIZE", "2048"))
+REWRITE_CACHE_TTL = int(os.getenv("REWRITE_CACHE_TTL", "86400"))
+# Questions shorter than this many words are sent as-is
+REWRITE_MIN_WORDS = int(os.getenv("REWRITE_MIN_WORDS", "3"))
+# Capitalized, punctuated questions up to this many words are considered clear enough
+REWRITE_WELL_FORMED_MAX_WORDS = int(os.getenv("REWRITE_WELL_FORMED_MAX_WORDS", "25"))
+
+# Speculative classification/retrieval on the raw input is kept when the rewrite
+# is at least this similar (difflib ratio on normalized text) to the original
+PIPELINE_SPECULATION_THRESHOLD = float(os.getenv("PIPELINE_SPECULATION_THRESHOLD", "0.9"))
 
 # Server verification endpoint (for diagnostics)
-LLM_HEALTH_PATH = os.getenv("LLM_HEALTH_PATH", "/v1/models") 
\ No newline at end of file
+LLM_HEALTH_PATH = os.getenv("LLM_HEALTH_PATH", "/v1/models")
+
+# Exact-match response cache (see services/response_cache.py)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# Semantic response cache for paraphrased questions (see services/semantic_cache.py)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Minimum cosine similarity between question embeddings to reuse an answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Near-misses within this margin below the threshold are audit-logged for tuning
+SEMANTIC_CACHE_AUDIT_MARGIN = float(os.getenv("SEMANTIC_CACHE_AUDIT_MARGIN", "0.05"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))  # entries per agent type
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+# Agents whose answers are factual lookups and safe to reuse for a paraphrase; drafting and
+# planning agents (email, research, planner) tailor each answer to the request's details
+SEMANTIC_CACHE_AGENTS = {
+    agent.strip() for agent in os.getenv("SEMANTIC_CACHE_AGENTS", "academic,redirect").split(",") if agent.strip()
+}
+
+# Share one generation between identical in-flight requests (see services/coalescer.py)
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Admission control in front of the inference backend (see services/admission.py)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "15"))
+# Per-agent-type concurrency bulkheads, e.g. "vision:8,planner:8"; unlisted types share the global limit
+ADMISSION_BULKHEADS = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split(":") for item in os.getenv("ADMISSION_BULKHEADS", "vision:8").split(",") if ":" in item
+    )
+}
+
+# Background health monitor and circuit breaker (see services/health_monitor.py)
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "10"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "3"))
+# Probes slower than this mark the backend as degraded
+HEALTH_DEGRADED_LATENCY = float(os.getenv("HEALTH_DEGRADED_LATENCY", "1.0"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "15")) 
+# How often the health monitor checks whether the FAISS index was rebuilt on disk (0 disables)
+VECTOR_DB_RELOAD_INTERVAL = float(os.getenv("VECTOR_DB_RELOAD_INTERVAL", "60"))
+# Lazy startup (see services/startup.py): how long a message waits for required components
+STARTUP_READY_TIMEOUT = float(os.getenv("STARTUP_READY_TIMEOUT", "120"))
+# A required component that failed to load is retried after this many seconds, doubling per
+# failure up to the max; the vector database also waits this long between lazy load attempts
+STARTUP_RETRY_INTERVAL = float(os.getenv("STARTUP_RETRY_INTERVAL", "30"))
+STARTUP_RETRY_MAX_INTERVAL = float(os.getenv("STARTUP_RETRY_MAX_INTERVAL", "300"))
+
+# Request tracing (see utils/tracing.py): none | jsonl | otlp
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_JSONL_PATH = os.getenv("TRACING_JSONL_PATH", "logs/traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "unt-gemma-agent")
+
+# Record every chat completion (request, tokens, inter-token timing) to this JSON-lines
+# file for benchmarks/replay_server.py; empty disables recording
+INFERENCE_RECORD_PATH = os.getenv("INFERENCE_RECORD_PATH", "")
+
+# Multiple vLLM replicas (see services/replica_router.py), comma-separated; defaults to the single server
+INFERENCE_SERVER_URLS = [
+    url.strip() for url in os.getenv("INFERENCE_SERVER_URLS", INFERENCE_SERVER_URL).split(",") if url.strip()
+]
+# Weight of the newest sample in each replica's time-to-first-byte EWMA
+REPLICA_EWMA_ALPHA = float(os.getenv("REPLICA_EWMA_ALPHA", "0.3"))
+# Consecutive failures before a replica is ejected, and the base cool-down (doubles on repeat, max 8x)
+REPLICA_EJECT_FAILURES = int(os.getenv("REPLICA_EJECT_FAILURES", "3"))
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+# Hedge a request to a second replica once it runs past this latency percentile (needs enough samples)
+INFERENCE_HEDGE_ENABLED = os.getenv("INFERENCE_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+INFERENCE_HEDGE_PERCENTILE = float(os.getenv("INFERENCE_HEDGE_PERCENTILE", "95"))
+INFERENCE_HEDGE_MIN_SAMPLES = int(os.getenv("INFERENCE_HEDGE_MIN_SAMPLES", "20"))
+# Replica selection: least_outstanding, or session to keep a conversation on one replica for
+# vLLM prefix-cache reuse (bounded-load consistent hashing on the session id or prompt prefix)
+REPLICA_ROUTING = os.getenv("REPLICA_ROUTING", "least_outstanding").lower()
+# Routing key in session mode: "session" (chat session id) or "prefix" (hash of system prompt + oldest turns)
+REPLICA_AFFINITY_KEY = os.getenv("REPLICA_AFFINITY_KEY", "session").lower()
+REPLICA_HASH_VNODES = int(os.getenv("REPLICA_HASH_VNODES", "100"))
+# A replica may take at most this multiple of the average in-flight load before sessions spill over
+REPLICA_LOAD_FACTOR = float(os.getenv("REPLICA_LOAD_FACTOR", "1.25"))
+
+# Context-window budgeting (see services/context_budget.py): the served model's max_model_len,
+# minus a margin for chat-template tokens the local count can miss
+MAX_MODEL_LEN = int(os.getenv("MAX_MODEL_LEN", "4096"))
+CONTEXT_SAFETY_MARGIN = int(os.getenv("CONTEXT_SAFETY_MARGIN", "64"))
+# Prompt tokens charged per attached image (Gemma 3 encodes each image as 256 soft tokens)
+IMAGE_TOKEN_ESTIMATE = int(os.getenv("IMAGE_TOKEN_ESTIMATE", "256"))
+
+# Micro-batched retrieval (see services/retrieval.py): queries arriving within the window
+# are embedded and searched together, up to the batch size, on a dedicated thread pool
+RETRIEVAL_BATCH_WINDOW_MS = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "5"))
+RETRIEVAL_MAX_BATCH = int(os.getenv("RETRIEVAL_MAX_BATCH", "32"))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "2"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+
+# Vector DB caches (see utils/vector_db.py), cleared whenever a different index is loaded
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+SEARCH_RESULT_CACHE_SIZE = int(os.getenv("SEARCH_RESULT_CACHE_SIZE", "4096"))
+
+# Query encoder (see utils/vector_db.py): "torch" (sentence-transformers) or "onnx", an int8
+# ONNX Runtime export of the same model made with `python -m benchmarks.embedding_backends export`
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "sentence-transformers/all-mpnet-base-v2")
+ONNX_EMBEDDING_PATH = os.getenv("ONNX_EMBEDDING_PATH", "models/onnx/all-mpnet-base-v2-int8")
+ONNX_EMBEDDING_THREADS = int(os.getenv("ONNX_EMBEDDING_THREADS", "4"))
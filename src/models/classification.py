@@ -7,6 +7,7 @@ from sklearn.metrics.pairwise import cosine_similarity
 import logging
 import re
 import textwrap
+from collections import deque
 
 logger = logging.getLogger(__name__)
 
@@ -276,7 +277,8 @@ class PromptClassifier:
             "current_agent": None,
             "previous_messages": [],
             "collected_context": {},
-            "intent_history": []
+            # Bounded: the classifier instance is shared across sessions
+            "intent_history": deque(maxlen=100)
         }
         
         # Initialize email templates
@@ -0,0 +1,185 @@
+"""
+Admission control in front of the inference backend.
+
+Bounds how many generations reach vLLM at once (globally and per agent
+type), queues the rest by priority in a bounded wait queue, and rejects
+immediately with a retry-after hint when the queue is full, instead of
+letting every request slow down together until they all time out.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from config.settings import (
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_BULKHEADS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "agent_type", "future", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, agent_type: str, future: "asyncio.Future"):
+        self.priority = priority
+        self.seq = seq
+        self.agent_type = agent_type
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Global concurrency limit, per-agent-type bulkheads and a bounded priority wait queue"""
+
+    def __init__(
+        self,
+        max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        bulkheads: Optional[Dict[str, int]] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.bulkheads = dict(ADMISSION_BULKHEADS if bulkheads is None else bulkheads)
+        self.in_flight = 0
+        self.in_flight_by_type: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        # Exponentially weighted average of how long an admitted request holds its slot
+        self._avg_service_time = 5.0
+        self.stats: Dict[str, float] = {
+            "admitted": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self, agent_type: str) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        limit = self.bulkheads.get(agent_type)
+        return limit is None or self.in_flight_by_type.get(agent_type, 0) < limit
+
+    def _acquire(self, agent_type: str) -> None:
+        self.in_flight += 1
+        self.in_flight_by_type[agent_type] = self.in_flight_by_type.get(agent_type, 0) + 1
+
+    def _release(self, agent_type: str, held_for: float) -> None:
+        self.in_flight -= 1
+        self.in_flight_by_type[agent_type] -= 1
+        self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * held_for
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant freed slots to the highest-priority waiters whose bulkhead has room"""
+        for waiter in sorted(self._waiters, key=lambda w: (w.priority, w.seq)):
+            if self.in_flight >= self.max_concurrency:
+                break
+            if waiter.future.done() or not self._has_capacity(waiter.agent_type):
+                continue
+            self._waiters.remove(waiter)
+            self._acquire(waiter.agent_type)
+            waiter.future.set_result(None)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Leave the queue, handing back a slot that was granted just as the caller gave up"""
+        if waiter.future.done() and not waiter.future.cancelled():
+            self._release(waiter.agent_type, 0.0)
+        else:
+            waiter.future.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def retry_after(self) -> float:
+        """Rough time until a new request could be served"""
+        backlog = self.queue_depth + 1
+        return round(max(1.0, self._avg_service_time * backlog / max(1, self.max_concurrency)), 1)
+
+    def _record_wait(self, waited: float) -> None:
+        self.stats["admitted"] += 1
+        self.stats["total_wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+
+    @asynccontextmanager
+    async def admit(self, agent_type: str, priority: int = PRIORITY_INTERACTIVE):
+        """Hold an inference slot for the duration of the block"""
+        agent_type = str(getattr(agent_type, "value", agent_type))
+        if not self._waiters and self._has_capacity(agent_type):
+            self._acquire(agent_type)
+            self._record_wait(0.0)
+        else:
+            if self.queue_depth >= self.max_queue:
+                self.stats["rejected"] += 1
+                retry_after = self.retry_after()
+                logger.warning(f"Admission queue full ({self.queue_depth}); rejecting {agent_type} request")
+                raise AdmissionRejected("Inference queue is full", retry_after)
+
+            waiter = _Waiter(priority, next(self._seq), agent_type, asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            # Another agent type's bulkhead may be what's blocking the queue head
+            self._dispatch()
+            # Not wait_for: before Python 3.12 it swallows a cancellation that races the grant
+            try:
+                done, _ = await asyncio.wait([waiter.future], timeout=self.queue_timeout)
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            if not done:
+                self._abandon(waiter)
+                self.stats["timed_out"] += 1
+                raise AdmissionRejected("Timed out waiting for an inference slot", self.retry_after())
+            waited = time.monotonic() - waiter.enqueued_at
+            self._record_wait(waited)
+            logger.info(f"Admitted {agent_type} request after {waited:.2f}s in queue")
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(agent_type, time.monotonic() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current queue depth, in-flight counts and wait-time stats"""
+        admitted = self.stats["admitted"]
+        return {
+            "in_flight": self.in_flight,
+            "in_flight_by_type": dict(self.in_flight_by_type),
+            "queue_depth": self.queue_depth,
+            "avg_wait_seconds": self.stats["total_wait_seconds"] / admitted if admitted else 0.0,
+            **self.stats,
+        }
+
+
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide admission controller"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
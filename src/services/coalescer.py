@@ -0,0 +1,104 @@
+"""
+Single-flight coalescing of identical in-flight generations.
+
+When the same (agent, prompt, context) request is already being generated,
+later callers subscribe to that generation's token stream instead of
+issuing another vLLM request. Late subscribers first receive the tokens
+produced so far, then follow the live stream.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class _Flight:
+    """One in-flight generation and its subscribers"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        # Replay and registration happen in one synchronous step, so no token is missed
+        queue: asyncio.Queue = asyncio.Queue()
+        for token in self.tokens:
+            queue.put_nowait(token)
+        if self.done:
+            queue.put_nowait(_END)
+        else:
+            self.subscribers.append(queue)
+        return queue
+
+    def publish(self, item) -> None:
+        if item is not _END:
+            self.tokens.append(item)
+        for queue in self.subscribers:
+            queue.put_nowait(item)
+
+
+class StreamCoalescer:
+    """Fans one token stream out to every caller that asks for the same key"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.stats: Dict[str, int] = {"leaders": 0, "followers": 0}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def _produce(self, key: str, flight: _Flight, factory: Callable[[], AsyncIterator[str]]) -> None:
+        try:
+            async for token in factory():
+                flight.publish(token)
+        except BaseException as e:
+            flight.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            flight.done = True
+            flight.publish(_END)
+            self._flights.pop(key, None)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Yield the tokens of the generation for key, starting it only if none is in flight"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            # The generation runs in its own task so it survives any single subscriber disconnecting
+            flight.task = asyncio.ensure_future(self._produce(key, flight, factory))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["followers"] += 1
+            logger.info(f"Coalesced request onto in-flight generation ({len(flight.subscribers) + 1} subscribers)")
+
+        queue = flight.subscribe()
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                yield item
+        finally:
+            if queue in flight.subscribers:
+                flight.subscribers.remove(queue)
+        if flight.error is not None and not isinstance(flight.error, asyncio.CancelledError):
+            raise flight.error
+
+
+_coalescer: Optional[StreamCoalescer] = None
+
+
+def get_coalescer() -> StreamCoalescer:
+    """Return the process-wide stream coalescer"""
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = StreamCoalescer()
+    return _coalescer
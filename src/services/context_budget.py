@@ -0,0 +1,113 @@
+"""
+Context-window budgeting for outgoing requests.
+
+Nothing used to check that the system prompt, up to five retrieved chunks,
+the history and the decode budget fit in the model's context, so oversized
+requests were rejected by vLLM and then retried. Each request is now
+measured with the cached tokenizer before it is sent. If it is over budget,
+the lowest-scoring chunks go first, then the oldest history turns (in
+user/assistant pairs), then the summary, and as a last resort max_tokens
+shrinks. Anything dropped is logged.
+"""
+import logging
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel, Field
+
+from config.settings import MAX_MODEL_LEN, CONTEXT_SAFETY_MARGIN, IMAGE_TOKEN_ESTIMATE
+from config.generation_profiles import MIN_GENERATION_TOKENS
+from services.prompt_assembly import CONTEXT_HEADER, QUESTION_HEADER, SUMMARY_HEADER
+from utils.tokenizer import count_message_tokens, count_tokens, MESSAGE_OVERHEAD_TOKENS
+
+logger = logging.getLogger(__name__)
+
+
+class ContextBudgetExceeded(Exception):
+    """The system prompt and question alone don't fit in the context window"""
+
+
+class BudgetResult(BaseModel):
+    """What survived budgeting for one request"""
+    chunks: List[Tuple[str, float]] = Field(default_factory=list, description="Kept (text, score) chunks")
+    history: List[Dict[str, Any]] = Field(default_factory=list, description="Kept history turns")
+    summary: str = Field("", description="Kept rolling summary")
+    max_tokens: int = Field(..., description="Decode budget that fits")
+    prompt_tokens: int = Field(..., description="Estimated prompt tokens after trimming")
+    dropped_chunks: int = Field(0, description="Chunks removed")
+    dropped_turns: int = Field(0, description="History messages removed")
+
+
+def _content_tokens(content: Any) -> int:
+    if isinstance(content, list):
+        images = sum(1 for part in content if part.get("type") == "image_url")
+        text = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        return count_tokens(text) + images * IMAGE_TOKEN_ESTIMATE
+    return count_tokens(content or "")
+
+
+def fit_context(
+    system_prompt: str,
+    question: Any,
+    history: List[Dict[str, Any]],
+    summary: str,
+    chunks: List[Tuple[str, float]],
+    max_tokens: int,
+    max_model_len: int = MAX_MODEL_LEN,
+) -> BudgetResult:
+    """Trim chunks, history, summary and finally max_tokens until the request fits the context window"""
+    limit = max_model_len - CONTEXT_SAFETY_MARGIN
+    # Fixed cost: system message, user message with its question and context/question headers
+    fixed = (
+        count_tokens(system_prompt) + _content_tokens(question)
+        + count_tokens(CONTEXT_HEADER + QUESTION_HEADER) + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+    kept = [(chunk, count_tokens(chunk[0]) + 1) for chunk in chunks]
+    history = list(history)
+    history_cost = count_message_tokens(history)
+    summary_cost = count_tokens(SUMMARY_HEADER + summary) if summary else 0
+
+    def prompt_tokens() -> int:
+        return fixed + sum(cost for _, cost in kept) + history_cost + summary_cost
+
+    dropped_chunks: List[Tuple[str, float]] = []
+    # Lowest-scoring chunks first
+    while kept and prompt_tokens() + max_tokens > limit:
+        worst = min(range(len(kept)), key=lambda i: kept[i][0][1])
+        dropped_chunks.append(kept.pop(worst)[0])
+
+    # Then the oldest history, a user/assistant pair at a time
+    dropped_turns = 0
+    while history and prompt_tokens() + max_tokens > limit:
+        pair, history = history[:2], history[2:]
+        history_cost -= count_message_tokens(pair)
+        dropped_turns += len(pair)
+
+    dropped_summary = False
+    if summary and prompt_tokens() + max_tokens > limit:
+        summary, summary_cost, dropped_summary = "", 0, True
+
+    requested = max_tokens
+    if prompt_tokens() + max_tokens > limit:
+        max_tokens = max(MIN_GENERATION_TOKENS, limit - prompt_tokens())
+    if prompt_tokens() + max_tokens > limit:
+        raise ContextBudgetExceeded(
+            f"Prompt needs {prompt_tokens()} tokens; only {limit - MIN_GENERATION_TOKENS} fit with the minimum "
+            f"decode budget of {MIN_GENERATION_TOKENS}"
+        )
+
+    if dropped_chunks or dropped_turns or dropped_summary or max_tokens != requested:
+        logger.warning(
+            f"Request over the {max_model_len}-token context window; dropped {len(dropped_chunks)} chunk(s) "
+            f"(scores {[round(score, 3) for _, score in dropped_chunks]}), {dropped_turns} history message(s)"
+            f"{', the summary' if dropped_summary else ''}; max_tokens {requested} -> {max_tokens}; "
+            f"prompt ~{prompt_tokens()} tokens"
+        )
+    return BudgetResult(
+        chunks=[chunk for chunk, _ in kept],
+        history=history,
+        summary=summary,
+        max_tokens=max_tokens,
+        prompt_tokens=prompt_tokens(),
+        dropped_chunks=len(dropped_chunks),
+        dropped_turns=dropped_turns,
+    )
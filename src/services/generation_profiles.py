@@ -0,0 +1,95 @@
+"""
+Per-agent and per-intent generation profiles.
+
+A single MAX_TOKENS/TEMPERATURE for every agent truncated long-form answers
+and let short-answer agents run on. Each request now gets max_tokens,
+temperature and stop sequences from its agent's profile, adjusted by the
+question's intent (code, long-form, brief) and by an explicit length
+request such as "in 300 words" or "two pages".
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from config.generation_profiles import (
+    GENERATION_PROFILES,
+    DEFAULT_GENERATION_PROFILE,
+    INTENT_PROFILES,
+    MIN_GENERATION_TOKENS,
+    MAX_GENERATION_TOKENS,
+    TOKENS_PER_WORD,
+    LENGTH_REQUEST_HEADROOM,
+    WORDS_PER_PAGE,
+)
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "half a": 0.5}
+_WORD_COUNT = re.compile(r"\b(\d{2,4})\s*(?:-\s*)?words?\b")
+_PAGE_COUNT = re.compile(r"\b(\d{1,2}|one|two|three|four|five|half a)\s*(?:-\s*)?pages?\b")
+_INTENT_PATTERNS = [
+    (profile, [re.compile(pattern) for pattern in profile["patterns"]]) for profile in INTENT_PROFILES
+]
+
+
+class GenerationProfile(BaseModel):
+    """Sampling parameters chosen for one generation"""
+    agent_type: str = Field(..., description="Agent type the profile was selected for")
+    intent: Optional[str] = Field(None, description="Matched intent override, if any")
+    max_tokens: int = Field(..., description="Decode budget for this request")
+    temperature: float = Field(..., description="Sampling temperature")
+    stop: List[str] = Field(default_factory=list, description="Stop sequences")
+
+    def request_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_tokens": self.max_tokens, "temperature": self.temperature}
+        if self.stop:
+            kwargs["stop"] = self.stop
+        return kwargs
+
+
+def predict_length(question: str) -> Optional[int]:
+    """Token budget implied by an explicit length request ("in 300 words", "two pages"), if any"""
+    words = _WORD_COUNT.search(question)
+    if words:
+        return int(int(words.group(1)) * TOKENS_PER_WORD) + LENGTH_REQUEST_HEADROOM
+    pages = _PAGE_COUNT.search(question)
+    if pages:
+        count = pages.group(1)
+        count = float(count) if count.isdigit() else _NUMBER_WORDS[count]
+        return int(count * WORDS_PER_PAGE * TOKENS_PER_WORD) + LENGTH_REQUEST_HEADROOM
+    return None
+
+
+def detect_intent(question: str) -> Optional[Dict[str, Any]]:
+    for profile, patterns in _INTENT_PATTERNS:
+        if any(pattern.search(question) for pattern in patterns):
+            return profile
+    return None
+
+
+def select_profile(agent_type: Any, question: str = "") -> GenerationProfile:
+    """Pick generation parameters for an agent type and the user's question"""
+    agent = str(getattr(agent_type, "value", agent_type))
+    settings = {**DEFAULT_GENERATION_PROFILE, **GENERATION_PROFILES.get(agent, {})}
+    text = (question or "").strip().lower()
+
+    intent = detect_intent(text) if text else None
+    if intent is not None:
+        settings.update({k: v for k, v in intent.items() if k not in ("intent", "patterns")})
+
+    # An explicit length request beats both the agent default and the intent
+    requested = predict_length(text) if text else None
+    if requested is not None:
+        settings["max_tokens"] = requested
+
+    profile = GenerationProfile(
+        agent_type=agent,
+        intent=intent["intent"] if intent else ("length_request" if requested is not None else None),
+        max_tokens=max(MIN_GENERATION_TOKENS, min(MAX_GENERATION_TOKENS, int(settings["max_tokens"]))),
+        temperature=float(settings["temperature"]),
+        stop=list(settings.get("stop") or []),
+    )
+    logger.debug(f"Generation profile: {profile}")
+    return profile
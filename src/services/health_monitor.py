@@ -0,0 +1,229 @@
+"""
+Background health monitor and circuit breaker for the inference backend.
+
+A single task probes the vLLM server on an interval and publishes a cached
+state, so the request path never has to make its own round trip to check it.
+The same loop reloads the FAISS index when ingest.py rebuilds it on disk.
+"""
+import asyncio
+import logging
+import time
+from enum import Enum
+from typing import Optional
+
+from config.settings import (
+    HEALTH_CHECK_INTERVAL,
+    HEALTH_CHECK_TIMEOUT,
+    HEALTH_DEGRADED_LATENCY,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    VECTOR_DB_RELOAD_INTERVAL,
+)
+from services.inference_client import get_inference_client
+
+logger = logging.getLogger(__name__)
+
+
+class HealthState(str, Enum):
+    """Cached health of the inference backend"""
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    DOWN = "down"
+
+
+class BreakerState(str, Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast while the backend is down, letting one trial request through to detect recovery"""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return True if a request may go to the backend"""
+        if self.state == BreakerState.CLOSED:
+            return True
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._trial_in_flight = False
+        # Half-open: only a single trial request at a time
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    @property
+    def trial_in_flight(self) -> bool:
+        return self._trial_in_flight
+
+    def release_trial(self) -> None:
+        """End a half-open trial that finished without a verdict (rejected, bad request, cancelled)"""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != BreakerState.CLOSED:
+            logger.info("Circuit breaker closed; inference backend recovered")
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == BreakerState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != BreakerState.OPEN:
+                logger.warning(
+                    f"Circuit breaker opened after {self.consecutive_failures} consecutive failures"
+                )
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+
+class HealthMonitor:
+    """Probes the inference endpoint in the background and caches the result"""
+
+    def __init__(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+        degraded_latency: float = HEALTH_DEGRADED_LATENCY,
+        breaker: Optional[CircuitBreaker] = None,
+        index_check_interval: float = VECTOR_DB_RELOAD_INTERVAL,
+    ):
+        self.interval = interval
+        self.index_check_interval = index_check_interval
+        self.timeout = timeout
+        self.degraded_latency = degraded_latency
+        self.breaker = breaker or CircuitBreaker()
+        self.state = HealthState.HEALTHY
+        self.last_latency: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_checked: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._index_checked = 0.0
+
+    def start(self) -> None:
+        """Start the background probe loop on the running event loop (idempotent)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Health monitor started (interval={self.interval}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            # Per-replica prefix-cache hit rates ride along with the probe (exported via /metrics)
+            await get_inference_client().scrape_prefix_cache(timeout=self.timeout)
+            await self.check_index()
+            await asyncio.sleep(self.interval)
+
+    async def check_index(self) -> bool:
+        """Reload the FAISS index if it changed on disk (at most every index_check_interval); True if reloaded"""
+        now = time.monotonic()
+        if not self.index_check_interval or now - self._index_checked < self.index_check_interval:
+            return False
+        self._index_checked = now
+        # Imported here so the monitor doesn't pull in the embedding stack on import
+        from utils.vector_db import get_vector_db
+
+        vector_db = get_vector_db(block=False)
+        if vector_db is None:
+            # Still loading at startup; the initial load picks up the latest index anyway
+            return False
+        try:
+            reloaded = await asyncio.to_thread(vector_db.reload_if_changed)
+        except Exception as e:
+            # e.g. ingest.py is still writing; keep serving the loaded index and retry next time
+            logger.warning(f"FAISS index reload failed, still serving version {vector_db.index_version}: {str(e)}")
+            return False
+        if reloaded:
+            logger.info(f"FAISS index reloaded (version {vector_db.index_version})")
+        return reloaded
+
+    async def probe(self) -> HealthState:
+        """Probe every replica and update the cached state; the breaker only counts a failure if none answered"""
+        started = time.monotonic()
+        try:
+            await get_inference_client().list_models(timeout=self.timeout)
+            self.last_latency = time.monotonic() - started
+            self.last_error = None
+            self.breaker.record_success()
+            new_state = (
+                HealthState.DEGRADED if self.last_latency > self.degraded_latency else HealthState.HEALTHY
+            )
+        except Exception as e:
+            self.last_latency = None
+            self.last_error = str(e)
+            self.breaker.record_failure()
+            new_state = (
+                HealthState.DOWN if self.breaker.state == BreakerState.OPEN else HealthState.DEGRADED
+            )
+        finally:
+            self.last_checked = time.time()
+
+        if new_state != self.state:
+            logger.info(f"Inference backend health changed: {self.state.value} -> {new_state.value}")
+        self.state = new_state
+        return new_state
+
+    def allow_request(self) -> bool:
+        """Request-path gate: reads cached breaker state, never probes"""
+        return self.breaker.allow_request()
+
+    def is_trial(self) -> bool:
+        """Whether the request just allowed through is the breaker's half-open trial"""
+        return self.breaker.state == BreakerState.HALF_OPEN and self.breaker.trial_in_flight
+
+    def release_trial(self) -> None:
+        """Release a half-open trial that ended without success or failure being recorded"""
+        self.breaker.release_trial()
+
+    def record_success(self) -> None:
+        """Report a successful inference call from the request path"""
+        self.breaker.record_success()
+        if self.state == HealthState.DOWN:
+            self.state = HealthState.DEGRADED
+
+    def record_failure(self) -> None:
+        """Report a failed inference call from the request path"""
+        self.breaker.record_failure()
+        if self.breaker.state == BreakerState.OPEN:
+            self.state = HealthState.DOWN
+
+    def is_available(self) -> bool:
+        return self.state != HealthState.DOWN
+
+
+_health_monitor: Optional[HealthMonitor] = None
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Return the process-wide health monitor"""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = HealthMonitor()
+    return _health_monitor
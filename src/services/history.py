@@ -0,0 +1,146 @@
+"""
+Token-budgeted conversation history with a rolling background summary.
+
+Recent turns are sent verbatim up to HISTORY_TOKEN_BUDGET tokens; anything
+older is folded into a summary by a background task after each reply, so
+prefill cost per turn stays flat as a conversation grows.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.settings import (
+    MODEL_ID,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_MAX_TOKENS,
+    MAX_HISTORY_MESSAGES,
+)
+from services.inference_client import get_inference_client
+from services.admission import get_admission_controller, PRIORITY_BACKGROUND
+from utils.tokenizer import count_tokens, MESSAGE_OVERHEAD_TOKENS
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "Summarize the following conversation between a UNT student and an assistant. "
+    "Keep names, programs, dates, deadlines and any decisions or open requests. "
+    "Be concise and do not add new facts.\n\n"
+)
+
+
+# In-flight summary tasks by session id; a HistoryManager is rebuilt from session state
+# on every message, so the "one summary at a time" guard can't live on the instance
+_summary_tasks: Dict[str, "asyncio.Task"] = {}
+
+
+def _forget_summary(session_id: str, task: "asyncio.Task") -> None:
+    if _summary_tasks.get(session_id) is task:
+        del _summary_tasks[session_id]
+
+
+class HistoryManager:
+    """Per-session conversation history bounded by a token budget"""
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        summary_max_tokens: int = HISTORY_SUMMARY_MAX_TOKENS,
+    ):
+        self.token_budget = token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self.turns: List[Dict[str, Any]] = []
+        self.summary = ""
+        self._summary_task: Optional[asyncio.Task] = None
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        """Record a completed user/assistant exchange"""
+        for role, content in (("user", user), ("assistant", assistant)):
+            self.turns.append({
+                "role": role,
+                "content": content,
+                "tokens": count_tokens(content) + MESSAGE_OVERHEAD_TOKENS,
+            })
+        # Hard memory bound (whole pairs) in case summarization keeps failing
+        del self.turns[:-(MAX_HISTORY_MESSAGES - MAX_HISTORY_MESSAGES % 2)]
+
+    def _split_index(self) -> int:
+        """Index of the first turn kept verbatim: newest user/assistant pairs that fit the budget"""
+        used = 0
+        index = len(self.turns)
+        # Walk back a pair at a time so the window always starts on a user turn
+        while index >= 2:
+            pair_tokens = self.turns[index - 2]["tokens"] + self.turns[index - 1]["tokens"]
+            if used + pair_tokens > self.token_budget:
+                break
+            used += pair_tokens
+            index -= 2
+        return index
+
+    def get_messages(self) -> List[Dict[str, str]]:
+        """Recent turns that fit the token budget, oldest first"""
+        return [
+            {"role": turn["role"], "content": turn["content"]}
+            for turn in self.turns[self._split_index():]
+        ]
+
+    def get_summary(self) -> str:
+        return self.summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"turns": self.turns, "summary": self.summary}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HistoryManager":
+        history = cls()
+        history.turns = list(data.get("turns", []))
+        history.summary = data.get("summary", "")
+        return history
+
+    def schedule_summary(
+        self, on_done: Optional[Callable[[], Awaitable[None]]] = None, session_id: Optional[str] = None
+    ) -> None:
+        """Summarize turns that fell out of the budget in the background (call after each reply).
+
+        ``on_done`` runs after a new summary is stored, e.g. to persist session state.
+        With ``session_id``, at most one summary runs per session across rebuilt managers.
+        """
+        running = _summary_tasks.get(session_id) if session_id is not None else self._summary_task
+        if running is not None and not running.done():
+            return
+        if self._split_index() == 0:
+            return
+        task = asyncio.ensure_future(self._summarize(on_done))
+        self._summary_task = task
+        if session_id is not None:
+            _summary_tasks[session_id] = task
+            task.add_done_callback(lambda done: _forget_summary(session_id, done))
+
+    async def _summarize(self, on_done: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        split = self._split_index()
+        overflow = self.turns[:split]
+        if not overflow:
+            return
+        transcript = "\n".join(f"{t['role'].title()}: {t['content']}" for t in overflow)
+        if self.summary:
+            transcript = f"Earlier summary: {self.summary}\n\n{transcript}"
+        try:
+            # Background work yields to interactive requests in the admission queue
+            async with get_admission_controller().admit("summary", priority=PRIORITY_BACKGROUND):
+                response = await get_inference_client().chat_completion(
+                    model=MODEL_ID,
+                    messages=[{"role": "user", "content": SUMMARY_PROMPT + transcript}],
+                    max_tokens=self.summary_max_tokens,
+                    temperature=0.0,
+                )
+            summary = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.warning(f"History summarization failed, keeping turns: {str(e)}")
+            return
+        if summary:
+            self.summary = summary
+            # Drop exactly the turns that were summarized; new turns may have arrived meanwhile
+            summarized = {id(t) for t in overflow}
+            self.turns = [t for t in self.turns if id(t) not in summarized]
+            logger.info(f"Summarized {len(overflow)} history messages into {count_tokens(summary)} tokens")
+            if on_done is not None:
+                await on_done()
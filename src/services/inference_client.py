@@ -0,0 +1,330 @@
+"""
+Shared async inference client for the vLLM OpenAI-compatible server.
+
+All agents, the query rewriter and health checks go through one pooled
+HTTP connection layer instead of building their own OpenAI clients.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI
+
+from config.settings import (
+    INFERENCE_SERVER_URLS,
+    REQUEST_TIMEOUT,
+    INFERENCE_POOL_SIZE,
+    INFERENCE_KEEPALIVE_CONNECTIONS,
+    INFERENCE_KEEPALIVE_EXPIRY,
+    INFERENCE_CONNECT_TIMEOUT,
+    INFERENCE_HTTP2,
+    INFERENCE_RECORD_PATH,
+    INFERENCE_HEDGE_ENABLED,
+    REPLICA_AFFINITY_KEY,
+)
+from services.replica_router import Replica, ReplicaRouter, metrics_url
+from services.traffic_recorder import RecordingStream, get_traffic_recorder
+from utils.tracing import get_request_id, REQUEST_ID_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Session-affinity routing key for the current request (see bind_routing_key)
+_routing_key: ContextVar[Optional[str]] = ContextVar("routing_key", default=None)
+
+
+def bind_routing_key(key: Optional[str]) -> None:
+    """Route this request's completions by the given key (normally the chat session id)"""
+    _routing_key.set(key)
+
+
+def prefix_routing_key(messages: List[Dict[str, Any]]) -> str:
+    """Hash of the system prompt and the oldest turn, which stay stable across a conversation"""
+    prefix = [m.get("content") for m in messages[:-1][:3]]
+    return hashlib.sha1(json.dumps(prefix, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx requires the optional `h2` package"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def is_replica_fault(error: BaseException) -> bool:
+    """Connection failures, timeouts and 5xx count against a replica; 4xx are the request's fault"""
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    # APITimeoutError is an APIConnectionError
+    return isinstance(error, (APIConnectionError, httpx.TransportError, asyncio.TimeoutError))
+
+
+class _TrackedStream:
+    """Streaming response that holds its replica's in-flight slot until fully consumed or closed"""
+
+    def __init__(self, router: ReplicaRouter, replica: Replica, response: Any, iterator: Any, first: Any):
+        self._router = router
+        self._replica = replica
+        self._response = response
+        self._iterator = iterator
+        self._first = first
+        self._released = False
+
+    def _release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._router.finish(self._replica)
+
+    def __aiter__(self) -> "_TrackedStream":
+        return self
+
+    async def __anext__(self):
+        if self._first is not None:
+            chunk, self._first = self._first, None
+            return chunk
+        try:
+            return await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._release()
+            raise
+        except Exception as e:
+            if is_replica_fault(e):
+                self._router.record_failure(self._replica)
+            self._release()
+            raise
+
+    async def aclose(self) -> None:
+        self._release()
+        close = getattr(self._response, "close", None)
+        if close is not None:
+            await close()
+
+    def __del__(self):
+        # An abandoned stream must not keep counting against its replica
+        self._release()
+
+
+class InferenceClient:
+    """Async OpenAI-compatible client over one or more vLLM replicas sharing a pooled transport"""
+
+    def __init__(
+        self,
+        base_urls: Optional[List[str]] = None,
+        pool_size: int = INFERENCE_POOL_SIZE,
+        keepalive_connections: int = INFERENCE_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = INFERENCE_KEEPALIVE_EXPIRY,
+        request_timeout: float = REQUEST_TIMEOUT,
+        connect_timeout: float = INFERENCE_CONNECT_TIMEOUT,
+        http2: bool = INFERENCE_HTTP2,
+        record_path: Optional[str] = INFERENCE_RECORD_PATH,
+        hedge: bool = INFERENCE_HEDGE_ENABLED,
+    ):
+        self.base_urls = list(base_urls or INFERENCE_SERVER_URLS)
+        self.request_timeout = request_timeout
+        # A slow request is duplicated to a second replica past the hedge percentile
+        self.hedge = hedge and len(self.base_urls) > 1
+        # Completions are recorded for replay benchmarks when a path is set
+        self.recorder = get_traffic_recorder(record_path)
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.info("HTTP/2 requested but `h2` is not installed; using HTTP/1.1 keep-alive")
+
+        # One pool shared by all replicas; httpx keeps per-host connections within it
+        self._http_client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(request_timeout, connect=connect_timeout),
+        )
+        # Retries are handled by the callers (see BaseAgent.stream_response)
+        self.router = ReplicaRouter([
+            Replica(url, AsyncOpenAI(
+                api_key="EMPTY",  # vLLM doesn't require an actual API key
+                base_url=url,
+                http_client=self._http_client,
+                timeout=request_timeout,
+                max_retries=0,
+            ))
+            for url in self.base_urls
+        ])
+        logger.info(
+            f"Inference client for {', '.join(self.base_urls)} (pool={pool_size}, "
+            f"keepalive={keepalive_connections}, http2={self.http2}, hedge={self.hedge})"
+        )
+
+    async def _attempt(self, replica: Replica, request: Dict[str, Any]):
+        """Send one request to one replica; streams are returned once their first chunk arrives"""
+        self.router.start(replica)
+        started = time.perf_counter()
+        try:
+            response = await replica.client.chat.completions.create(**request)
+            first = iterator = None
+            if request.get("stream"):
+                iterator = response.__aiter__()
+                try:
+                    first = await iterator.__anext__()
+                except StopAsyncIteration:
+                    pass
+        except asyncio.CancelledError:
+            self.router.finish(replica)
+            raise
+        except Exception as e:
+            if is_replica_fault(e):
+                self.router.record_failure(replica)
+            self.router.finish(replica)
+            raise
+        self.router.record_latency(replica, time.perf_counter() - started)
+        if iterator is None:
+            self.router.finish(replica)
+            return response
+        return _TrackedStream(self.router, replica, response, iterator, first)
+
+    @staticmethod
+    def _discard(task: "asyncio.Future") -> None:
+        """Cancel a losing hedge attempt, closing its stream if it got one anyway"""
+        def close_result(done: "asyncio.Future") -> None:
+            if not done.cancelled() and done.exception() is None and isinstance(done.result(), _TrackedStream):
+                asyncio.ensure_future(done.result().aclose())
+        task.cancel()
+        task.add_done_callback(close_result)
+
+    async def _routed(self, request: Dict[str, Any], routing_key: Optional[str] = None):
+        primary = self.router.choose(key=routing_key)
+        first = asyncio.ensure_future(self._attempt(primary, request))
+        delay = self.router.hedge_delay(primary) if self.hedge else None
+        if delay is None:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                tasks.remove(first)
+                return first.result()
+            secondary = self.router.choose(exclude=primary, key=routing_key)
+            if secondary is None:
+                tasks.remove(first)
+                return await first
+            secondary.stats["hedges"] += 1
+            logger.info(f"Hedging request to {secondary.url}; {primary.url} exceeded {delay:.2f}s")
+            tasks.append(asyncio.ensure_future(self._attempt(secondary, request)))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        tasks.remove(task)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Whatever was not returned (the hedge loser, or everything on cancellation) is released
+            for task in tasks:
+                if not task.done() or (not task.cancelled() and task.exception() is None):
+                    self._discard(task)
+
+    async def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        timeout: Optional[float] = None,
+        routing_key: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        """Create a chat completion on the best replica; pass stream=True to get an async chunk iterator.
+
+        ``routing_key`` pins related requests to one replica in session routing
+        mode; it defaults to the bound session id or a hash of the prompt prefix.
+        """
+        # Tag the request with the trace id so vLLM logs can be joined with our traces
+        request_id = get_request_id()
+        if request_id is not None:
+            kwargs["extra_headers"] = {REQUEST_ID_HEADER: request_id, **(kwargs.get("extra_headers") or {})}
+        started = time.perf_counter()
+        request = {
+            "model": model,
+            "messages": messages,
+            "timeout": timeout if timeout is not None else self.request_timeout,
+            **kwargs,
+        }
+        if routing_key is None and self.router.mode == "session":
+            routing_key = _routing_key.get() if REPLICA_AFFINITY_KEY == "session" else None
+            routing_key = routing_key or prefix_routing_key(messages)
+        response = await self._routed(request, routing_key)
+        if self.recorder is None:
+            return response
+        if kwargs.get("stream"):
+            return RecordingStream(response, self.recorder, request, started)
+        content = (response.choices[0].message.content or "") if response.choices else ""
+        elapsed = time.perf_counter() - started
+        await self.recorder.save(request, [content], elapsed, [], elapsed)
+        return response
+
+    async def list_models(self, timeout: Optional[float] = None):
+        """List served models on every replica; used as a lightweight liveness probe.
+
+        Each replica's result feeds its ejection state, so ejected replicas are
+        re-admitted as soon as they answer. Returns the first successful listing
+        and raises only if no replica responded.
+        """
+        timeout = timeout if timeout is not None else self.request_timeout
+
+        async def probe(replica: Replica):
+            try:
+                models = await replica.client.models.list(timeout=timeout)
+            except Exception as e:
+                if is_replica_fault(e):
+                    self.router.record_failure(replica)
+                raise
+            self.router.record_success(replica)
+            return models
+
+        results = await asyncio.gather(
+            *(probe(replica) for replica in self.router.replicas), return_exceptions=True
+        )
+        for result in results:
+            if not isinstance(result, BaseException):
+                return result
+        raise results[0]
+
+    async def scrape_prefix_cache(self, timeout: Optional[float] = None) -> None:
+        """Refresh each replica's prefix-cache hit rate from its vLLM /metrics endpoint"""
+        async def scrape(replica: Replica) -> None:
+            try:
+                response = await self._http_client.get(metrics_url(replica.url), timeout=timeout)
+                response.raise_for_status()
+                replica.update_prefix_cache(response.text)
+            except Exception as e:
+                logger.debug(f"Prefix-cache metrics unavailable from {replica.url}: {str(e)}")
+
+        await asyncio.gather(*(scrape(replica) for replica in self.router.replicas))
+
+    def replica_snapshot(self) -> List[Dict[str, Any]]:
+        """Per-replica load, latency and ejection state"""
+        return self.router.snapshot()
+
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        await self._http_client.aclose()
+
+
+_inference_client: Optional[InferenceClient] = None
+
+
+def get_inference_client() -> InferenceClient:
+    """Return the process-wide shared inference client, creating it on first use"""
+    global _inference_client
+    if _inference_client is None:
+        _inference_client = InferenceClient()
+    return _inference_client
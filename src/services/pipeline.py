@@ -0,0 +1,105 @@
+"""
+Concurrent pre-generation stages for handle_message.
+
+Rewrite, classification and retrieval used to run strictly in sequence.
+Classification and retrieval only need the user's text, so they start on
+the raw input while the rewrite is in flight; their speculative results are
+discarded and recomputed only if the rewrite changes the query materially.
+"""
+import asyncio
+import difflib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from config.settings import PIPELINE_SPECULATION_THRESHOLD
+from models.classification import AgentType
+from services.query_rewriter import get_query_rewriter, normalize_question
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineResult(BaseModel):
+    """Outputs of the pre-generation stages for one message"""
+    refined_input: str = Field(..., description="Question after the optional rewrite")
+    agent_type: Optional[AgentType] = Field(None, description="Detected agent type, if classification ran")
+    context: Optional[List[Tuple[str, float]]] = Field(
+        None, description="Retrieved (text, score) chunks, if retrieval ran"
+    )
+    speculation_discarded: bool = Field(False, description="Whether raw-input results were recomputed")
+    timings: Dict[str, float] = Field(default_factory=dict, description="Per-stage wall time in ms")
+
+
+def is_material_change(original: str, refined: str, threshold: float = PIPELINE_SPECULATION_THRESHOLD) -> bool:
+    """Return True if the rewrite differs enough that raw-input results can't be reused"""
+    a, b = normalize_question(original), normalize_question(refined)
+    if a == b:
+        return False
+    return difflib.SequenceMatcher(None, a, b).ratio() < threshold
+
+
+class MessagePipeline:
+    """Small async stage graph: independent stages run concurrently, each one timed"""
+
+    def __init__(
+        self,
+        classify: Optional[Callable[[str], AgentType]] = None,
+        retrieve: Optional[Callable[[str], Awaitable[List[Tuple[str, float]]]]] = None,
+        rewrite: bool = True,
+    ):
+        # Blocking callables (classify) run on worker threads; coroutine functions (retrieve) are awaited
+        self.classify = classify
+        self.retrieve = retrieve
+        self.rewrite = rewrite
+        self.timings: Dict[str, float] = {}
+
+    async def _timed(self, name: str, awaitable: Awaitable) -> Any:
+        started = time.perf_counter()
+        try:
+            # Stage tasks copy the context when created, so this is a child of the message's trace
+            with span(name):
+                return await awaitable
+        finally:
+            self.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def _start(self, name: str, fn: Optional[Callable], text: str) -> Optional["asyncio.Task"]:
+        if fn is None:
+            return None
+        call = fn(text) if asyncio.iscoroutinefunction(fn) else asyncio.to_thread(fn, text)
+        return asyncio.ensure_future(self._timed(name, call))
+
+    async def run(self, user_input: str) -> PipelineResult:
+        started = time.perf_counter()
+
+        # Stage 1: everything that only needs the raw input starts at once
+        classify_task = self._start("classify", self.classify, user_input)
+        retrieve_task = self._start("retrieve", self.retrieve, user_input)
+        refined_input = user_input
+        if self.rewrite:
+            refined_input = await self._timed("rewrite", get_query_rewriter().rewrite(user_input))
+
+        # Stage 2: throw away speculative work if the rewrite changed the question
+        discarded = self.rewrite and is_material_change(user_input, refined_input)
+        if discarded:
+            for task in (classify_task, retrieve_task):
+                if task is not None:
+                    task.cancel()
+            logger.info("Rewrite changed the query materially; re-running classification and retrieval")
+            classify_task = self._start("classify_refined", self.classify, refined_input)
+            retrieve_task = self._start("retrieve_refined", self.retrieve, refined_input)
+
+        agent_type = await classify_task if classify_task is not None else None
+        context = await retrieve_task if retrieve_task is not None else None
+
+        self.timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"Pipeline stage timings (ms): {self.timings}")
+        return PipelineResult(
+            refined_input=refined_input,
+            agent_type=agent_type,
+            context=context,
+            speculation_discarded=discarded,
+            timings=dict(self.timings),
+        )
@@ -0,0 +1,142 @@
+"""
+Prompt assembly ordered from most to least stable content.
+
+vLLM's automatic prefix caching only reuses KV blocks for a byte-identical
+prefix. Every request is therefore laid out the same way: the shared base
+prompt and the agent's suffix (one system message, with the rolling summary
+appended after them), the history turns, and a final user message holding
+the retrieved context followed by the question. All calls for an agent share
+the system prompt bytes, and successive turns of a conversation share
+everything up to the newest history.
+
+    python -m services.prompt_assembly --question "..." --context-file chunks.txt
+
+prints token counts per prompt section for each agent.
+"""
+import argparse
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from config.prompts import BASE_PROMPT_TEMPLATE
+from utils.tokenizer import count_message_tokens, count_tokens, load_tokenizer, MESSAGE_OVERHEAD_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Fixed separators; changing any of them invalidates every cached prefix
+SUMMARY_HEADER = "\n\nSummary of the earlier conversation:\n"
+CONTEXT_HEADER = "Relevant context:\n"
+QUESTION_HEADER = "\n\nQuestion:\n"
+
+Content = Union[str, List[Dict[str, Any]]]
+
+
+def split_system_prompt(system_prompt: str) -> Dict[str, str]:
+    """Split an agent prompt into the shared base and the agent-specific suffix"""
+    if system_prompt.startswith(BASE_PROMPT_TEMPLATE):
+        return {"base": BASE_PROMPT_TEMPLATE, "agent_suffix": system_prompt[len(BASE_PROMPT_TEMPLATE):]}
+    return {"base": "", "agent_suffix": system_prompt}
+
+
+def format_context(chunks: Optional[Sequence[Tuple[str, float]]]) -> str:
+    """Retrieved (text, score) chunks as the context block, in retrieval order"""
+    if not chunks:
+        return ""
+    return CONTEXT_HEADER + "\n".join(text for text, _ in chunks)
+
+
+def user_content(question: Content, context: Optional[str] = None) -> Content:
+    """Final user message: retrieved context first, then the question"""
+    context = (context or "").strip()
+    if context.startswith(CONTEXT_HEADER.strip()):
+        context = context[len(CONTEXT_HEADER.strip()):].strip()
+    if not context:
+        return question
+    prefix = f"{CONTEXT_HEADER}{context}{QUESTION_HEADER}"
+    if isinstance(question, list):
+        # Multimodal: context goes in front of the question's own parts
+        return [{"type": "text", "text": prefix.rstrip()}] + question
+    return f"{prefix}{question}"
+
+
+def assemble_messages(
+    system_prompt: str,
+    question: Content,
+    history: Sequence[Dict[str, Any]] = (),
+    summary: str = "",
+    context: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Build the chat messages for one request in prefix-cache order"""
+    system = f"{system_prompt}{SUMMARY_HEADER}{summary}" if summary else system_prompt
+    messages: List[Dict[str, Any]] = [{"role": "system", "content": system}]
+    messages.extend({"role": turn["role"], "content": turn["content"]} for turn in history)
+    messages.append({"role": "user", "content": user_content(question, context)})
+    return messages
+
+
+def section_tokens(
+    system_prompt: str,
+    question: str = "",
+    history: Sequence[Dict[str, Any]] = (),
+    summary: str = "",
+    context: Optional[str] = None,
+) -> Dict[str, int]:
+    """Token counts per prompt section, plus the prefix shared by every call for this prompt"""
+    sections = split_system_prompt(system_prompt)
+    messages = assemble_messages(system_prompt, question, history, summary, context)
+    system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+    return {
+        "base": count_tokens(sections["base"]),
+        "agent_suffix": count_tokens(sections["agent_suffix"]),
+        "summary": count_tokens(summary),
+        "history": count_message_tokens(list(history)),
+        "context": count_tokens(context or ""),
+        "question": count_tokens(question),
+        "total": count_message_tokens(messages),
+        "cacheable_prefix": system_tokens,
+    }
+
+
+def prompt_report(
+    question: str = "", context: Optional[str] = None, history: Sequence[Dict[str, Any]] = ()
+) -> List[Dict[str, Any]]:
+    """Per-agent section token counts for the given sample request"""
+    from agents.registry import AGENT_CLASSES
+
+    rows = []
+    for agent_type, agent_class in AGENT_CLASSES.items():
+        agent = agent_class()
+        counts = section_tokens(agent.get_system_prompt(), question, history, context=context)
+        rows.append({"agent": agent_type.value, **counts})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Token counts per prompt section for each agent")
+    parser.add_argument("--question", default="What are the admission requirements for the MS in Computer Science?")
+    parser.add_argument("--context-file", help="Text file with sample retrieved context")
+    parser.add_argument("--history-turns", type=int, default=0,
+                        help="Number of sample user/assistant exchanges to include as history")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # No startup orchestrator here; load the real tokenizer instead of using the estimate
+    load_tokenizer()
+
+    context = None
+    if args.context_file:
+        with open(args.context_file, encoding="utf-8") as f:
+            context = f.read()
+    history = []
+    for _ in range(args.history_turns):
+        history.append({"role": "user", "content": args.question})
+        history.append({"role": "assistant", "content": "- Sample answer bullet point.\n" * 20})
+
+    columns = ["agent", "base", "agent_suffix", "history", "context", "question", "total", "cacheable_prefix"]
+    rows = prompt_report(args.question, context, history)
+    print("  ".join(f"{c:>16}" for c in columns + ["cached_share"]))
+    for row in rows:
+        share = row["cacheable_prefix"] / row["total"] if row["total"] else 0.0
+        print("  ".join(f"{str(row[c]):>16}" for c in columns) + f"  {share:>16.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Query rewrite step with caching, a skip heuristic and a hard latency budget.
+
+Rewriting a question costs a full LLM round trip before classification can
+start, so it is avoided whenever a cheap local check says it will not help.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Dict, Optional
+
+from config.settings import (
+    REWRITE_MODEL_ID,
+    REWRITE_LATENCY_BUDGET,
+    REWRITE_CACHE_SIZE,
+    REWRITE_CACHE_TTL,
+    REWRITE_MIN_WORDS,
+    REWRITE_WELL_FORMED_MAX_WORDS,
+)
+from config.prompts import STARTER_PROMPTS
+from services.inference_client import get_inference_client
+from utils.lru_cache import LRUCache
+from utils.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+REWRITE_PROMPT = "Rewrite the question for clarity without adding new facts:\n\nQuestion: "
+
+# Log a stats summary every this many rewrite requests
+STATS_LOG_INTERVAL = 50
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different questions share a cache entry"""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class QueryRewriter:
+    """Rewrites user questions for clarity, skipping the LLM call whenever possible"""
+
+    def __init__(
+        self,
+        model: str = REWRITE_MODEL_ID,
+        latency_budget: float = REWRITE_LATENCY_BUDGET,
+        cache_size: int = REWRITE_CACHE_SIZE,
+        cache_ttl: int = REWRITE_CACHE_TTL,
+    ):
+        self.model = model
+        self.latency_budget = latency_budget
+        self.cache_ttl = cache_ttl
+        self.cache = LRUCache(max_size=cache_size, ttl=cache_ttl)
+        self.known_questions = {normalize_question(s["message"]) for s in STARTER_PROMPTS}
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "hits": 0,
+            "skips": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "rewrites": 0,
+        }
+
+    def should_skip(self, question: str) -> bool:
+        """Cheap local gate: known, very short or already well-formed questions are not rewritten"""
+        normalized = normalize_question(question)
+        if normalized in self.known_questions:
+            return True
+        words = normalized.split()
+        if len(words) < REWRITE_MIN_WORDS:
+            return True
+        stripped = question.strip()
+        well_formed = (
+            stripped[:1].isupper()
+            and stripped[-1:] in ("?", ".")
+            and not re.search(r"[?!.]{2,}", stripped)
+            and len(words) <= REWRITE_WELL_FORMED_MAX_WORDS
+        )
+        return well_formed
+
+    async def rewrite(self, question: str) -> str:
+        """Return the rewritten question, or the original if skipped, slow or failed"""
+        self.stats["requests"] += 1
+        try:
+            if self.should_skip(question):
+                self.stats["skips"] += 1
+                return question
+
+            normalized = normalize_question(question)
+            cached = await self._cache_get(normalized)
+            if cached:
+                self.stats["hits"] += 1
+                logger.info(f"Rewrite cache hit: {cached}")
+                return cached
+
+            # Shield the call so a rewrite that misses the budget still lands in the cache
+            task = asyncio.ensure_future(self._call_llm(question))
+            task.add_done_callback(lambda t: self._on_rewrite_done(normalized, t))
+            try:
+                refined = await asyncio.wait_for(asyncio.shield(task), timeout=self.latency_budget)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                logger.info(f"Rewrite exceeded {self.latency_budget}s budget; using original input")
+                return question
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Rewrite failed: {e}; using original input.")
+                return question
+
+            self.stats["rewrites"] += 1
+            logger.info(f"Question refined to: {refined}")
+            return refined or question
+        finally:
+            if self.stats["requests"] % STATS_LOG_INTERVAL == 0:
+                logger.info(f"Rewrite stats: {self.stats}")
+
+    async def _call_llm(self, question: str) -> str:
+        rewrite_resp = await get_inference_client().chat_completion(
+            model=self.model,
+            messages=[{"role": "user", "content": REWRITE_PROMPT + question}],
+            max_tokens=64,
+            temperature=0.2,
+        )
+        return rewrite_resp.choices[0].message.content.strip()
+
+    def _on_rewrite_done(self, normalized: str, task: "asyncio.Future") -> None:
+        if task.cancelled() or task.exception() is not None:
+            return
+        refined = task.result()
+        if refined:
+            self.cache.set(normalized, refined)
+            asyncio.ensure_future(self._redis_set(normalized, refined))
+
+    async def _cache_get(self, normalized: str) -> Optional[str]:
+        cached = self.cache.get(normalized)
+        if cached:
+            return cached
+        cached = await asyncio.to_thread(self._redis_get, normalized)
+        if cached:
+            self.cache.set(normalized, cached)
+        return cached
+
+    async def _redis_set(self, normalized: str, refined: str) -> None:
+        await asyncio.to_thread(self._redis_store, normalized, refined)
+
+    # Redis calls (including the first connection) are blocking, so they run off the event loop
+    def _redis_get(self, normalized: str) -> Optional[str]:
+        redis_manager = get_redis_manager()
+        if redis_manager is None:
+            return None
+        return redis_manager.get_cache_entry("rewrite", self._redis_key(normalized))
+
+    def _redis_store(self, normalized: str, refined: str) -> None:
+        redis_manager = get_redis_manager()
+        if redis_manager is not None:
+            redis_manager.store_cache_entry("rewrite", self._redis_key(normalized), refined, self.cache_ttl)
+
+    @staticmethod
+    def _redis_key(normalized: str) -> str:
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+_query_rewriter: Optional[QueryRewriter] = None
+
+
+def get_query_rewriter() -> QueryRewriter:
+    """Return the process-wide query rewriter"""
+    global _query_rewriter
+    if _query_rewriter is None:
+        _query_rewriter = QueryRewriter()
+    return _query_rewriter
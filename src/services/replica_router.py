@@ -0,0 +1,219 @@
+"""
+Routing across multiple vLLM replicas.
+
+Each replica tracks its in-flight requests, an EWMA of time-to-first-byte
+and a window of recent latencies. Requests go to the healthy replica with
+the fewest outstanding requests (EWMA latency breaks ties); replicas that
+fail repeatedly are ejected for a cool-down period and then tried again.
+The latency window also provides the percentile after which a request may
+be hedged to a second replica.
+
+In session-affinity mode a routing key (the chat session, or a hash of the
+prompt prefix) is consistently hashed onto the replicas so successive turns
+land where vLLM already holds their prefix in its cache. Load is bounded:
+a replica more than REPLICA_LOAD_FACTOR above the average in-flight count
+is skipped for the next one on the ring, as are ejected replicas.
+"""
+import bisect
+import hashlib
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config.settings import (
+    REPLICA_EWMA_ALPHA,
+    REPLICA_EJECT_FAILURES,
+    REPLICA_EJECT_SECONDS,
+    INFERENCE_HEDGE_PERCENTILE,
+    INFERENCE_HEDGE_MIN_SAMPLES,
+    REPLICA_ROUTING,
+    REPLICA_HASH_VNODES,
+    REPLICA_LOAD_FACTOR,
+)
+
+logger = logging.getLogger(__name__)
+
+# vLLM V0 exports a hit-rate gauge; V1 exports query/hit counters (in tokens)
+_HIT_RATE_GAUGE = re.compile(r"^vllm:gpu_prefix_cache_hit_rate(?:\{[^}]*\})?\s+(\S+)", re.MULTILINE)
+_QUERIES_COUNTER = re.compile(r"^vllm:(?:gpu_)?prefix_cache_queries_total(?:\{[^}]*\})?\s+(\S+)", re.MULTILINE)
+_HITS_COUNTER = re.compile(r"^vllm:(?:gpu_)?prefix_cache_hits_total(?:\{[^}]*\})?\s+(\S+)", re.MULTILINE)
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def metrics_url(base_url: str) -> str:
+    """vLLM serves Prometheus metrics at the root, next to the /v1 API"""
+    root = base_url.rstrip("/")
+    if root.endswith("/v1"):
+        root = root[:-3]
+    return f"{root}/metrics"
+
+
+def parse_prefix_cache_metrics(text: str) -> Optional[Tuple[str, float, float]]:
+    """("rate", hit_rate, 0) from the V0 gauge or ("counters", queries, hits) from V1; None if not exported"""
+    gauge = _HIT_RATE_GAUGE.findall(text)
+    if gauge:
+        return "rate", sum(float(v) for v in gauge) / len(gauge), 0.0
+    queries, hits = _QUERIES_COUNTER.findall(text), _HITS_COUNTER.findall(text)
+    if queries:
+        return "counters", sum(float(v) for v in queries), sum(float(v) for v in hits)
+    return None
+
+
+class Replica:
+    """One vLLM endpoint and its load/latency bookkeeping"""
+
+    def __init__(self, url: str, client: Any):
+        self.url = url
+        # AsyncOpenAI client bound to this replica's base URL (shares the pooled transport)
+        self.client = client
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None
+        self.latencies: Deque[float] = deque(maxlen=200)
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.stats: Dict[str, int] = {
+            "requests": 0, "failures": 0, "ejections": 0, "hedges": 0, "affine": 0, "spilled": 0,
+        }
+        # Scraped from the replica's /metrics; None until known (or if the server doesn't export it)
+        self.prefix_cache_hit_rate: Optional[float] = None
+        self._prefix_counters: Optional[Tuple[float, float]] = None
+
+    def update_prefix_cache(self, metrics_text: str) -> None:
+        """Update the hit rate from a /metrics scrape; counters give the rate since the previous scrape"""
+        parsed = parse_prefix_cache_metrics(metrics_text)
+        if parsed is None:
+            return
+        kind, first, second = parsed
+        if kind == "rate":
+            self.prefix_cache_hit_rate = first
+            return
+        previous, self._prefix_counters = self._prefix_counters, (first, second)
+        if previous is not None and first > previous[0]:
+            self.prefix_cache_hit_rate = (second - previous[1]) / (first - previous[0])
+        elif previous is None and first > 0:
+            self.prefix_cache_hit_rate = second / first
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if len(self.latencies) < INFERENCE_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "ewma_latency": round(self.ewma_latency, 4) if self.ewma_latency is not None else None,
+            "ejected": not self.available(time.monotonic()),
+            "prefix_cache_hit_rate": (
+                round(self.prefix_cache_hit_rate, 4) if self.prefix_cache_hit_rate is not None else None
+            ),
+            **self.stats,
+        }
+
+
+class ReplicaRouter:
+    """Least-outstanding-requests balancing with EWMA tie-breaks and failure ejection"""
+
+    def __init__(self, replicas: List[Replica], mode: str = REPLICA_ROUTING):
+        if not replicas:
+            raise ValueError("At least one inference replica is required")
+        self.replicas = replicas
+        # "least_outstanding" or "session" (consistent hashing on the routing key)
+        self.mode = mode
+        self._ring = sorted(
+            (_ring_hash(f"{replica.url}#{vnode}"), index)
+            for index, replica in enumerate(replicas)
+            for vnode in range(REPLICA_HASH_VNODES)
+        )
+        self._ring_hashes = [point for point, _ in self._ring]
+
+    def healthy(self, exclude: Optional[Replica] = None) -> List[Replica]:
+        now = time.monotonic()
+        return [r for r in self.replicas if r is not exclude and r.available(now)]
+
+    def choose(self, exclude: Optional[Replica] = None, key: Optional[str] = None) -> Optional[Replica]:
+        """Pick a replica; if every one is ejected, the one closest to re-admission (fail open)"""
+        candidates = self.healthy(exclude)
+        if not candidates:
+            others = [r for r in self.replicas if r is not exclude]
+            if not others or exclude is not None:
+                return None
+            return min(others, key=lambda r: r.ejected_until)
+        if self.mode == "session" and key:
+            replica = self._affine(key, candidates)
+            if replica is not None:
+                return replica
+        # Unmeasured replicas sort first on latency so they get sampled
+        return min(candidates, key=lambda r: (r.in_flight, r.ewma_latency or 0.0))
+
+    def _affine(self, key: str, candidates: List[Replica]) -> Optional[Replica]:
+        """First replica clockwise from the key's hash that is a candidate and under the load bound"""
+        total = sum(replica.in_flight for replica in self.replicas)
+        bound = max(1, math.ceil(REPLICA_LOAD_FACTOR * (total + 1) / len(self.replicas)))
+        start = bisect.bisect(self._ring_hashes, _ring_hash(key))
+        home: Optional[Replica] = None
+        seen = set()
+        for offset in range(len(self._ring)):
+            index = self._ring[(start + offset) % len(self._ring)][1]
+            if index in seen:
+                continue
+            seen.add(index)
+            replica = self.replicas[index]
+            home = home or replica
+            if replica in candidates and replica.in_flight < bound:
+                replica.stats["affine" if replica is home else "spilled"] += 1
+                return replica
+            if len(seen) == len(self.replicas):
+                break
+        return None
+
+    def hedge_delay(self, replica: Replica) -> Optional[float]:
+        """Latency after which a request on this replica is worth hedging, once enough samples exist"""
+        return replica.latency_percentile(INFERENCE_HEDGE_PERCENTILE)
+
+    def start(self, replica: Replica) -> None:
+        replica.in_flight += 1
+        replica.stats["requests"] += 1
+
+    def finish(self, replica: Replica) -> None:
+        replica.in_flight -= 1
+
+    def record_latency(self, replica: Replica, latency: float) -> None:
+        """Time to first byte (first chunk for streams) of a successful request"""
+        replica.latencies.append(latency)
+        if replica.ewma_latency is None:
+            replica.ewma_latency = latency
+        else:
+            replica.ewma_latency = REPLICA_EWMA_ALPHA * latency + (1 - REPLICA_EWMA_ALPHA) * replica.ewma_latency
+        self.record_success(replica)
+
+    def record_success(self, replica: Replica) -> None:
+        """The replica answered (a request or a health probe); clear its failures and re-admit it"""
+        if replica.consecutive_failures:
+            logger.info(f"Replica {replica.url} recovered")
+        replica.consecutive_failures = 0
+        replica.ejected_until = 0.0
+
+    def record_failure(self, replica: Replica) -> None:
+        replica.stats["failures"] += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= REPLICA_EJECT_FAILURES:
+            # Back off longer each time a re-admitted replica fails again
+            strikes = replica.consecutive_failures - REPLICA_EJECT_FAILURES
+            cool_down = REPLICA_EJECT_SECONDS * min(8, 2 ** strikes)
+            replica.ejected_until = time.monotonic() + cool_down
+            replica.stats["ejections"] += 1
+            logger.warning(f"Ejecting replica {replica.url} for {cool_down:.0f}s after {replica.consecutive_failures} failures")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [replica.snapshot() for replica in self.replicas]
@@ -0,0 +1,119 @@
+"""
+Exact-match response cache in front of BaseAgent generation.
+
+Keys cover everything that determines the answer: agent type, system prompt
+version, normalized question, the retrieved context, the conversation state
+and the FAISS index version. Entries live in an in-process LRU and a shared
+Redis tier so all workers benefit.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from config.settings import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from utils.lru_cache import LRUCache
+from utils.redis_manager import get_redis_manager
+
+logger = logging.getLogger(__name__)
+
+# Words per chunk when replaying a cached answer to the UI
+REPLAY_WORDS_PER_CHUNK = 4
+
+
+def _digest(value: Any) -> str:
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class ResponseCache:
+    """Two-tier (LRU + Redis) cache of final agent responses"""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE, ttl: int = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+        self.index_version: Optional[str] = None
+        self.stats: Dict[str, int] = {"hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+
+    def sync_index_version(self, index_version: Optional[str]) -> None:
+        """Drop in-process entries when the FAISS index changes (Redis keys embed the version)"""
+        if index_version != self.index_version:
+            if self.index_version is not None:
+                self.cache.clear()
+                self.stats["invalidations"] += 1
+                logger.info(f"Vector index changed ({self.index_version} -> {index_version}); response cache cleared")
+            self.index_version = index_version
+
+    def make_key(
+        self,
+        agent_type: str,
+        system_prompt: str,
+        user_text: str,
+        context: str = "",
+        history: Optional[List[Dict[str, Any]]] = None,
+        summary: str = "",
+    ) -> str:
+        parts = [
+            str(getattr(agent_type, "value", agent_type)),
+            _digest(system_prompt)[:16],
+            normalize_text(user_text),
+            _digest(context or "")[:16],
+            _digest([history or [], summary or ""])[:16],
+            self.index_version or "",
+        ]
+        return _digest("|".join(parts))
+
+    async def get(self, key: str) -> Optional[str]:
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        cached = await asyncio.to_thread(self._redis_get, key)
+        if cached is not None:
+            self.stats["redis_hits"] += 1
+            self.cache.set(key, cached)
+            return cached
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, response: str) -> None:
+        self.cache.set(key, response)
+        self.stats["stores"] += 1
+        await asyncio.to_thread(self._redis_store, key, response)
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        redis_manager = get_redis_manager()
+        if redis_manager is None:
+            return None
+        return redis_manager.get_cache_entry("response", key)
+
+    def _redis_store(self, key: str, response: str) -> None:
+        redis_manager = get_redis_manager()
+        if redis_manager is not None:
+            redis_manager.store_cache_entry("response", key, response, self.ttl)
+
+
+async def replay_stream(text: str) -> AsyncIterator[str]:
+    """Stream a cached answer in small chunks so the UI behaves like a live generation"""
+    words = re.findall(r"\S+\s*|\s+", text)
+    for i in range(0, len(words), REPLAY_WORDS_PER_CHUNK):
+        yield "".join(words[i:i + REPLAY_WORDS_PER_CHUNK])
+        await asyncio.sleep(0)
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,107 @@
+"""
+Async, micro-batched retrieval.
+
+Every agent call used to embed its query and search FAISS on its own worker
+thread, one query at a time. Queries arriving within a few milliseconds of
+each other are now collected, embedded as one batch with the sentence
+transformer and searched with a single batched FAISS call on a small
+dedicated thread pool (both release the GIL, so no process pool is needed).
+Each caller gets its own results back; the event loop only ever awaits.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.settings import (
+    RETRIEVAL_BATCH_WINDOW_MS,
+    RETRIEVAL_MAX_BATCH,
+    RETRIEVAL_WORKERS,
+    RETRIEVAL_TOP_K,
+)
+from utils.tracing import span
+from utils.vector_db import get_vector_db
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalService:
+    """Coalesces concurrent queries into batched embedding + FAISS searches"""
+
+    def __init__(
+        self,
+        window_ms: float = RETRIEVAL_BATCH_WINDOW_MS,
+        max_batch: int = RETRIEVAL_MAX_BATCH,
+        workers: int = RETRIEVAL_WORKERS,
+    ):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval")
+        self._pending: List[Tuple[str, int, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks; hold in-flight batches until they finish
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {"queries": 0, "batches": 0, "largest_batch": 0}
+
+    async def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[Tuple[str, float]]:
+        """(text, relevance score) chunks for one query, best first"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, k, future))
+        self.stats["queries"] += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        with span("retrieval_wait", k=k):
+            return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, int, asyncio.Future]]) -> None:
+        # Identical queries (e.g. starter prompts) are embedded and searched once
+        queries = list(dict.fromkeys(query for query, _, _ in batch))
+        k = max(k for _, k, _ in batch)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(queries))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._search_batch, queries, k
+            )
+        except Exception as e:
+            logger.error(f"Batched retrieval of {len(queries)} queries failed: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        by_query = dict(zip(queries, results))
+        for query, query_k, future in batch:
+            # Callers that gave up (cancelled) are skipped
+            if not future.done():
+                future.set_result(by_query[query][:query_k])
+
+    @staticmethod
+    def _search_batch(queries: List[str], k: int) -> List[List[Tuple[str, float]]]:
+        # Blocks until the index is loaded on the first batch after startup
+        return get_vector_db().search_batch(queries, k)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_retrieval_service: Optional[RetrievalService] = None
+
+
+def get_retrieval_service() -> RetrievalService:
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
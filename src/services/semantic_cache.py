@@ -0,0 +1,176 @@
+"""
+Semantic response cache for paraphrased questions.
+
+Questions are embedded with the same sentence-transformer the vector store
+uses and compared per agent type against previously answered questions.
+A hit above SEMANTIC_CACHE_THRESHOLD reuses the earlier answer. Only the
+factual agents in SEMANTIC_CACHE_AGENTS are cached. Every hit
+and near-miss is written to the ``semantic_cache.audit`` logger so the
+threshold can be tuned against real false hits.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import (
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_AUDIT_MARGIN,
+    SEMANTIC_CACHE_SIZE,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_AGENTS,
+)
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("semantic_cache.audit")
+
+
+class _AgentIndex:
+    """Brute-force inner-product index over normalized question embeddings for one agent type"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.vectors: Optional[np.ndarray] = None
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.created: List[float] = []
+        self.last_used: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def _remove(self, indices: List[int]) -> None:
+        dropped = set(indices)
+        keep = [i for i in range(len(self)) if i not in dropped]
+        self.vectors = self.vectors[keep] if keep else None
+        for field in (self.questions, self.answers, self.created, self.last_used):
+            field[:] = [field[i] for i in keep]
+
+    def expire(self, now: float) -> None:
+        expired = [i for i, created in enumerate(self.created) if now - created > self.ttl]
+        if expired:
+            self._remove(expired)
+
+    def search(self, vector: np.ndarray) -> Tuple[int, float]:
+        """Return (index, cosine similarity) of the closest cached question, or (-1, 0.0)"""
+        if self.vectors is None:
+            return -1, 0.0
+        scores = self.vectors @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def add(self, vector: np.ndarray, question: str, answer: str, now: float) -> None:
+        if len(self) >= self.max_size:
+            # Evict the least recently used entry
+            self._remove([int(np.argmin(self.last_used))])
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.created.append(now)
+        self.last_used.append(now)
+
+
+class SemanticCache:
+    """Per-agent-type nearest-question cache with LRU/TTL eviction and hit auditing"""
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        audit_margin: float = SEMANTIC_CACHE_AUDIT_MARGIN,
+        max_size: int = SEMANTIC_CACHE_SIZE,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        agents: Iterable[str] = SEMANTIC_CACHE_AGENTS,
+    ):
+        self.threshold = threshold
+        self.agents = set(agents)
+        self.audit_margin = audit_margin
+        self.max_size = max_size
+        self.ttl = ttl
+        self.index_version: Optional[str] = None
+        self._indexes: Dict[str, _AgentIndex] = {}
+        self.stats: Dict[str, int] = {"lookups": 0, "hits": 0, "near_misses": 0, "stores": 0}
+
+    @property
+    def hit_rate(self) -> float:
+        return self.stats["hits"] / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+    def applies_to(self, agent_type: str) -> bool:
+        """Whether answers from this agent type may be reused for paraphrased questions"""
+        return str(getattr(agent_type, "value", agent_type)) in self.agents
+
+    @staticmethod
+    def _namespace(agent_type: str, prompt_version: str) -> str:
+        return f"{getattr(agent_type, 'value', agent_type)}:{prompt_version}"
+
+    def sync_index_version(self, index_version: Optional[str]) -> None:
+        """Drop all entries when the FAISS index changes, since answers were grounded on it"""
+        if index_version != self.index_version:
+            if self.index_version is not None:
+                self._indexes.clear()
+                logger.info("Vector index changed; semantic cache cleared")
+            self.index_version = index_version
+
+    @staticmethod
+    def _as_vector(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, agent_type: str, prompt_version: str, question: str, embedding) -> Optional[str]:
+        """Return a cached answer for a near-duplicate question, or None"""
+        self.stats["lookups"] += 1
+        index = self._indexes.get(self._namespace(agent_type, prompt_version))
+        if index is None:
+            return None
+        now = time.time()
+        index.expire(now)
+        best, score = index.search(self._as_vector(embedding))
+        if best < 0:
+            return None
+        agent = getattr(agent_type, "value", agent_type)
+        if score >= self.threshold:
+            self.stats["hits"] += 1
+            index.last_used[best] = now
+            audit_logger.info(
+                f"HIT agent={agent} score={score:.4f} threshold={self.threshold} "
+                f"query={question!r} matched={index.questions[best]!r}"
+            )
+            return index.answers[best]
+        if score >= self.threshold - self.audit_margin:
+            self.stats["near_misses"] += 1
+            audit_logger.info(
+                f"NEAR_MISS agent={agent} score={score:.4f} threshold={self.threshold} "
+                f"query={question!r} closest={index.questions[best]!r}"
+            )
+        return None
+
+    def store(self, agent_type: str, prompt_version: str, question: str, embedding, answer: str) -> None:
+        namespace = self._namespace(agent_type, prompt_version)
+        index = self._indexes.get(namespace)
+        if index is None:
+            index = self._indexes[namespace] = _AgentIndex(self.max_size, self.ttl)
+        vector = self._as_vector(embedding)
+        best, score = index.search(vector)
+        if best >= 0 and score >= 0.999:
+            # Same question already cached; refresh it instead of adding a duplicate
+            index.answers[best] = answer
+            index.created[best] = index.last_used[best] = time.time()
+            return
+        index.add(vector, question, answer, time.time())
+        self.stats["stores"] += 1
+        if self.stats["stores"] % 50 == 0:
+            logger.info(f"Semantic cache stats: {self.stats} hit_rate={self.hit_rate:.2%}")
+
+
+_semantic_cache: Optional[SemanticCache] = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache"""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -0,0 +1,168 @@
+"""
+Per-session state backends.
+
+A session's whole state (active agent, history, summary and each agent's
+slot-filling state) is one JSON document, loaded with one read at the start
+of a message and written with one write at the end. With the Redis backend
+any Chainlit worker can serve any message, so workers can be scaled out
+behind a load balancer without sticky sessions.
+
+A backend that can't be read or written raises SessionStateUnavailable
+rather than returning nothing, so an outage is never mistaken for a new
+conversation.
+"""
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+from agents.registry import create_session_agents
+from config.redis_config import (
+    get_redis_config,
+    REDIS_KEY_PREFIXES,
+    REDIS_STATE_SOCKET_TIMEOUT,
+    REDIS_STATE_RETRIES,
+)
+from config.settings import STATE_BACKEND, SESSION_STATE_TTL, SESSION_STATE_MAX_SESSIONS
+from models.classification import AgentType
+from services.history import HistoryManager
+from utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStateUnavailable(Exception):
+    """Session state could not be read or written"""
+
+
+class StateBackend(ABC):
+    """Loads, saves and deletes serialized session state"""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Stored state, or None for a session that has none"""
+        pass
+
+    @abstractmethod
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        pass
+
+
+class InMemoryStateBackend(StateBackend):
+    """Process-local state; only valid with a single Chainlit worker.
+
+    Bounded by SESSION_STATE_MAX_SESSIONS and expired after SESSION_STATE_TTL
+    of inactivity, in case a session ends without on_chat_end firing.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_STATE_MAX_SESSIONS, ttl: int = SESSION_STATE_TTL):
+        self._states = LRUCache(max_size=max_sessions, ttl=ttl)
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._states.get(session_id)
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        self._states.set(session_id, state)
+
+    async def delete(self, session_id: str) -> None:
+        self._states.pop(session_id)
+
+
+class RedisStateBackend(StateBackend):
+    """Shared state in Redis, one GET and one SET per message.
+
+    Uses its own client rather than the cache's RedisManager: the cache's
+    short timeout and in-process fallback suit optional lookups, not state
+    the conversation depends on. Connection errors and timeouts are retried
+    with backoff on a fresh connection before SessionStateUnavailable is raised.
+    """
+
+    def __init__(
+        self,
+        ttl: int = SESSION_STATE_TTL,
+        socket_timeout: float = REDIS_STATE_SOCKET_TIMEOUT,
+        retries: int = REDIS_STATE_RETRIES,
+        client: Optional[redis.Redis] = None,
+    ):
+        self.ttl = ttl
+        self._client = client or redis.Redis(
+            **get_redis_config(socket_timeout=socket_timeout),
+            retry=Retry(ExponentialBackoff(cap=socket_timeout, base=0.1), retries),
+            retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+        )
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"{REDIS_KEY_PREFIXES['conversation']}{session_id}"
+
+    async def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = await asyncio.to_thread(self._client.get, self._key(session_id))
+            return json.loads(data) if data else None
+        except (redis.RedisError, ValueError) as e:
+            raise SessionStateUnavailable(f"Could not load session {session_id}: {str(e)}") from e
+
+    async def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        try:
+            await asyncio.to_thread(self._client.set, self._key(session_id), json.dumps(state), ex=self.ttl)
+        except redis.RedisError as e:
+            raise SessionStateUnavailable(f"Could not save session {session_id}: {str(e)}") from e
+
+    async def delete(self, session_id: str) -> None:
+        try:
+            await asyncio.to_thread(self._client.delete, self._key(session_id))
+        except redis.RedisError as e:
+            raise SessionStateUnavailable(f"Could not delete session {session_id}: {str(e)}") from e
+
+
+def serialize_session(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a live session context into a JSON-serializable document"""
+    return {
+        "revision": context.get("revision", 0),
+        "active_agent": str(getattr(context["active_agent"], "value", context["active_agent"])),
+        "history": context["history"].to_dict(),
+        # Only agents this session has touched have state worth saving
+        "agents": {
+            str(getattr(agent_type, "value", agent_type)): agent.get_state()
+            for agent_type, agent in context["agents"].items()
+        },
+    }
+
+
+def restore_session(state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Rebuild a live session context from a stored document (or a fresh one)"""
+    agents = create_session_agents()
+    if not state:
+        return {"revision": 0, "active_agent": AgentType.GENERAL, "history": HistoryManager(), "agents": agents}
+    for agent_type, agent_state in state.get("agents", {}).items():
+        agents[AgentType(agent_type)].load_state(agent_state)
+    return {
+        "revision": state.get("revision", 0),
+        "active_agent": AgentType(state.get("active_agent", AgentType.GENERAL)),
+        "history": HistoryManager.from_dict(state.get("history", {})),
+        "agents": agents,
+    }
+
+
+_state_backend: Optional[StateBackend] = None
+
+
+def get_state_backend() -> StateBackend:
+    """Return the configured state backend (STATE_BACKEND=memory|redis)"""
+    global _state_backend
+    if _state_backend is None:
+        if STATE_BACKEND == "redis":
+            _state_backend = RedisStateBackend()
+        else:
+            _state_backend = InMemoryStateBackend()
+        logger.info(f"Using {type(_state_backend).__name__} for session state")
+    return _state_backend
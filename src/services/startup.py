@@ -0,0 +1,165 @@
+"""
+Lazy, parallel startup of heavy components.
+
+The embedding model and FAISS index, the prompt classifier, the tokenizer
+and the vLLM engine used to load serially at import time, so the server
+accepted no connections until all of them were up and any failure killed
+the import. They now load concurrently on background threads while the
+server is already serving; readiness is exposed on /healthz and shown in
+the UI, and messages wait (bounded) only for the components they need.
+Required components that fail are retried with exponential backoff.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import STARTUP_READY_TIMEOUT, STARTUP_RETRY_INTERVAL, STARTUP_RETRY_MAX_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentState(str, Enum):
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class _Component:
+    __slots__ = ("name", "loader", "required", "state", "error", "seconds", "future", "failures", "retry_at")
+
+    def __init__(self, name: str, loader: Callable[[], Any], required: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = ComponentState.PENDING
+        self.error: Optional[str] = None
+        self.seconds: Optional[float] = None
+        self.future: Optional[Future] = None
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class StartupOrchestrator:
+    """Loads registered components in parallel on worker threads and tracks their readiness"""
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = True) -> None:
+        """Add a component; optional components may fail without making the app unready"""
+        self._components[name] = _Component(name, loader, required)
+
+    def _load(self, component: _Component) -> None:
+        component.state = ComponentState.LOADING
+        started = time.perf_counter()
+        try:
+            component.loader()
+            component.state = ComponentState.READY
+            component.error = None
+            component.failures = 0
+        except Exception as e:
+            component.error = str(e)
+            component.failures += 1
+            delay = min(STARTUP_RETRY_MAX_INTERVAL, STARTUP_RETRY_INTERVAL * 2 ** (component.failures - 1))
+            # Backoff is set before the state so start() never sees FAILED with a stale retry time
+            component.retry_at = time.monotonic() + delay
+            component.state = ComponentState.FAILED
+            if component.required:
+                logger.error(f"Startup component {component.name} failed to load, retrying in {delay:.0f}s: {str(e)}")
+            else:
+                logger.warning(f"Startup component {component.name} failed to load: {str(e)}")
+        finally:
+            component.seconds = round(time.perf_counter() - started, 2)
+        if component.state == ComponentState.READY:
+            logger.info(f"Startup component {component.name} ready in {component.seconds}s")
+
+    def _due(self, component: _Component) -> bool:
+        if component.future is None:
+            return True
+        # Failed required components are reloaded once their backoff has passed
+        return (
+            component.required and component.state == ComponentState.FAILED
+            and time.monotonic() >= component.retry_at
+        )
+
+    def start(self) -> None:
+        """Begin loading pending components and due retries in the background (idempotent, non-blocking)"""
+        pending = [c for c in self._components.values() if self._due(c)]
+        if not pending:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, len(self._components)), thread_name_prefix="startup"
+            )
+        for component in pending:
+            component.future = self._executor.submit(self._load, component)
+
+    @property
+    def ready(self) -> bool:
+        """True once every required component has loaded"""
+        return all(c.state == ComponentState.READY for c in self._components.values() if c.required)
+
+    def loading(self) -> list:
+        """Names of required components that are not ready yet"""
+        return [c.name for c in self._components.values() if c.required and c.state != ComponentState.READY]
+
+    def failed(self) -> list:
+        """Names of required components whose last load attempt failed"""
+        return [c.name for c in self._components.values() if c.required and c.state == ComponentState.FAILED]
+
+    async def wait_ready(self, timeout: float = STARTUP_READY_TIMEOUT) -> bool:
+        """Wait up to timeout for required components to finish loading; returns readiness.
+
+        A component that failed and isn't due for a retry yet doesn't hold the caller up.
+        """
+        self.start()
+        futures = [asyncio.wrap_future(c.future) for c in self._components.values() if c.required]
+        if futures:
+            try:
+                await asyncio.wait_for(asyncio.gather(*futures), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Startup still loading after {timeout}s: {self.loading()}")
+        return self.ready
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Readiness and per-component state, load time and error"""
+        return {
+            "ready": self.ready,
+            "components": {
+                c.name: {
+                    "state": c.state.value,
+                    "required": c.required,
+                    "seconds": c.seconds,
+                    "error": c.error,
+                    "failures": c.failures,
+                }
+                for c in self._components.values()
+            },
+        }
+
+
+async def healthz():
+    """Readiness endpoint: 200 once required components are loaded, 503 while warming or failed"""
+    from fastapi.responses import JSONResponse
+
+    startup = get_startup()
+    # Probes double as the retry trigger while no messages arrive
+    startup.start()
+    snapshot = startup.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+_startup: Optional[StartupOrchestrator] = None
+
+
+def get_startup() -> StartupOrchestrator:
+    """Return the process-wide startup orchestrator"""
+    global _startup
+    if _startup is None:
+        _startup = StartupOrchestrator()
+    return _startup
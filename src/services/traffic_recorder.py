@@ -0,0 +1,104 @@
+"""
+Record inference traffic for deterministic replay.
+
+With INFERENCE_RECORD_PATH set, every chat completion made through the
+shared InferenceClient (agents, the query rewriter, history summaries) is
+appended to a JSON-lines file: the request, the response tokens, the time
+to the first token and the gap before each following token. The replay
+server in benchmarks/replay_server.py serves these back with their
+original timing, keyed by request_key.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Request fields that change the completion; transport options (stream, timeouts, headers) don't
+KEY_PARAMS = ("model", "messages", "max_tokens", "temperature", "top_p", "stop")
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable hash of the parts of a chat completion request that determine its output"""
+    material = {name: request.get(name) for name in KEY_PARAMS}
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+
+class TrafficRecorder:
+    """Appends recorded completions to a JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+            self.recorded += 1
+
+    async def save(
+        self,
+        request: Dict[str, Any],
+        tokens: List[str],
+        prefill: float,
+        gaps: List[float],
+        total: float,
+    ) -> None:
+        record = {
+            "key": request_key(request),
+            "recorded_at": time.time(),
+            "request": {name: request.get(name) for name in KEY_PARAMS},
+            "stream": bool(request.get("stream")),
+            "tokens": tokens,
+            "prefill": round(prefill, 6),
+            "gaps": [round(gap, 6) for gap in gaps],
+            "total": round(total, 6),
+        }
+        try:
+            await asyncio.to_thread(self._append, record)
+        except Exception as e:
+            logger.warning(f"Could not record completion: {str(e)}")
+
+
+class RecordingStream:
+    """Wraps a streaming completion, timing each content delta and recording it when the stream ends"""
+
+    def __init__(self, stream, recorder: TrafficRecorder, request: Dict[str, Any], started: float):
+        self._stream = stream
+        self._recorder = recorder
+        self._request = request
+        self._started = started
+
+    async def __aiter__(self):
+        tokens: List[str] = []
+        stamps: List[float] = []
+        async for chunk in self._stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                tokens.append(chunk.choices[0].delta.content)
+                stamps.append(time.perf_counter())
+            yield chunk
+        # Only completed streams are recorded; an interrupted one would replay truncated
+        total = time.perf_counter() - self._started
+        prefill = stamps[0] - self._started if stamps else total
+        gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+        await self._recorder.save(self._request, tokens, prefill, gaps, total)
+
+
+_recorder: Optional[TrafficRecorder] = None
+
+
+def get_traffic_recorder(path: Optional[str]) -> Optional[TrafficRecorder]:
+    """Return the process-wide recorder for path, or None when recording is off"""
+    global _recorder
+    if not path:
+        return None
+    if _recorder is None or _recorder.path != path:
+        _recorder = TrafficRecorder(path)
+        logger.info(f"Recording inference traffic to {path}")
+    return _recorder
@@ -0,0 +1,151 @@
+"""
+Prometheus metrics for per-stage latency.
+
+Histograms are labelled by stage and agent type so capacity and tuning
+decisions can be made per agent. prometheus_client is optional: without it
+every metric is a no-op and /metrics reports that it is disabled. Counters
+that services already keep in their ``stats`` dicts are exported at scrape
+time through register_stats_source instead of being duplicated.
+"""
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+    METRICS_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    METRICS_AVAILABLE = False
+
+# Buckets in seconds, from sub-millisecond cache hits up to long generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 30, 40, 60, 80, 120, 200)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client isn't installed"""
+
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+def _histogram(name: str, documentation: str, labels, buckets=LATENCY_BUCKETS):
+    return Histogram(name, documentation, labels, buckets=buckets) if METRICS_AVAILABLE else _NoopMetric()
+
+
+def _counter(name: str, documentation: str, labels):
+    return Counter(name, documentation, labels) if METRICS_AVAILABLE else _NoopMetric()
+
+
+STAGE_SECONDS = _histogram(
+    "unt_stage_seconds", "Wall time of request-path stages", ["stage", "agent_type"]
+)
+TTFT_SECONDS = _histogram(
+    "unt_generation_ttft_seconds", "Time from request to first streamed token", ["agent_type"]
+)
+GENERATION_SECONDS = _histogram(
+    "unt_generation_seconds", "Total time of a streamed generation", ["agent_type"]
+)
+TOKENS_PER_SECOND = _histogram(
+    "unt_generation_tokens_per_second", "Decode rate after the first token", ["agent_type"],
+    buckets=THROUGHPUT_BUCKETS,
+)
+GENERATION_RETRIES = _counter(
+    "unt_generation_retries_total", "Inference attempts retried after a failure", ["agent_type"]
+)
+REDIS_SECONDS = _histogram(
+    "unt_redis_seconds", "Latency of RedisManager calls", ["operation"]
+)
+
+_stats_sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def _label(agent_type: Any) -> str:
+    return str(getattr(agent_type, "value", agent_type) or "none")
+
+
+def record_stage(stage: str, agent_type: Any, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage=stage, agent_type=_label(agent_type)).observe(seconds)
+
+
+@contextmanager
+def time_stage(stage: str, agent_type: Any = None):
+    """Observe the duration of the block as a stage latency"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, agent_type, time.perf_counter() - started)
+
+
+def record_generation(agent_type: Any, ttft: float, total: float, tokens: int) -> None:
+    """Record one completed streamed generation; tokens are streamed deltas"""
+    label = _label(agent_type)
+    TTFT_SECONDS.labels(agent_type=label).observe(ttft)
+    GENERATION_SECONDS.labels(agent_type=label).observe(total)
+    if tokens > 1 and total > ttft:
+        TOKENS_PER_SECOND.labels(agent_type=label).observe((tokens - 1) / (total - ttft))
+
+
+def record_retry(agent_type: Any) -> None:
+    GENERATION_RETRIES.labels(agent_type=_label(agent_type)).inc()
+
+
+def timed_redis(func: Callable) -> Callable:
+    """Decorator observing a RedisManager method's latency under its name"""
+    histogram = REDIS_SECONDS.labels(operation=func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+    return wrapper
+
+
+def register_stats_source(component: str, source: Callable[[], Dict[str, Any]]) -> None:
+    """Export a component's numeric stats dict as unt_component_stat{component,stat} at scrape time"""
+    _stats_sources[component] = source
+
+
+class _StatsCollector:
+    def collect(self):
+        family = GaugeMetricFamily(
+            "unt_component_stat", "Counters and gauges kept by app components", labels=["component", "stat"]
+        )
+        for component, source in list(_stats_sources.items()):
+            try:
+                stats = source()
+            except Exception as e:
+                logger.warning(f"Stats source {component} failed: {str(e)}")
+                continue
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    family.add_metric([component, stat], float(value))
+        yield family
+
+
+if METRICS_AVAILABLE:
+    REGISTRY.register(_StatsCollector())
+
+
+async def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    from fastapi.responses import PlainTextResponse, Response
+
+    if not METRICS_AVAILABLE:
+        return PlainTextResponse("prometheus_client is not installed; metrics are disabled\n", status_code=501)
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
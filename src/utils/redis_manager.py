@@ -1,11 +1,20 @@
 import redis
 import json
 import logging
+import time
 from typing import Any, Dict, List, Optional
-from config.redis_config import get_redis_config, REDIS_KEY_PREFIXES
+from config.redis_config import get_redis_config, REDIS_KEY_PREFIXES, REDIS_RECONNECT_INTERVAL
+from utils.metrics import timed_redis
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+
+def instrumented(func):
+    """Trace and time a RedisManager call under its method name"""
+    return traced(f"redis.{func.__name__}")(timed_redis(func))
+
+
 class RedisManager:
     def __init__(self):
         """Initialize Redis connection"""
@@ -18,17 +27,19 @@ class RedisManager:
             logger.error(f"Failed to connect to Redis: {str(e)}")
             raise
 
-    def store_conversation(self, conversation_id: str, data: Dict[str, Any]) -> bool:
+    @instrumented
+    def store_conversation(self, conversation_id: str, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
         """Store conversation data in Redis"""
         try:
             key = f"{REDIS_KEY_PREFIXES['conversation']}{conversation_id}"
-            self.redis_client.set(key, json.dumps(data))
-            logger.info(f"Stored conversation {conversation_id} in Redis")
+            self.redis_client.set(key, json.dumps(data), ex=ttl)
+            logger.debug(f"Stored conversation {conversation_id} in Redis")
             return True
         except Exception as e:
             logger.error(f"Error storing conversation: {str(e)}")
             return False
 
+    @instrumented
     def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve conversation data from Redis"""
         try:
@@ -41,6 +52,7 @@ class RedisManager:
             logger.error(f"Error retrieving conversation: {str(e)}")
             return None
 
+    @instrumented
     def store_user_data(self, user_id: str, data: Dict[str, Any]) -> bool:
         """Store user data in Redis"""
         try:
@@ -52,6 +64,7 @@ class RedisManager:
             logger.error(f"Error storing user data: {str(e)}")
             return False
 
+    @instrumented
     def get_user_data(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve user data from Redis"""
         try:
@@ -64,6 +77,7 @@ class RedisManager:
             logger.error(f"Error retrieving user data: {str(e)}")
             return None
 
+    @instrumented
     def store_agent_state(self, agent_id: str, state: Dict[str, Any]) -> bool:
         """Store agent state in Redis"""
         try:
@@ -75,6 +89,7 @@ class RedisManager:
             logger.error(f"Error storing agent state: {str(e)}")
             return False
 
+    @instrumented
     def get_agent_state(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve agent state from Redis"""
         try:
@@ -87,6 +102,31 @@ class RedisManager:
             logger.error(f"Error retrieving agent state: {str(e)}")
             return None
 
+    @instrumented
+    def store_cache_entry(self, namespace: str, key: str, data: Any, ttl: Optional[int] = None) -> bool:
+        """Store a JSON-serializable cache entry with an optional TTL in seconds"""
+        try:
+            full_key = f"{REDIS_KEY_PREFIXES[namespace]}{key}"
+            self.redis_client.set(full_key, json.dumps(data), ex=ttl)
+            return True
+        except Exception as e:
+            logger.error(f"Error storing {namespace} cache entry: {str(e)}")
+            return False
+
+    @instrumented
+    def get_cache_entry(self, namespace: str, key: str) -> Optional[Any]:
+        """Retrieve a cache entry stored with store_cache_entry"""
+        try:
+            full_key = f"{REDIS_KEY_PREFIXES[namespace]}{key}"
+            data = self.redis_client.get(full_key)
+            if data:
+                return json.loads(data)
+            return None
+        except Exception as e:
+            logger.error(f"Error retrieving {namespace} cache entry: {str(e)}")
+            return None
+
+    @instrumented
     def delete_key(self, key: str) -> bool:
         """Delete a key from Redis"""
         try:
@@ -97,6 +137,7 @@ class RedisManager:
             logger.error(f"Error deleting key: {str(e)}")
             return False
 
+    @instrumented
     def get_all_conversations(self) -> List[Dict[str, Any]]:
         """Get all stored conversations"""
         try:
@@ -110,4 +151,25 @@ class RedisManager:
             return conversations
         except Exception as e:
             logger.error(f"Error retrieving all conversations: {str(e)}")
-            return [] 
\ No newline at end of file
+            return []
+
+
+_redis_manager: Optional[RedisManager] = None
+_redis_retry_at = 0.0
+
+
+def get_redis_manager() -> Optional[RedisManager]:
+    """Return a shared RedisManager, or None while Redis is unreachable (caches stay in-process).
+
+    A failed connect is retried after REDIS_RECONNECT_INTERVAL seconds.
+    """
+    global _redis_manager, _redis_retry_at
+    if _redis_manager is None and time.monotonic() >= _redis_retry_at:
+        try:
+            _redis_manager = RedisManager()
+        except Exception as e:
+            logger.warning(
+                f"Redis unavailable, using in-process caching only for {REDIS_RECONNECT_INTERVAL:.0f}s: {str(e)}"
+            )
+            _redis_retry_at = time.monotonic() + REDIS_RECONNECT_INTERVAL
+    return _redis_manager
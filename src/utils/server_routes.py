@@ -0,0 +1,16 @@
+import logging
+from typing import Callable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def add_route(path: str, endpoint: Callable, methods: Sequence[str] = ("GET",)) -> None:
+    """Register an HTTP route on the Chainlit server (e.g. health or metrics endpoints)"""
+    from chainlit.server import app
+
+    if any(getattr(route, "path", None) == path for route in app.router.routes):
+        return
+    app.add_api_route(path, endpoint, methods=list(methods), include_in_schema=False)
+    # Chainlit serves its frontend from a catch-all route; ours must be matched before it
+    app.router.routes.insert(0, app.router.routes.pop())
+    logger.info(f"Registered {path} on the Chainlit server")
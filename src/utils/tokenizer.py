@@ -0,0 +1,60 @@
+import logging
+import threading
+from typing import Any, Dict, List
+
+from config.settings import TOKENIZER_ID
+
+logger = logging.getLogger(__name__)
+
+# Tokens added by the Gemma chat template around each message
+# ("<start_of_turn>{role}\n" ... "<end_of_turn>\n")
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_tokenizer = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def load_tokenizer():
+    """Load the Gemma tokenizer once (thread-safe); returns None if it can't be loaded.
+
+    The startup orchestrator calls this on a background thread; CLI tools call it directly.
+    """
+    global _tokenizer, _loaded
+    with _load_lock:
+        if not _loaded:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_ID)
+                logger.info(f"Loaded tokenizer {TOKENIZER_ID}")
+            except Exception as e:
+                logger.warning(f"Could not load tokenizer {TOKENIZER_ID}, using a character estimate: {str(e)}")
+            _loaded = True
+    return _tokenizer
+
+
+def get_tokenizer():
+    """The loaded tokenizer, or None while it is still loading (or failed); never blocks"""
+    return _tokenizer if _loaded else None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text with the Gemma tokenizer (about 4 chars/token until it is loaded, or if unavailable)"""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return max(1, len(text) // 4)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Count tokens for a list of chat messages including template overhead"""
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            # Multimodal content: only text parts are counted
+            content = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        total += count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    return total
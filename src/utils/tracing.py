@@ -0,0 +1,253 @@
+"""
+Lightweight request tracing.
+
+Each incoming chat message starts a trace; stages open child spans. The
+current span lives in a ContextVar, so spans follow the request across
+awaits, tasks and asyncio.to_thread workers without being passed around.
+The trace id doubles as the request id: it is sent to vLLM as X-Request-Id
+and added to every log line. Finished spans are exported on a background
+thread to a JSON-lines file or an OTLP/HTTP (JSON) collector, selected by
+TRACING_EXPORTER.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import (
+    TRACING_EXPORTER,
+    TRACING_JSONL_PATH,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+REQUEST_ID_HEADER = "X-Request-Id"
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start", "end", "status", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end or time.time()) - self.start) * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            encoded.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            encoded.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            encoded.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            encoded.append({"key": key, "value": {"stringValue": str(value)}})
+    return encoded
+
+
+def _otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": TRACING_SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [
+                    {
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        "parentSpanId": span.parent_id or "",
+                        "name": span.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(int(span.start * 1e9)),
+                        "endTimeUnixNano": str(int((span.end or span.start) * 1e9)),
+                        "attributes": _otlp_attributes(span.attributes),
+                        "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+                    }
+                    for span in spans
+                ],
+            }],
+        }]
+    }
+
+
+class SpanExporter:
+    """Batches finished spans on a daemon thread so export I/O never blocks the event loop"""
+
+    def __init__(self, write_batch: Callable[[List[Span]], None], max_batch: int = 256):
+        self._write_batch = write_batch
+        self._max_batch = max_batch
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self.dropped = 0
+        threading.Thread(target=self._run, name="span-exporter", daemon=True).start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.warning(f"Span export failed, dropping {len(batch)} spans: {str(e)}")
+
+
+def jsonl_writer(path: str) -> Callable[[List[Span]], None]:
+    """Append one JSON object per span to a local file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    def write(spans: List[Span]) -> None:
+        with open(path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+    return write
+
+
+def otlp_writer(endpoint: str) -> Callable[[List[Span]], None]:
+    """POST spans to an OTLP/HTTP collector (or any stand-in accepting the JSON encoding)"""
+    import httpx
+
+    client = httpx.Client(timeout=5.0)
+
+    def write(spans: List[Span]) -> None:
+        client.post(endpoint, json=_otlp_payload(spans)).raise_for_status()
+    return write
+
+
+_exporter: Optional[SpanExporter] = None
+_exporter_configured = False
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    """Return the configured span exporter, or None when TRACING_EXPORTER=none"""
+    global _exporter, _exporter_configured
+    if not _exporter_configured:
+        _exporter_configured = True
+        if TRACING_EXPORTER == "jsonl":
+            _exporter = SpanExporter(jsonl_writer(TRACING_JSONL_PATH))
+            logger.info(f"Exporting trace spans to {TRACING_JSONL_PATH}")
+        elif TRACING_EXPORTER == "otlp":
+            _exporter = SpanExporter(otlp_writer(TRACING_OTLP_ENDPOINT))
+            logger.info(f"Exporting trace spans to {TRACING_OTLP_ENDPOINT}")
+    return _exporter
+
+
+@contextmanager
+def span(name: str, activate: bool = True, **attributes: Any):
+    """
+    Time the block as a child of the current span (or as a new trace if there is none).
+
+    Inside async generators pass activate=False: the span is recorded but not made
+    current, since a generator may be resumed or closed from a different context.
+    """
+    parent = _current_span.get()
+    current = Span(name, parent.trace_id if parent else uuid.uuid4().hex, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current) if activate else None
+    try:
+        yield current
+    except Exception as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.time()
+        if token is not None:
+            _current_span.reset(token)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.export(current)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any):
+    """Start a new trace (e.g. one per chat message) regardless of any current span"""
+    token = _current_span.set(None)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_span.reset(token)
+
+
+def traced(name: str) -> Callable:
+    """Decorator wrapping a synchronous function in a span"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_request_id() -> Optional[str]:
+    """Request id of the current trace, if any"""
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds ``request_id`` to log records so log lines can be joined with traces"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id() or "-"
+        return True
+
+
+def install_request_id_logging() -> None:
+    """Attach RequestIdFilter to the root logger's handlers"""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
@@ -1,21 +1,117 @@
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 import os
+import json
+import re
+import hashlib
 import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 import faiss
+import numpy as np
+
+from config.settings import (
+    QUERY_EMBEDDING_CACHE_SIZE,
+    SEARCH_RESULT_CACHE_SIZE,
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL_ID,
+    ONNX_EMBEDDING_PATH,
+    ONNX_EMBEDDING_THREADS,
+    STARTUP_RETRY_INTERVAL,
+)
+from utils.lru_cache import LRUCache
+from utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
+
+def _normalize_query(query: str) -> str:
+    """The embedding model lowercases its input, so case and spacing variants share an embedding"""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def _matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    return all(
+        metadata.get(key) in value if isinstance(value, list) else metadata.get(key) == value
+        for key, value in filter.items()
+    )
+
+
+# Files written by `python -m benchmarks.embedding_backends export`
+ONNX_MODEL_FILE = "model.int8.onnx"
+ONNX_CONFIG_FILE = "embedding_config.json"
+
+
+class OnnxEmbeddings(Embeddings):
+    """int8 ONNX Runtime export of the sentence-transformer: mean pooling + L2 norm, like the torch model"""
+
+    def __init__(self, model_dir: str = ONNX_EMBEDDING_PATH, threads: int = ONNX_EMBEDDING_THREADS, batch_size: int = 32):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, ONNX_CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {node.name for node in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(config["max_length"])
+        self.tokenizer.enable_padding(pad_id=config["pad_id"], pad_token=config["pad_token"])
+        self.batch_size = batch_size
+        logger.info(f"Loaded ONNX embedding model for {config['model_id']} from {model_dir}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._encode(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
+
+
+def make_embeddings(backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """Query encoder: "onnx" (int8 export, falls back to torch if unavailable) or "torch" """
+    if backend == "onnx":
+        try:
+            return OnnxEmbeddings()
+        except Exception as e:
+            logger.warning(f"ONNX embedding backend unavailable, using torch: {str(e)}")
+    # Imported here so the ONNX backend keeps torch out of the chat process
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_ID,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": True}
+    )
+
+
 class VectorDBManager:
     def __init__(self, db_path="/home/models/FAISS_INGEST/vectorstore/db_faiss"):
         self.db_path = db_path
-        # Initialize embeddings with CPU explicitly
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-mpnet-base-v2",
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        # CPU query encoder; see EMBEDDING_BACKEND
+        self.embeddings = make_embeddings()
         self.vector_store = None
+        # Changes whenever a different index is loaded; caches key on it
+        self.index_version = None
+        # normalized query -> embedding, and (embedding hash, k, filter) -> [(docstore id, score)]
+        self.query_embeddings = LRUCache(max_size=QUERY_EMBEDDING_CACHE_SIZE)
+        self.search_results = LRUCache(max_size=SEARCH_RESULT_CACHE_SIZE)
         self._load_vector_store()
 
     def _load_vector_store(self):
@@ -32,7 +128,11 @@ class VectorDBManager:
                     self.embeddings,
                     allow_dangerous_deserialization=True
                 )
-                logger.info("FAISS vector store loaded successfully in CPU mode")
+                self.index_version = self._compute_index_version()
+                # Entries for the previous index can never hit again (keys carry the version)
+                self.query_embeddings.clear()
+                self.search_results.clear()
+                logger.info(f"FAISS vector store loaded successfully in CPU mode (version {self.index_version})")
             else:
                 error_msg = f"Vector database not found at {self.db_path}"
                 logger.error(error_msg)
@@ -41,20 +141,122 @@ class VectorDBManager:
             logger.error(f"Error loading vector store: {str(e)}")
             raise
 
-    def similarity_search(self, query: str, k: int = 5):
+    def _compute_index_version(self) -> str:
+        """Stamp the on-disk index by file names, sizes and modification times"""
+        stamp = hashlib.sha1()
+        for name in sorted(os.listdir(self.db_path)):
+            stat = os.stat(os.path.join(self.db_path, name))
+            stamp.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+        return stamp.hexdigest()[:12]
+
+    def reload_if_changed(self) -> bool:
+        """Reload the index if it was rebuilt on disk (e.g. by ingest.py); returns True if reloaded.
+
+        Polled by the health monitor every VECTOR_DB_RELOAD_INTERVAL seconds.
+        """
+        if os.path.exists(self.db_path) and self._compute_index_version() != self.index_version:
+            self._load_vector_store()
+            return True
+        return False
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Query embeddings (one row per query), from the LRU where possible; misses are embedded as one batch"""
+        keys = [(self.index_version, _normalize_query(query)) for query in queries]
+        vectors = [self.query_embeddings.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        if missing:
+            fresh = {}
+            for key, vector in zip(missing, self.embeddings.embed_documents([text for _, text in missing])):
+                fresh[key] = np.asarray(vector, dtype=np.float32)
+                self.query_embeddings.set(key, fresh[key])
+            vectors = [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+        return np.vstack(vectors)
+
+    def embed_query(self, query: str) -> List[float]:
+        """Cached embedding for one query"""
+        return self.embed_queries([query])[0].tolist()
+
+    def _search_ids(
+        self, vectors: np.ndarray, k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """(docstore id, relevance score) per query vector, from the result cache where possible"""
+        store = self.vector_store
+        filter_key = tuple(sorted(filter.items())) if filter else None
+        keys = [
+            (self.index_version, hashlib.sha1(vector.tobytes()).hexdigest(), k, filter_key) for vector in vectors
+        ]
+        results = [self.search_results.get(key) for key in keys]
+        todo = [i for i, hits in enumerate(results) if hits is None]
+        if todo:
+            batch = vectors[todo].copy()
+            if getattr(store, "_normalize_L2", False):
+                faiss.normalize_L2(batch)
+            # Over-fetch when filtering so k documents usually survive it
+            distances, indices = store.index.search(batch, k * 4 if filter else k)
+            # Same distance-to-relevance mapping as similarity_search_with_relevance_scores
+            relevance = store._select_relevance_score_fn()
+            for i, row_distances, row_indices in zip(todo, distances, indices):
+                hits = []
+                for distance, index in zip(row_distances, row_indices):
+                    if index == -1:
+                        continue
+                    doc_id = store.index_to_docstore_id[index]
+                    if filter and not _matches(store.docstore.search(doc_id).metadata, filter):
+                        continue
+                    hits.append((doc_id, float(relevance(float(distance)))))
+                    if len(hits) == k:
+                        break
+                results[i] = hits
+                self.search_results.set(keys[i], hits)
+        return results
+
+    def _scored_documents(
+        self, queries: List[str], k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Any, float]]]:
+        if not self.vector_store:
+            raise ValueError("Vector store not initialized")
+        logger.debug(f"Similarity search for {len(queries)} queries: {queries}")
+        with span("similarity_search", queries=len(queries), k=k):
+            hits = self._search_ids(self.embed_queries(queries), k, filter)
+        docstore = self.vector_store.docstore
+        return [[(docstore.search(doc_id), score) for doc_id, score in row] for row in hits]
+
+    def similarity_search(self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None):
         """Perform similarity search on the vector database"""
         try:
-            if not self.vector_store:
-                raise ValueError("Vector store not initialized")
-            
-            logger.info(f"Performing similarity search for query: {query}")
-            results = self.vector_store.similarity_search(query, k=k)
-            logger.info(f"Found {len(results)} relevant documents")
+            results = [doc for doc, _ in self._scored_documents([query], k, filter)[0]]
+            logger.debug(f"Found {len(results)} relevant documents")
             return results
         except Exception as e:
             logger.error(f"Error in similarity search: {str(e)}")
             raise
 
+    def get_scored_documents(
+        self, query: str, k: int = 5, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """Relevant document texts with relevance scores in [0, 1], best first"""
+        try:
+            return [(doc.page_content, score) for doc, score in self._scored_documents([query], k, filter)[0]]
+        except Exception as e:
+            logger.error(f"Error in scored similarity search: {str(e)}")
+            raise
+
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Tuple[str, float]]]:
+        """Embed queries as one batch and run one FAISS search; per query, (text, relevance score) best first"""
+        return [
+            [(doc.page_content, score) for doc, score in row] for row in self._scored_documents(queries, k)
+        ]
+
+    def cache_stats(self) -> Dict[str, int]:
+        return {
+            "embedding_hits": self.query_embeddings.hits,
+            "embedding_misses": self.query_embeddings.misses,
+            "embedding_entries": len(self.query_embeddings),
+            "result_hits": self.search_results.hits,
+            "result_misses": self.search_results.misses,
+            "result_entries": len(self.search_results),
+        }
+
     def get_relevant_documents(self, query: str, k: int = 5):
         """Get relevant documents from the vector database"""
         try:
@@ -62,4 +264,34 @@ class VectorDBManager:
             return [doc.page_content for doc in results]
         except Exception as e:
             logger.error(f"Error getting relevant documents: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+
+
+_vector_db: Optional[VectorDBManager] = None
+_vector_db_lock = threading.Lock()
+# Monotonic time and error of the last failed load, so callers don't reload the model on every batch
+_vector_db_failure: Optional[Tuple[float, str]] = None
+
+
+def get_vector_db(block: bool = True) -> Optional[VectorDBManager]:
+    """
+    Return the shared VectorDBManager, loading the embedding model and FAISS index on first use.
+
+    Loading takes seconds, so call this from a worker thread. With block=False it never
+    loads or waits and returns None while the index isn't ready yet. After a failed load,
+    calls raise straight away until STARTUP_RETRY_INTERVAL has passed, then one tries again.
+    """
+    global _vector_db, _vector_db_failure
+    if _vector_db is not None or not block:
+        return _vector_db
+    with _vector_db_lock:
+        if _vector_db is None:
+            if _vector_db_failure is not None and time.monotonic() - _vector_db_failure[0] < STARTUP_RETRY_INTERVAL:
+                raise RuntimeError(f"Vector database unavailable, last load failed: {_vector_db_failure[1]}")
+            try:
+                _vector_db = VectorDBManager()
+            except Exception as e:
+                _vector_db_failure = (time.monotonic(), str(e))
+                raise
+            _vector_db_failure = None
+    return _vector_db
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports modules relative to src/ (e.g. `from config.settings import ...`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from services.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+)
+
+
+async def hold(controller, agent_type, order, release, priority=PRIORITY_INTERACTIVE):
+    async with controller.admit(agent_type, priority=priority):
+        order.append(agent_type)
+        await release.wait()
+
+
+def test_concurrency_limit_and_priority_order():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=10, queue_timeout=5, bulkheads={})
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(controller, "general", order, release))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(hold(controller, "summary", order, release, PRIORITY_BACKGROUND)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(hold(controller, "academic", order, release)))
+        await asyncio.sleep(0)
+        assert controller.in_flight == 1
+        assert controller.queue_depth == 2
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, controller
+
+    order, controller = asyncio.run(scenario())
+    # The interactive request queued after the background one is served first
+    assert order == ["general", "academic", "summary"]
+    assert controller.in_flight == 0
+    assert controller.stats["admitted"] == 3
+
+
+def test_full_queue_rejects_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5, bulkheads={})
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(controller, "general", [], release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with controller.admit("general"):
+                    pass
+            assert rejected.value.retry_after >= 1.0
+            assert controller.stats["rejected"] == 1
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.05, bulkheads={})
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(controller, "general", [], release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit("general"):
+                pass
+        assert controller.queue_depth == 0
+        assert controller.stats["timed_out"] == 1
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+
+
+def test_bulkhead_lets_other_agent_types_past_a_blocked_one():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=4, max_queue=5, queue_timeout=5, bulkheads={"vision": 1})
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.ensure_future(hold(controller, "vision", order, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(hold(controller, "general", order, release)))
+        await asyncio.sleep(0.01)
+        assert order == ["vision", "general"]
+        assert controller.in_flight_by_type == {"vision": 1, "general": 1}
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["vision", "general", "vision"]
+
+
+def test_cancellation_that_races_a_grant_still_cancels():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=5, bulkheads={})
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold(controller, "general", [], release))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(hold(controller, "general", [], asyncio.Event()))
+        await asyncio.sleep(0)
+        # Free the slot (granting it to the waiter) and cancel the waiter in the same loop iteration
+        release.set()
+        await holder
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, timeout=1)
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.in_flight == 0
+    assert controller.queue_depth == 0
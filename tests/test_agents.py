@@ -0,0 +1,141 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Agents import the retrieval stack
+pytest.importorskip("langchain_community")
+
+import agents.base_agent as base_agent  # noqa: E402
+import agents.registry as registry  # noqa: E402
+from agents.specialized_agents import GeneralAgent  # noqa: E402
+from models.classification import AgentType  # noqa: E402
+from services.health_monitor import HealthMonitor  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "When does fall registration open?"}]
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class SlowStream:
+    """Deltas arrive one by one, like vLLM decoding; optionally fails part-way"""
+
+    def __init__(self, deltas, delay=0.05, fail_after=None):
+        self.deltas = list(deltas)
+        self.delay = delay
+        self.fail_after = fail_after
+        self.sent = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.fail_after is not None and self.sent == self.fail_after:
+            raise ConnectionError("connection reset")
+        if not self.deltas:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        self.sent += 1
+        return chunk(self.deltas.pop(0))
+
+
+class FakeInference:
+    def __init__(self, *streams):
+        self.streams = list(streams)
+        self.calls = 0
+
+    async def chat_completion(self, **request):
+        assert request["stream"] is True
+        self.calls += 1
+        stream = self.streams.pop(0)
+        if isinstance(stream, Exception):
+            raise stream
+        return stream
+
+
+@pytest.fixture
+def inference(monkeypatch):
+    monitor = HealthMonitor()
+    monkeypatch.setattr(base_agent, "get_health_monitor", lambda: monitor)
+    monkeypatch.setattr(base_agent, "RETRY_DELAY", 0)
+
+    def install(*streams):
+        fake = FakeInference(*streams)
+        monkeypatch.setattr(base_agent, "get_inference_client", lambda: fake)
+        return fake
+
+    return install
+
+
+async def collect(agent, on_complete=None):
+    started = time.perf_counter()
+    arrivals = []
+    async for token in agent._stream_completion(MESSAGES, on_complete):
+        arrivals.append((token, time.perf_counter() - started))
+    return arrivals
+
+
+def test_deltas_are_yielded_as_they_arrive(inference):
+    inference(SlowStream(["Fall ", "registration ", "opens ", "in April."], delay=0.05))
+    completed = []
+
+    async def on_complete(text):
+        completed.append(text)
+
+    arrivals = asyncio.run(collect(GeneralAgent(), on_complete))
+    assert [token for token, _ in arrivals] == ["Fall ", "registration ", "opens ", "in April."]
+    # The first token reaches the caller long before the generation finishes
+    assert arrivals[0][1] < 0.12 < arrivals[-1][1]
+    assert completed == ["Fall registration opens in April."]
+
+
+def test_failure_before_the_first_token_is_retried(inference):
+    fake = inference(ConnectionError("refused"), SlowStream(["Hello"], delay=0))
+    arrivals = asyncio.run(collect(GeneralAgent()))
+    assert [token for token, _ in arrivals] == ["Hello"]
+    assert fake.calls == 2
+
+
+def test_failure_after_tokens_is_not_retried(inference):
+    fake = inference(SlowStream(["Fall ", "registration"], delay=0, fail_after=1), SlowStream(["again"], delay=0))
+    tokens = [token for token, _ in asyncio.run(collect(GeneralAgent()))]
+    assert tokens[0] == "Fall "
+    assert tokens[1].startswith("\n\n[Response interrupted")
+    assert fake.calls == 1
+
+
+def test_each_session_gets_its_own_agents(monkeypatch):
+    monkeypatch.setattr(registry, "get_classifier", lambda: None)
+    first, second = registry.create_session_agents(), registry.create_session_agents()
+
+    first[AgentType.EMAIL].collected_inputs = {"recipient": "Dr. Smith"}
+    first[AgentType.EMAIL].waiting_for_input = True
+    assert first[AgentType.EMAIL] is first[AgentType.EMAIL]
+    assert second[AgentType.EMAIL] is not first[AgentType.EMAIL]
+    assert second[AgentType.EMAIL].collected_inputs == {}
+    assert not second[AgentType.EMAIL].waiting_for_input
+
+    # The planner delegates to its own session's agents
+    assert first[AgentType.PLANNER].sub_agents is first
+    assert second[AgentType.PLANNER].sub_agents is second
+
+
+def test_question_too_long_for_the_context_window(monkeypatch):
+    async def no_context(query):
+        return []
+
+    def unreachable(*args, **kwargs):
+        raise AssertionError("nothing should be sent to vLLM")
+
+    agent = GeneralAgent()
+    monkeypatch.setattr(base_agent, "get_vector_db", lambda block=True: None)
+    monkeypatch.setattr(agent, "retrieve_context", no_context)
+    monkeypatch.setattr(agent, "_stream_completion", unreachable)
+    question = [{"role": "user", "content": "why " * 20000}]
+
+    answer = asyncio.run(agent.get_response(question))
+    assert "too long" in answer
+    assert "AI service is not running" not in answer
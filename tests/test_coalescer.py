@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from services.coalescer import StreamCoalescer
+
+TOKENS = ["Fall ", "starts ", "in ", "August."]
+
+
+def generation(calls, fail_after=None):
+    async def factory():
+        calls.append(1)
+        for i, token in enumerate(TOKENS):
+            if fail_after is not None and i == fail_after:
+                raise RuntimeError("backend error")
+            await asyncio.sleep(0.01)
+            yield token
+    return factory
+
+
+async def collect(stream):
+    return [token async for token in stream]
+
+
+def test_identical_requests_share_one_generation():
+    coalescer = StreamCoalescer()
+    calls = []
+
+    async def scenario():
+        leader = asyncio.ensure_future(collect(coalescer.stream("k", generation(calls))))
+        await asyncio.sleep(0.025)
+        # Joins mid-stream: gets the tokens so far, then the live ones
+        follower = await collect(coalescer.stream("k", generation(calls)))
+        return await leader, follower
+
+    leader, follower = asyncio.run(scenario())
+    assert leader == follower == TOKENS
+    assert len(calls) == 1
+    assert coalescer.stats == {"leaders": 1, "followers": 1}
+    assert coalescer.in_flight == 0
+
+
+def test_different_keys_generate_separately():
+    coalescer = StreamCoalescer()
+    calls = []
+
+    async def scenario():
+        return await asyncio.gather(
+            collect(coalescer.stream("a", generation(calls))),
+            collect(coalescer.stream("b", generation(calls))),
+        )
+
+    assert asyncio.run(scenario()) == [TOKENS, TOKENS]
+    assert len(calls) == 2
+
+
+def test_error_reaches_every_subscriber():
+    coalescer = StreamCoalescer()
+    calls = []
+
+    async def scenario():
+        results = await asyncio.gather(
+            collect(coalescer.stream("k", generation(calls, fail_after=2))),
+            collect(coalescer.stream("k", generation(calls, fail_after=2))),
+            return_exceptions=True,
+        )
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(calls) == 1
+
+
+def test_generation_survives_a_subscriber_leaving():
+    coalescer = StreamCoalescer()
+    calls = []
+
+    async def scenario():
+        quitter = asyncio.ensure_future(collect(coalescer.stream("k", generation(calls))))
+        stayer = asyncio.ensure_future(collect(coalescer.stream("k", generation(calls))))
+        await asyncio.sleep(0.015)
+        quitter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await quitter
+        return await stayer
+
+    assert asyncio.run(scenario()) == TOKENS
+    assert len(calls) == 1
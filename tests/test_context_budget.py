@@ -0,0 +1,51 @@
+import pytest
+
+from services.context_budget import ContextBudgetExceeded, fit_context
+
+SYSTEM = "You are a helpful assistant. " * 10
+
+
+def _history(pairs):
+    history = []
+    for i in range(pairs):
+        history.append({"role": "user", "content": f"question {i} " * 20})
+        history.append({"role": "assistant", "content": f"answer {i} " * 20})
+    return history
+
+
+def test_request_that_fits_is_left_alone():
+    chunks = [("short chunk", 0.9), ("another chunk", 0.5)]
+    budget = fit_context(SYSTEM, "What now?", _history(1), "summary", chunks, 256, max_model_len=4096)
+    assert budget.chunks == chunks
+    assert len(budget.history) == 2
+    assert budget.summary == "summary"
+    assert budget.max_tokens == 256
+    assert budget.dropped_chunks == budget.dropped_turns == 0
+
+
+def test_lowest_scoring_chunks_go_first():
+    chunks = [("best " * 200, 0.9), ("worst " * 200, 0.1), ("middle " * 200, 0.5)]
+    budget = fit_context(SYSTEM, "What now?", [], "", chunks, 256, max_model_len=1024)
+    assert budget.dropped_chunks >= 1
+    assert ("worst " * 200, 0.1) not in budget.chunks
+    assert budget.chunks[0][1] == 0.9
+    assert budget.prompt_tokens + budget.max_tokens <= 1024
+
+
+def test_oldest_history_pairs_go_after_chunks():
+    history = _history(10)
+    budget = fit_context(SYSTEM, "What now?", history, "", [("chunk " * 50, 0.2)], 256, max_model_len=1024)
+    assert budget.chunks == []
+    assert budget.dropped_turns % 2 == 0 and budget.dropped_turns > 0
+    assert budget.history == history[budget.dropped_turns:]
+
+
+def test_max_tokens_shrinks_as_a_last_resort():
+    budget = fit_context(SYSTEM, "What now? " * 150, [], "", [], 1024, max_model_len=1024)
+    assert budget.max_tokens < 1024
+    assert budget.prompt_tokens + budget.max_tokens <= 1024
+
+
+def test_question_that_cannot_fit_raises():
+    with pytest.raises(ContextBudgetExceeded):
+        fit_context(SYSTEM, "What now? " * 2000, [], "", [], 256, max_model_len=1024)
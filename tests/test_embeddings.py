@@ -0,0 +1,107 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("faiss")
+
+import utils.vector_db as vector_db  # noqa: E402
+from utils.vector_db import ONNX_CONFIG_FILE, ONNX_MODEL_FILE, OnnxEmbeddings, make_embeddings  # noqa: E402
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "fall": 2, "registration": 3, "deadline": 4, "aid": 5}
+
+
+@pytest.fixture
+def fake_huggingface(monkeypatch):
+    created = []
+
+    class HuggingFaceEmbeddings:
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+
+    monkeypatch.setitem(sys.modules, "langchain_huggingface", SimpleNamespace(HuggingFaceEmbeddings=HuggingFaceEmbeddings))
+    return created
+
+
+@pytest.fixture
+def onnx_model_dir(tmp_path):
+    """An embedding-lookup "encoder" whose hidden states are the token embeddings"""
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    table = np.random.default_rng(0).normal(size=(len(VOCAB), 8)).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"]),
+            # attention_mask is an input of the real export; keep it in the graph
+            helper.make_node("Identity", ["attention_mask"], ["mask_out"]),
+        ],
+        "lookup",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "sequence"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "sequence"]),
+        ],
+        [
+            helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "sequence", 8]),
+            helper.make_tensor_value_info("mask_out", TensorProto.INT64, ["batch", "sequence"]),
+        ],
+        initializer=[numpy_helper.from_array(table, "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)])
+    model.ir_version = 8
+    onnx.save(model, str(tmp_path / ONNX_MODEL_FILE))
+
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    with open(tmp_path / ONNX_CONFIG_FILE, "w", encoding="utf-8") as f:
+        json.dump({"model_id": "test", "max_length": 16, "pad_token": "[PAD]", "pad_id": 0}, f)
+    return str(tmp_path), table
+
+
+def test_onnx_embeddings_mean_pool_over_real_tokens(onnx_model_dir):
+    model_dir, table = onnx_model_dir
+    embeddings = OnnxEmbeddings(model_dir, threads=1, batch_size=2)
+
+    expected = table[[2, 3]].mean(axis=0)
+    expected /= np.linalg.norm(expected)
+    np.testing.assert_allclose(embeddings.embed_query("fall registration"), expected, rtol=1e-5)
+
+    # Padding in a mixed-length batch, and batch boundaries, don't change a text's embedding
+    texts = ["fall registration", "aid", "fall registration deadline"]
+    vectors = np.asarray(embeddings.embed_documents(texts))
+    assert vectors.shape == (3, 8)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(vectors[0], expected, rtol=1e-5)
+    np.testing.assert_allclose(vectors[2], embeddings.embed_query(texts[2]), rtol=1e-5)
+    assert embeddings.embed_documents([]) == []
+
+
+def test_make_embeddings_uses_the_onnx_export(onnx_model_dir, monkeypatch, fake_huggingface):
+    model_dir, _ = onnx_model_dir
+    monkeypatch.setattr(vector_db, "OnnxEmbeddings", lambda: OnnxEmbeddings(model_dir, threads=1))
+    assert isinstance(make_embeddings("onnx"), OnnxEmbeddings)
+    assert fake_huggingface == []
+
+
+def test_make_embeddings_falls_back_to_torch_without_an_export(tmp_path, monkeypatch, fake_huggingface):
+    monkeypatch.setattr(vector_db, "OnnxEmbeddings", lambda: OnnxEmbeddings(str(tmp_path / "missing")))
+    embeddings = make_embeddings("onnx")
+    assert isinstance(embeddings, sys.modules["langchain_huggingface"].HuggingFaceEmbeddings)
+    assert fake_huggingface[0]["model_name"] == vector_db.EMBEDDING_MODEL_ID
+
+
+def test_torch_backend_skips_onnx(monkeypatch, fake_huggingface):
+    def unexpected(*args, **kwargs):
+        raise AssertionError("ONNX backend should not be loaded")
+
+    monkeypatch.setattr(vector_db, "OnnxEmbeddings", unexpected)
+    make_embeddings("torch")
+    assert len(fake_huggingface) == 1
@@ -0,0 +1,57 @@
+import asyncio
+
+import openai
+import pytest
+
+from benchmarks.fake_server import FakeOpenAIServer, SyntheticProfile
+from services.inference_client import InferenceClient
+
+MESSAGES = [{"role": "user", "content": "When does fall registration open?"}]
+
+
+async def serving(profile, **kwargs):
+    server = FakeOpenAIServer(profile, port=0, **kwargs)
+    await server.start()
+    port = server._server.sockets[0].getsockname()[1]
+    client = InferenceClient(base_urls=[f"http://127.0.0.1:{port}/v1"], record_path=None)
+    return server, client
+
+
+def fast_profile(**kwargs):
+    return SyntheticProfile(prefill_latency=0.01, prefill_jitter=0.0, tokens_per_second=1000, seed=1, **kwargs)
+
+
+def test_streams_chat_completions_over_keep_alive():
+    async def scenario():
+        server, client = await serving(fast_profile(response_tokens=10))
+        try:
+            for _ in range(2):
+                stream = await client.chat_completion(model="fake-model", messages=MESSAGES, stream=True)
+                tokens = [chunk.choices[0].delta.content async for chunk in stream
+                          if chunk.choices and chunk.choices[0].delta.content]
+                assert len(tokens) == 10
+            response = await client.chat_completion(model="fake-model", messages=MESSAGES, max_tokens=5)
+            assert len(response.choices[0].message.content.split()) == 5
+            models = await client.list_models()
+            assert [model.id for model in models.data] == ["fake-model"]
+            return server.stats
+        finally:
+            await client.aclose()
+            await server.close()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] >= 3
+    assert stats["errors"] == 0
+
+
+def test_error_rate_returns_server_errors():
+    async def scenario():
+        server, client = await serving(fast_profile(error_rate=1.0))
+        try:
+            with pytest.raises(openai.InternalServerError):
+                await client.chat_completion(model="fake-model", messages=MESSAGES)
+        finally:
+            await client.aclose()
+            await server.close()
+
+    asyncio.run(scenario())
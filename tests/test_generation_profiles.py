@@ -0,0 +1,35 @@
+from config.generation_profiles import MAX_GENERATION_TOKENS
+from services.context_budget import fit_context
+from services.generation_profiles import predict_length, select_profile
+
+
+def test_agent_defaults_and_intents():
+    assert select_profile("redirect").max_tokens == 400
+    code = select_profile("general", "Write a python function to parse dates")
+    assert code.intent == "code"
+    assert code.temperature == 0.1
+    assert select_profile("academic", "Briefly, when does fall start?").intent == "brief"
+
+
+def test_explicit_length_request_wins():
+    assert predict_length("explain it in 300 words") == int(300 * 1.4) + 64
+    profile = select_profile("redirect", "describe the program in 500 words")
+    assert profile.intent == "length_request"
+    assert profile.max_tokens > 400
+
+
+def test_code_profile_keeps_full_budget_for_fit_context_to_trim():
+    # Regression: the profile used to pre-shrink max_tokens against the prompt, so fit_context
+    # then dropped chunks on top of an already-truncated answer
+    profile = select_profile("general", "Write a python function to parse dates")
+    assert profile.max_tokens == MAX_GENERATION_TOKENS
+
+    history = []
+    for i in range(3):
+        history.append({"role": "user", "content": f"question {i} " * 60})
+        history.append({"role": "assistant", "content": f"answer {i} " * 200})
+    chunks = [(f"chunk {i} " * 500, 0.9 - i * 0.1) for i in range(5)]
+    budget = fit_context("You are a helpful assistant.", "Write a python function to parse dates",
+                         history, "", chunks, profile.max_tokens, max_model_len=8192)
+    assert budget.dropped_chunks + budget.dropped_turns > 0
+    assert budget.max_tokens == MAX_GENERATION_TOKENS
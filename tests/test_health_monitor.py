@@ -0,0 +1,98 @@
+import asyncio
+import sys
+import time
+import types
+
+from services.health_monitor import BreakerState, CircuitBreaker, HealthMonitor
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_breaker_opens_after_threshold_and_fails_fast():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1)
+    open_breaker(breaker)
+    assert breaker.allow_request()
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_released_trial_lets_the_next_request_through():
+    monitor = HealthMonitor(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=1))
+    open_breaker(monitor.breaker)
+    assert monitor.allow_request()
+    assert monitor.is_trial()
+    # e.g. the trial was rejected by admission control or cancelled
+    monitor.release_trial()
+    assert monitor.allow_request()
+
+
+def test_closed_breaker_requests_are_not_trials():
+    monitor = HealthMonitor(breaker=CircuitBreaker())
+    assert monitor.allow_request()
+    assert not monitor.is_trial()
+
+
+class FakeIndex:
+    def __init__(self, changed=True, error=None):
+        self.changed = changed
+        self.error = error
+        self.index_version = "v1"
+        self.checks = 0
+
+    def reload_if_changed(self):
+        self.checks += 1
+        if self.error is not None:
+            raise self.error
+        if self.changed:
+            self.changed = False
+            self.index_version = "v2"
+            return True
+        return False
+
+
+def with_index(monkeypatch, index):
+    module = types.ModuleType("utils.vector_db")
+    module.get_vector_db = lambda block=True: index
+    monkeypatch.setitem(sys.modules, "utils.vector_db", module)
+
+
+def test_monitor_reloads_a_rebuilt_index_at_its_interval(monkeypatch):
+    index = FakeIndex()
+    with_index(monkeypatch, index)
+    monitor = HealthMonitor(index_check_interval=60)
+    assert asyncio.run(monitor.check_index())
+    assert index.index_version == "v2"
+    # Rate limited until the interval has passed
+    assert not asyncio.run(monitor.check_index())
+    assert index.checks == 1
+
+
+def test_failed_reload_keeps_the_loaded_index(monkeypatch):
+    index = FakeIndex(error=RuntimeError("index is being written"))
+    with_index(monkeypatch, index)
+    assert not asyncio.run(HealthMonitor(index_check_interval=60).check_index())
+    assert index.index_version == "v1"
+
+
+def test_index_check_waits_for_startup_and_can_be_disabled(monkeypatch):
+    with_index(monkeypatch, None)
+    assert not asyncio.run(HealthMonitor(index_check_interval=60).check_index())
+    index = FakeIndex()
+    with_index(monkeypatch, index)
+    assert not asyncio.run(HealthMonitor(index_check_interval=0).check_index())
+    assert index.checks == 0
@@ -0,0 +1,63 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import services.history as history
+from services.history import HistoryManager
+
+
+class SlowClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="summary"))])
+
+
+class OpenAdmission:
+    @asynccontextmanager
+    async def admit(self, agent_type, priority=0):
+        yield
+
+
+def _manager():
+    manager = HistoryManager(token_budget=20)
+    for i in range(4):
+        manager.add_turn(f"question {i} " * 5, f"answer {i} " * 5)
+    return manager
+
+
+def test_summary_runs_once_per_session_across_rebuilt_managers(monkeypatch):
+    client = SlowClient()
+    monkeypatch.setattr(history, "get_inference_client", lambda: client)
+    monkeypatch.setattr(history, "get_admission_controller", lambda: OpenAdmission())
+
+    async def scenario():
+        # Each message rebuilds the manager from session state
+        _manager().schedule_summary(session_id="s1")
+        _manager().schedule_summary(session_id="s1")
+        _manager().schedule_summary(session_id="s2")
+        await asyncio.gather(*history._summary_tasks.values())
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert client.calls == 2
+    assert history._summary_tasks == {}
+
+
+def test_summary_drops_only_the_summarized_turns(monkeypatch):
+    monkeypatch.setattr(history, "get_inference_client", lambda: SlowClient())
+    monkeypatch.setattr(history, "get_admission_controller", lambda: OpenAdmission())
+    manager = _manager()
+
+    async def scenario():
+        manager.schedule_summary()
+        manager.add_turn("late question", "late answer")
+        await manager._summary_task
+
+    asyncio.run(scenario())
+    assert manager.summary == "summary"
+    assert manager.turns[-1]["content"] == "late answer"
+    assert len(manager.turns) < 10
@@ -0,0 +1,185 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from services.inference_client import InferenceClient
+
+URLS = ["http://replica-a/v1", "http://replica-b/v1"]
+
+
+class FakeStream:
+    def __init__(self, chunks, delay=0.01):
+        self.chunks = list(chunks)
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        await asyncio.sleep(self.delay)
+        if self.closed or not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+def fake_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def hedging_client(first_byte: float):
+    client = InferenceClient(base_urls=URLS, hedge=True, record_path=None)
+    for replica in client.router.replicas:
+        # Enough history for a hedge delay of ~0.1s
+        replica.latencies.extend([0.1] * 50)
+
+    async def create(**request):
+        await asyncio.sleep(first_byte)
+        return FakeStream(["a", "b", "c", "d"])
+
+    for replica in client.router.replicas:
+        replica.client = fake_client(create)
+    return client
+
+
+async def read_all(client):
+    stream = await client.chat_completion(model="m", messages=[{"role": "user", "content": "hi"}], stream=True)
+    chunks = [chunk async for chunk in stream]
+    await asyncio.sleep(0.05)
+    return chunks
+
+
+def test_stream_that_beats_the_hedge_delay_is_read_to_the_end():
+    client = hedging_client(first_byte=0.0)
+    assert asyncio.run(read_all(client)) == ["a", "b", "c", "d"]
+    assert all(replica.in_flight == 0 for replica in client.router.replicas)
+
+
+def test_hedged_stream_is_read_to_the_end():
+    client = hedging_client(first_byte=0.15)
+    assert asyncio.run(read_all(client)) == ["a", "b", "c", "d"]
+    assert sum(replica.stats["hedges"] for replica in client.router.replicas) == 1
+    assert all(replica.in_flight == 0 for replica in client.router.replicas)
+
+
+def _status_error(cls, status):
+    request = httpx.Request("POST", URLS[0] + "/chat/completions")
+    return cls("error", response=httpx.Response(status, request=request), body=None)
+
+
+def _failing_client(error):
+    client = InferenceClient(base_urls=URLS[:1], record_path=None)
+
+    async def create(**request):
+        raise error
+
+    client.router.replicas[0].client = fake_client(create)
+    return client
+
+
+async def _call_repeatedly(client, times=5):
+    for _ in range(times):
+        try:
+            await client.chat_completion(model="m", messages=[{"role": "user", "content": "hi"}])
+        except openai.OpenAIError:
+            pass
+
+
+def test_client_errors_do_not_eject_the_replica():
+    client = _failing_client(_status_error(openai.BadRequestError, 400))
+    asyncio.run(_call_repeatedly(client))
+    replica = client.router.replicas[0]
+    assert replica.stats["failures"] == 0
+    assert replica.stats["ejections"] == 0
+
+
+def test_server_errors_and_timeouts_eject_the_replica():
+    for error in (
+        _status_error(openai.InternalServerError, 503),
+        openai.APITimeoutError(request=httpx.Request("POST", URLS[0])),
+    ):
+        client = _failing_client(error)
+        asyncio.run(_call_repeatedly(client))
+        replica = client.router.replicas[0]
+        assert replica.stats["failures"] == 5
+        assert replica.stats["ejections"] >= 1
+
+
+def test_replicas_share_one_connection_pool():
+    client = InferenceClient(base_urls=URLS, record_path=None)
+    assert {id(replica.client._client) for replica in client.router.replicas} == {id(client._http_client)}
+    assert all(replica.client.max_retries == 0 for replica in client.router.replicas)
+    asyncio.run(client.aclose())
+    assert client._http_client.is_closed
+
+
+def test_sequential_requests_reuse_a_kept_alive_connection():
+    from benchmarks.fake_server import FakeOpenAIServer, SyntheticProfile
+
+    async def scenario():
+        server = FakeOpenAIServer(SyntheticProfile(prefill_latency=0.0, prefill_jitter=0.0, tokens_per_second=1000), port=0)
+        connections = []
+        handle = server._handle_connection
+
+        async def counting(reader, writer):
+            connections.append(writer)
+            await handle(reader, writer)
+
+        server._handle_connection = counting
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        client = InferenceClient(base_urls=[f"http://127.0.0.1:{port}/v1"], record_path=None)
+        try:
+            for _ in range(3):
+                await client.chat_completion(model="fake-model", messages=[{"role": "user", "content": "hi"}])
+            await client.list_models()
+        finally:
+            await client.aclose()
+            await server.close()
+        return len(connections), server.stats["requests"]
+
+    connections, requests = asyncio.run(scenario())
+    assert requests == 3
+    assert connections == 1
+
+
+def test_probe_checks_every_replica_and_drives_ejection():
+    client = InferenceClient(base_urls=URLS, record_path=None)
+    down = {"http://replica-a/v1"}
+
+    def models_client(url):
+        async def list_models(timeout=None):
+            if url in down:
+                raise httpx.ConnectError("connection refused")
+            return SimpleNamespace(data=[SimpleNamespace(id="m")], url=url)
+        return SimpleNamespace(models=SimpleNamespace(list=list_models))
+
+    for replica in client.router.replicas:
+        replica.client = models_client(replica.url)
+    first, second = client.router.replicas
+
+    async def probe(times):
+        for _ in range(times):
+            result = await client.list_models()
+        return result
+
+    # One replica down: probes still succeed, and the dead one is ejected
+    assert asyncio.run(probe(3)).url == second.url
+    assert first.stats["ejections"] == 1
+    assert client.router.healthy() == [second]
+
+    # It answers again on the next probe and is re-admitted without waiting out the cool-down
+    down.clear()
+    asyncio.run(probe(1))
+    assert client.router.healthy() == [first, second]
+
+    # Only when no replica responds does the probe fail
+    down.update(URLS)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(probe(1))
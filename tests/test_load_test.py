@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from benchmarks.load_test import build_parser, configure_environment, percentile
+
+ENVIRONMENT = (
+    "INFERENCE_SERVER_URLS", "INFERENCE_SERVER_URL", "STATE_BACKEND", "ENABLE_Q_REWRITE",
+    "RESPONSE_CACHE_ENABLED", "SEMANTIC_CACHE_ENABLED", "COALESCE_ENABLED",
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch):
+    # Registered with monkeypatch so whatever configure_environment sets is undone
+    for name in ENVIRONMENT:
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_fake_server_url_overrides_an_exported_replica_list(monkeypatch):
+    monkeypatch.setenv("INFERENCE_SERVER_URLS", "http://gpu-1:5000/v1,http://gpu-2:5000/v1")
+    monkeypatch.setenv("INFERENCE_SERVER_URL", "http://gpu-1:5000/v1")
+    configure_environment(build_parser().parse_args([]), "http://127.0.0.1:5001/v1")
+    assert os.environ["INFERENCE_SERVER_URLS"] == "http://127.0.0.1:5001/v1"
+    assert os.environ["INFERENCE_SERVER_URL"] == "http://127.0.0.1:5001/v1"
+    assert os.environ["STATE_BACKEND"] == "memory"
+    assert os.environ["RESPONSE_CACHE_ENABLED"] == "false"
+
+
+def test_replica_list_from_the_command_line():
+    configure_environment(build_parser().parse_args(["--with-caches"]), "http://a/v1, http://b/v1")
+    assert os.environ["INFERENCE_SERVER_URL"] == "http://a/v1"
+    assert os.environ["INFERENCE_SERVER_URLS"] == "http://a/v1, http://b/v1"
+    assert "RESPONSE_CACHE_ENABLED" not in os.environ
+
+
+def test_percentile_interpolates():
+    assert percentile([], 50) is None
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
@@ -0,0 +1,31 @@
+import pytest
+
+from utils import metrics
+
+
+def test_helpers_never_raise_whichever_backend_is_installed():
+    with metrics.time_stage("retrieve", "academic"):
+        pass
+    metrics.record_generation("academic", ttft=0.2, total=1.2, tokens=41)
+    metrics.record_retry(None)
+
+    @metrics.timed_redis
+    def get_conversation(key):
+        return key
+
+    assert get_conversation("k") == "k"
+
+
+def test_stage_latency_and_stats_sources_are_exported():
+    pytest.importorskip("prometheus_client")
+    from prometheus_client import REGISTRY
+
+    labels = {"stage": "rewrite", "agent_type": "email"}
+    before = REGISTRY.get_sample_value("unt_stage_seconds_count", labels) or 0
+    metrics.record_stage("rewrite", "email", 0.03)
+    assert REGISTRY.get_sample_value("unt_stage_seconds_count", labels) == before + 1
+
+    metrics.register_stats_source("test_component", lambda: {"hits": 3, "enabled": True, "name": "x"})
+    assert REGISTRY.get_sample_value("unt_component_stat", {"component": "test_component", "stat": "hits"}) == 3
+    # Only numbers are exported
+    assert REGISTRY.get_sample_value("unt_component_stat", {"component": "test_component", "stat": "enabled"}) is None
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import services.pipeline as pipeline_module
+from models.classification import AgentType
+from services.pipeline import MessagePipeline, is_material_change
+
+
+class StubRewriter:
+    def __init__(self, refined: str, delay: float = 0.0):
+        self.refined = refined
+        self.delay = delay
+
+    async def rewrite(self, question: str) -> str:
+        await asyncio.sleep(self.delay)
+        return self.refined
+
+
+def slow_classify(text: str) -> AgentType:
+    time.sleep(0.1)
+    return AgentType.ACADEMIC
+
+
+async def slow_retrieve(text: str):
+    await asyncio.sleep(0.1)
+    return [(f"doc for {text}", 0.9)]
+
+
+def test_material_change():
+    assert not is_material_change("What is UNT?", "what is  unt?")
+    assert is_material_change("cs grad reqs", "What are the admission requirements for the CS graduate program?")
+
+
+def test_stages_run_concurrently(monkeypatch):
+    monkeypatch.setattr(pipeline_module, "get_query_rewriter", lambda: StubRewriter("What is UNT?", delay=0.1))
+    pipeline = MessagePipeline(classify=slow_classify, retrieve=slow_retrieve)
+    started = time.perf_counter()
+    result = asyncio.run(pipeline.run("What is UNT?"))
+    elapsed = time.perf_counter() - started
+
+    assert result.agent_type == AgentType.ACADEMIC
+    assert result.context == [("doc for What is UNT?", 0.9)]
+    assert not result.speculation_discarded
+    # Rewrite, classification and retrieval overlap instead of taking ~0.3s in sequence
+    assert elapsed < 0.25
+
+
+def test_material_rewrite_reruns_speculative_stages(monkeypatch):
+    refined = "What are the admission requirements for the computer science graduate program?"
+    monkeypatch.setattr(pipeline_module, "get_query_rewriter", lambda: StubRewriter(refined))
+    result = asyncio.run(MessagePipeline(classify=slow_classify, retrieve=slow_retrieve).run("cs grad reqs"))
+
+    assert result.refined_input == refined
+    assert result.speculation_discarded
+    assert result.context == [(f"doc for {refined}", 0.9)]
+    assert "retrieve_refined" in result.timings
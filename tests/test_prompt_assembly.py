@@ -0,0 +1,45 @@
+from config.prompts import BASE_PROMPT_TEMPLATE
+from services.prompt_assembly import (
+    CONTEXT_HEADER,
+    QUESTION_HEADER,
+    SUMMARY_HEADER,
+    assemble_messages,
+    format_context,
+    section_tokens,
+    split_system_prompt,
+)
+
+SYSTEM = BASE_PROMPT_TEMPLATE + "\nYou help with academic questions."
+HISTORY = [{"role": "user", "content": "Hi", "tokens": 5}, {"role": "assistant", "content": "Hello", "tokens": 6}]
+
+
+def test_layout_is_system_history_then_context_and_question():
+    context = format_context([("Chunk one", 0.9), ("Chunk two", 0.4)])
+    messages = assemble_messages(SYSTEM, "When is fall break?", HISTORY, "Earlier: greetings", context)
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[0]["content"] == SYSTEM + SUMMARY_HEADER + "Earlier: greetings"
+    # History is copied without bookkeeping fields
+    assert messages[1] == {"role": "user", "content": "Hi"}
+    assert messages[-1]["content"] == f"{CONTEXT_HEADER}Chunk one\nChunk two{QUESTION_HEADER}When is fall break?"
+
+
+def test_the_system_prefix_is_identical_across_questions():
+    first = assemble_messages(SYSTEM, "Question one", context=format_context([("a", 0.5)]))
+    second = assemble_messages(SYSTEM, "Question two", HISTORY, context=format_context([("b", 0.5)]))
+    assert first[0] == second[0]
+
+
+def test_no_context_leaves_the_question_untouched_and_images_keep_their_parts():
+    assert assemble_messages(SYSTEM, "Hi")[-1]["content"] == "Hi"
+    image = [{"type": "image_url", "image_url": {"url": "data:image/png;base64,xx"}}]
+    content = assemble_messages(SYSTEM, image, context="Relevant context:\nChunk")[-1]["content"]
+    assert content[0]["type"] == "text" and content[0]["text"].startswith(CONTEXT_HEADER)
+    assert content[1:] == image
+
+
+def test_sections_split_base_and_agent_suffix():
+    sections = split_system_prompt(SYSTEM)
+    assert sections["base"] == BASE_PROMPT_TEMPLATE
+    assert sections["agent_suffix"] == "\nYou help with academic questions."
+    counts = section_tokens(SYSTEM, "When is fall break?", HISTORY, context="Relevant context:\nChunk")
+    assert counts["total"] > counts["cacheable_prefix"] > counts["base"] > 0
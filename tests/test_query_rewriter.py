@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.query_rewriter as query_rewriter
+from config.prompts import STARTER_PROMPTS
+from services.query_rewriter import QueryRewriter
+
+MESSY = "hey so like what do i need to do for applying to the cs masters thing"
+
+
+class FakeClient:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def chat_completion(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=" What are the application requirements for the MS in Computer Science? "
+        ))])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(query_rewriter, "get_inference_client", lambda: fake)
+    monkeypatch.setattr(query_rewriter, "get_redis_manager", lambda: None)
+    return fake
+
+
+def test_clear_questions_skip_the_llm(client):
+    rewriter = QueryRewriter()
+    assert rewriter.should_skip(STARTER_PROMPTS[0]["message"])
+    assert rewriter.should_skip("thanks")
+    assert rewriter.should_skip("When does registration for the fall semester open?")
+    assert not rewriter.should_skip(MESSY)
+
+
+def test_rewrites_are_cached_by_normalized_question(client):
+    rewriter = QueryRewriter(latency_budget=1.0)
+
+    async def scenario():
+        first = await rewriter.rewrite(MESSY)
+        await asyncio.sleep(0)
+        second = await rewriter.rewrite("  " + MESSY.upper() + " ")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == "What are the application requirements for the MS in Computer Science?"
+    assert client.calls == 1
+    assert rewriter.stats["hits"] == 1
+
+
+def test_slow_rewrite_falls_back_but_still_fills_the_cache(client):
+    client.delay = 0.1
+    rewriter = QueryRewriter(latency_budget=0.01)
+
+    async def scenario():
+        original = await rewriter.rewrite(MESSY)
+        await asyncio.sleep(0.2)
+        return original, await rewriter.rewrite(MESSY)
+
+    original, cached = asyncio.run(scenario())
+    assert original == MESSY
+    assert cached.startswith("What are the application requirements")
+    assert rewriter.stats["timeouts"] == 1
+    assert client.calls == 1
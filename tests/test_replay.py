@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from benchmarks.fake_server import FakeOpenAIServer, SyntheticProfile
+from benchmarks.replay_server import ReplaySource
+from services.inference_client import InferenceClient
+from services.traffic_recorder import request_key
+
+MESSAGES = [{"role": "user", "content": "Where is the financial aid office?"}]
+
+
+def test_request_key_ignores_transport_options():
+    request = {"model": "m", "messages": MESSAGES, "max_tokens": 64, "temperature": 0.2}
+    assert request_key(request) == request_key({**request, "stream": True, "timeout": 30, "extra_headers": {}})
+    assert request_key(request) != request_key({**request, "max_tokens": 65})
+
+
+def test_recorded_stream_replays_with_its_tokens_and_timing(tmp_path):
+    recording = tmp_path / "traffic.jsonl"
+
+    async def record():
+        profile = SyntheticProfile(prefill_latency=0.02, prefill_jitter=0.0, tokens_per_second=200,
+                                   response_tokens=8, seed=3)
+        server = FakeOpenAIServer(profile, port=0)
+        await server.start()
+        port = server._server.sockets[0].getsockname()[1]
+        client = InferenceClient(base_urls=[f"http://127.0.0.1:{port}/v1"], record_path=str(recording))
+        try:
+            stream = await client.chat_completion(
+                model="fake-model", messages=MESSAGES, max_tokens=64, temperature=0.2, stream=True
+            )
+            return [chunk.choices[0].delta.content async for chunk in stream
+                    if chunk.choices and chunk.choices[0].delta.content]
+        finally:
+            await client.aclose()
+            await server.close()
+
+    tokens = asyncio.run(record())
+    record_line = json.loads(recording.read_text().splitlines()[0])
+    assert record_line["tokens"] == tokens
+    assert record_line["prefill"] >= 0.02
+    assert len(record_line["gaps"]) == len(tokens) - 1
+
+    source = ReplaySource(str(recording), on_miss="error")
+    plan = source.plan({"model": "fake-model", "messages": MESSAGES, "max_tokens": 64, "temperature": 0.2,
+                        "stream": True})
+    assert plan.tokens == tokens
+    assert plan.prefill == record_line["prefill"]
+    assert source.plan({"model": "fake-model", "messages": MESSAGES}).error_status == 404
+    assert source.stats == {"hits": 1, "misses": 1}
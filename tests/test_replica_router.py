@@ -0,0 +1,78 @@
+import time
+
+from services.inference_client import prefix_routing_key
+from services.replica_router import Replica, ReplicaRouter, parse_prefix_cache_metrics
+
+URLS = ["http://a/v1", "http://b/v1", "http://c/v1"]
+
+
+def router(mode="least_outstanding"):
+    return ReplicaRouter([Replica(url, client=None) for url in URLS], mode=mode)
+
+
+def test_least_outstanding_then_lowest_latency():
+    pool = router()
+    a, b, c = pool.replicas
+    a.in_flight, b.in_flight, c.in_flight = 2, 1, 1
+    b.ewma_latency, c.ewma_latency = 0.5, 0.2
+    assert pool.choose() is c
+    assert pool.choose(exclude=c) is b
+
+
+def test_repeated_failures_eject_until_cool_down():
+    pool = router()
+    a = pool.choose()
+    for _ in range(3):
+        pool.record_failure(a)
+    assert a.stats["ejections"] == 1
+    assert all(pool.choose() is not a for _ in range(5))
+    a.ejected_until = time.monotonic() - 1
+    pool.record_latency(a, 0.1)
+    assert a.consecutive_failures == 0
+    assert a in pool.healthy()
+
+
+def test_all_ejected_fails_open_to_the_nearest_readmission():
+    pool = router()
+    for offset, replica in enumerate(pool.replicas):
+        replica.ejected_until = time.monotonic() + 10 + offset
+    assert pool.choose() is pool.replicas[0]
+    assert pool.choose(exclude=pool.replicas[0]) is None
+
+
+def test_session_keys_stick_to_one_replica():
+    pool = router("session")
+    homes = {f"session-{i}": pool.choose(key=f"session-{i}") for i in range(30)}
+    assert all(pool.choose(key=key) is home for key, home in homes.items())
+    # Keys spread over more than one replica
+    assert len({home.url for home in homes.values()}) > 1
+
+
+def test_overloaded_home_spills_to_the_next_replica():
+    pool = router("session")
+    home = pool.choose(key="busy-session")
+    home.in_flight = 10
+    spilled = pool.choose(key="busy-session")
+    assert spilled is not home
+    assert spilled.stats["spilled"] == 1
+    home.in_flight = 0
+    assert pool.choose(key="busy-session") is home
+
+
+def test_prefix_key_is_stable_across_turns():
+    system = {"role": "system", "content": "You are the UNT assistant."}
+    messages = [system, {"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"},
+                {"role": "user", "content": "Deadlines?"}]
+    assert prefix_routing_key(messages) == prefix_routing_key(messages[:3] + [{"role": "user", "content": "Other"}])
+
+
+def test_prefix_cache_metrics_from_v0_gauge_and_v1_counters():
+    assert parse_prefix_cache_metrics('vllm:gpu_prefix_cache_hit_rate{model="m"} 0.75\n') == ("rate", 0.75, 0.0)
+    text = 'vllm:prefix_cache_queries_total{model="m"} 200\nvllm:prefix_cache_hits_total{model="m"} 50\n'
+    assert parse_prefix_cache_metrics(text) == ("counters", 200.0, 50.0)
+    assert parse_prefix_cache_metrics("other_metric 1\n") is None
+
+    replica = Replica("http://a/v1", client=None)
+    replica.update_prefix_cache(text)
+    replica.update_prefix_cache(text.replace("200", "300").replace("50", "140"))
+    assert replica.prefix_cache_hit_rate == 0.9
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+
+import services.response_cache as response_cache
+from services.response_cache import ResponseCache, replay_stream
+from utils.lru_cache import LRUCache
+
+HISTORY = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(response_cache, "get_redis_manager", lambda: None)
+
+
+def test_key_normalizes_the_question_but_covers_everything_else():
+    cache = ResponseCache()
+    key = cache.make_key("academic", "prompt", "When does  Fall start?", "ctx", HISTORY)
+    assert key == cache.make_key("academic", "prompt", " when does fall START? ", "ctx", HISTORY)
+    assert key != cache.make_key("redirect", "prompt", "When does Fall start?", "ctx", HISTORY)
+    assert key != cache.make_key("academic", "prompt v2", "When does Fall start?", "ctx", HISTORY)
+    assert key != cache.make_key("academic", "prompt", "When does Fall start?", "other ctx", HISTORY)
+    assert key != cache.make_key("academic", "prompt", "When does Fall start?", "ctx", [])
+
+
+def test_hit_after_store_and_invalidation_on_index_change():
+    cache = ResponseCache()
+    cache.sync_index_version("v1")
+    key = cache.make_key("academic", "prompt", "q")
+
+    async def scenario():
+        assert await cache.get(key) is None
+        await cache.set(key, "answer")
+        assert await cache.get(key) == "answer"
+        cache.sync_index_version("v2")
+        assert await cache.get(key) is None
+
+    asyncio.run(scenario())
+    assert cache.make_key("academic", "prompt", "q") != key
+    assert cache.stats["hits"] == 1
+    assert cache.stats["invalidations"] == 1
+
+
+def test_replay_reproduces_the_answer_exactly():
+    text = "Fall classes start on  August 24.\n\n- Register early\n- Pay tuition"
+
+    async def collect():
+        return [chunk async for chunk in replay_stream(text)]
+
+    chunks = asyncio.run(collect())
+    assert "".join(chunks) == text
+    assert len(chunks) > 1
+
+
+def test_lru_cache_evicts_least_recently_used_and_expires():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    expiring = LRUCache(max_size=2, ttl=0.01)
+    expiring.set("a", 1)
+    time.sleep(0.02)
+    assert expiring.get("a") is None
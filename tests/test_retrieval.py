@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+
+# services.retrieval imports the vector store module, which needs langchain
+pytest.importorskip("langchain_community")
+
+import services.retrieval as retrieval  # noqa: E402
+from services.retrieval import RetrievalService  # noqa: E402
+
+
+class FakeIndex:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.threads = set()
+        self.fail = fail
+
+    def search_batch(self, queries, k):
+        self.batches.append(list(queries))
+        self.threads.add(threading.current_thread().name)
+        if self.fail:
+            raise RuntimeError("index unavailable")
+        return [[(f"{query} doc {i}", 1.0 - i / 10) for i in range(k)] for query in queries]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    fake = FakeIndex()
+    monkeypatch.setattr(retrieval, "get_vector_db", lambda block=True: fake)
+    return fake
+
+
+def test_concurrent_queries_share_one_batch(index):
+    service = RetrievalService(window_ms=20, max_batch=16, workers=1)
+
+    async def scenario():
+        return await asyncio.gather(
+            service.search("a", k=2), service.search("b", k=3), service.search("a", k=1)
+        )
+
+    a, b, a_short = asyncio.run(scenario())
+    assert a == [("a doc 0", 1.0), ("a doc 1", 0.9)]
+    assert len(b) == 3 and b[0][0] == "b doc 0"
+    assert a_short == a[:1]
+    # One embedding + FAISS call, with the duplicate query searched once, off the event loop
+    assert index.batches == [["a", "b"]]
+    assert all(name.startswith("retrieval") for name in index.threads)
+    service.shutdown()
+
+
+def test_full_batch_flushes_without_waiting_for_the_window(index):
+    service = RetrievalService(window_ms=10_000, max_batch=2, workers=1)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(service.search("a"), service.search("b")), timeout=2)
+
+    asyncio.run(scenario())
+    assert index.batches == [["a", "b"]]
+    service.shutdown()
+
+
+def test_batch_failure_reaches_every_caller(monkeypatch):
+    monkeypatch.setattr(retrieval, "get_vector_db", lambda block=True: FakeIndex(fail=True))
+    service = RetrievalService(window_ms=5, max_batch=16, workers=1)
+
+    async def scenario():
+        return await asyncio.gather(service.search("a"), service.search("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
+    service.shutdown()
+
+
+def test_in_flight_batches_are_held_until_done(index):
+    service = RetrievalService(window_ms=5, max_batch=16, workers=1)
+
+    async def scenario():
+        search = asyncio.ensure_future(service.search("a"))
+        while not service._tasks:
+            await asyncio.sleep(0.001)
+        in_flight = len(service._tasks)
+        await search
+        await asyncio.sleep(0)
+        return in_flight
+
+    assert asyncio.run(scenario()) == 1
+    assert service._tasks == set()
+    service.shutdown()
@@ -0,0 +1,39 @@
+import numpy as np
+
+from models.classification import AgentType
+from services.semantic_cache import SemanticCache
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_paraphrase_above_threshold_hits():
+    cache = SemanticCache(threshold=0.9, agents={"academic"})
+    cache.store("academic", "v1", "When does fall start?", _unit(1, 0, 0), "August 24")
+    assert cache.lookup("academic", "v1", "When is the start of fall?", _unit(1, 0.1, 0)) == "August 24"
+    assert cache.lookup("academic", "v1", "Where is the library?", _unit(0, 1, 0)) is None
+
+
+def test_entries_are_scoped_to_agent_and_prompt_version():
+    cache = SemanticCache(threshold=0.9, agents={"academic", "redirect"})
+    cache.store("academic", "v1", "q", _unit(1, 0), "answer")
+    assert cache.lookup("redirect", "v1", "q", _unit(1, 0)) is None
+    assert cache.lookup("academic", "v2", "q", _unit(1, 0)) is None
+
+
+def test_index_change_clears_the_cache():
+    cache = SemanticCache(threshold=0.9, agents={"academic"})
+    cache.sync_index_version("a")
+    cache.store("academic", "v1", "q", _unit(1, 0), "answer")
+    cache.sync_index_version("b")
+    assert cache.lookup("academic", "v1", "q", _unit(1, 0)) is None
+
+
+def test_only_allowlisted_agents_are_cached():
+    cache = SemanticCache(agents={"academic", "redirect"})
+    assert cache.applies_to(AgentType.ACADEMIC)
+    assert cache.applies_to("redirect")
+    assert not cache.applies_to(AgentType.EMAIL)
+    assert not cache.applies_to(AgentType.PLANNER)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+# The session document holds every agent's state, and the agents need the retrieval stack
+pytest.importorskip("langchain_community")
+
+import redis  # noqa: E402
+
+from models.classification import AgentType  # noqa: E402
+from services.session_state import (  # noqa: E402
+    InMemoryStateBackend,
+    RedisStateBackend,
+    SessionStateUnavailable,
+    restore_session,
+    serialize_session,
+)
+
+
+def test_session_round_trips_through_json():
+    context = restore_session(None)
+    context["active_agent"] = AgentType.EMAIL
+    context["history"].add_turn("Who is my advisor?", "Dr. Smith")
+    context["history"].summary = "Student asked about advisors."
+    context["agents"][AgentType.EMAIL].collected_inputs = {"recipient": "Dr. Smith"}
+    context["agents"][AgentType.EMAIL].waiting_for_input = True
+
+    stored = json.loads(json.dumps(serialize_session(context)))
+    restored = restore_session(stored)
+    assert restored["active_agent"] == AgentType.EMAIL
+    assert restored["history"].summary == "Student asked about advisors."
+    assert [turn["content"] for turn in restored["history"].turns] == ["Who is my advisor?", "Dr. Smith"]
+    assert restored["agents"][AgentType.EMAIL].collected_inputs == {"recipient": "Dr. Smith"}
+    assert restored["agents"][AgentType.EMAIL].waiting_for_input
+
+
+def test_memory_backend_is_bounded_and_cleaned_up():
+    async def scenario():
+        backend = InMemoryStateBackend(max_sessions=2, ttl=60)
+        for session in ("a", "b", "c"):
+            await backend.save(session, {"revision": 1})
+        assert await backend.load("a") is None
+        await backend.delete("b")
+        assert await backend.load("b") is None
+        assert await backend.load("c") == {"revision": 1}
+
+        expiring = InMemoryStateBackend(ttl=0.01)
+        await expiring.save("a", {"revision": 1})
+        time.sleep(0.02)
+        assert await expiring.load("a") is None
+
+    asyncio.run(scenario())
+
+
+class DownRedis:
+    def get(self, key):
+        raise redis.TimeoutError("Timeout reading from socket")
+
+    def set(self, key, value, ex=None):
+        raise redis.ConnectionError("Connection refused")
+
+    def delete(self, key):
+        raise redis.ConnectionError("Connection refused")
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_redis_outage_is_an_error_not_a_new_session():
+    backend = RedisStateBackend(client=DownRedis())
+    with pytest.raises(SessionStateUnavailable):
+        asyncio.run(backend.load("s1"))
+    with pytest.raises(SessionStateUnavailable):
+        asyncio.run(backend.save("s1", {"revision": 1}))
+
+
+def test_redis_backend_round_trip():
+    backend = RedisStateBackend(client=DictRedis())
+
+    async def scenario():
+        assert await backend.load("s1") is None
+        await backend.save("s1", {"revision": 3})
+        assert await backend.load("s1") == {"revision": 3}
+        await backend.delete("s1")
+        assert await backend.load("s1") is None
+
+    asyncio.run(scenario())
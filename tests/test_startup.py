@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import services.startup as startup_module
+from services.startup import ComponentState, StartupOrchestrator
+
+
+def sleeper(seconds):
+    return lambda: time.sleep(seconds)
+
+
+def failing():
+    raise RuntimeError("no GPU")
+
+
+def test_components_load_in_parallel():
+    startup = StartupOrchestrator()
+    for name in ("embeddings", "classifier", "tokenizer"):
+        startup.register(name, sleeper(0.2))
+    assert not startup.ready
+    assert startup.loading() == ["embeddings", "classifier", "tokenizer"]
+
+    started = time.perf_counter()
+    assert asyncio.run(startup.wait_ready(timeout=2))
+    # Three 0.2s loads overlap instead of taking 0.6s
+    assert time.perf_counter() - started < 0.5
+    assert startup.snapshot()["components"]["tokenizer"]["state"] == ComponentState.READY.value
+
+
+def test_optional_failure_does_not_block_readiness():
+    startup = StartupOrchestrator()
+    startup.register("vector_db", sleeper(0))
+    startup.register("tokenizer", failing, required=False)
+    assert asyncio.run(startup.wait_ready(timeout=2))
+    startup._components["tokenizer"].future.result()
+    snapshot = startup.snapshot()
+    assert snapshot["ready"]
+    assert snapshot["components"]["tokenizer"]["state"] == "failed"
+    assert snapshot["components"]["tokenizer"]["error"] == "no GPU"
+
+
+def test_required_failure_or_slow_load_is_not_ready():
+    startup = StartupOrchestrator()
+    startup.register("classifier", failing)
+    assert not asyncio.run(startup.wait_ready(timeout=2))
+
+    slow = StartupOrchestrator()
+    slow.register("vector_db", sleeper(0.5))
+    started = time.perf_counter()
+    assert not asyncio.run(slow.wait_ready(timeout=0.05))
+    assert time.perf_counter() - started < 0.3
+    assert slow.loading() == ["vector_db"]
+    assert asyncio.run(slow.wait_ready(timeout=2))
+
+
+def test_required_failure_is_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(startup_module, "STARTUP_RETRY_INTERVAL", 0.1)
+    attempts = []
+
+    def flaky():
+        attempts.append(time.perf_counter())
+        if len(attempts) == 1:
+            raise RuntimeError("index not mounted yet")
+
+    startup = StartupOrchestrator()
+    startup.register("vector_db", flaky)
+    assert not asyncio.run(startup.wait_ready(timeout=2))
+    assert startup.failed() == ["vector_db"]
+
+    # Inside the backoff nothing is reloaded and callers don't wait
+    started = time.perf_counter()
+    assert not asyncio.run(startup.wait_ready(timeout=2))
+    assert time.perf_counter() - started < 0.05
+    assert len(attempts) == 1
+
+    time.sleep(0.15)
+    assert asyncio.run(startup.wait_ready(timeout=2))
+    assert len(attempts) == 2
+    assert startup.failed() == []
+    assert startup.snapshot()["components"]["vector_db"]["error"] is None
@@ -0,0 +1,61 @@
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import utils.tokenizer as tokenizer
+
+
+class WordTokenizer:
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+
+@pytest.fixture
+def fake_transformers(monkeypatch):
+    calls = []
+
+    def from_pretrained(model_id):
+        calls.append(model_id)
+        time.sleep(0.05)
+        return WordTokenizer()
+
+    monkeypatch.setitem(sys.modules, "transformers", SimpleNamespace(
+        AutoTokenizer=SimpleNamespace(from_pretrained=from_pretrained)
+    ))
+    monkeypatch.setattr(tokenizer, "_tokenizer", None)
+    monkeypatch.setattr(tokenizer, "_loaded", False)
+    return calls
+
+
+def test_character_estimate_until_the_tokenizer_has_loaded(fake_transformers):
+    text = "one two three four five six seven eight"
+    assert tokenizer.get_tokenizer() is None
+    assert tokenizer.count_tokens(text) == len(text) // 4
+    tokenizer.load_tokenizer()
+    assert tokenizer.count_tokens(text) == 8
+
+
+def test_concurrent_loads_build_the_tokenizer_once(fake_transformers):
+    threads = [threading.Thread(target=tokenizer.load_tokenizer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fake_transformers) == 1
+    assert isinstance(tokenizer.get_tokenizer(), WordTokenizer)
+
+
+def test_failed_load_keeps_the_estimate(monkeypatch):
+    def from_pretrained(model_id):
+        raise OSError("offline")
+
+    monkeypatch.setitem(sys.modules, "transformers", SimpleNamespace(
+        AutoTokenizer=SimpleNamespace(from_pretrained=from_pretrained)
+    ))
+    monkeypatch.setattr(tokenizer, "_tokenizer", None)
+    monkeypatch.setattr(tokenizer, "_loaded", False)
+    assert tokenizer.load_tokenizer() is None
+    assert tokenizer.count_tokens("abcdefgh") == 2
@@ -0,0 +1,45 @@
+import io
+import logging
+
+import pytest
+
+import config.settings  # noqa: F401  (configures the root logger on import, as in the app)
+from utils.tracing import get_request_id, install_request_id_logging, span, start_trace
+
+FORMAT = "%(levelname)s [%(request_id)s] %(message)s"
+
+
+@pytest.fixture
+def root_logging():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_spans_share_the_trace_id_of_their_root():
+    with start_trace("message") as root:
+        with span("retrieve") as child:
+            assert child.trace_id == root.trace_id
+            assert child.parent_id == root.span_id
+            assert get_request_id() == root.trace_id
+    assert get_request_id() is None
+
+
+def test_app_log_format_applies_after_settings_configured_logging(root_logging):
+    # Same call as app.py; without force it would be ignored
+    logging.basicConfig(level=logging.INFO, format=FORMAT, force=True)
+    install_request_id_logging()
+    stream = io.StringIO()
+    logging.getLogger().handlers[0].setStream(stream)
+
+    log = logging.getLogger("tests.tracing")
+    log.info("outside")
+    with start_trace("message") as root:
+        log.info("inside")
+    lines = stream.getvalue().splitlines()
+    assert lines == ["INFO [-] outside", f"INFO [{root.trace_id}] inside"]
@@ -0,0 +1,99 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("faiss")
+
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+import utils.vector_db as vector_db  # noqa: E402
+from utils.vector_db import VectorDBManager  # noqa: E402
+
+TEXTS = [
+    "Fall registration opens in April.",
+    "The financial aid office is in the Eagle Student Services Center.",
+    "Graduate applications are due January 15.",
+]
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic unit vectors; counts how many texts were embedded"""
+
+    def __init__(self):
+        self.embedded = 0
+
+    def _vector(self, text):
+        seed = int(hashlib.md5(text.strip().lower().encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).normal(size=16).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    path = str(tmp_path / "db_faiss")
+    FAISS.from_texts(TEXTS, HashEmbeddings()).save_local(path)
+    embeddings = HashEmbeddings()
+    monkeypatch.setattr(vector_db, "make_embeddings", lambda backend=None: embeddings)
+    return VectorDBManager(db_path=path), embeddings, path
+
+
+def test_repeated_queries_hit_the_embedding_and_result_caches(manager):
+    db, embeddings, _ = manager
+    first = db.search_batch([TEXTS[1], "  " + TEXTS[1].upper()], k=2)
+    assert first[0] == first[1]
+    assert first[0][0][0] == TEXTS[1]
+    # Case and spacing variants share one embedding
+    assert embeddings.embedded == 1
+
+    assert db.get_scored_documents(TEXTS[1], k=2) == first[0]
+    stats = db.cache_stats()
+    assert embeddings.embedded == 1
+    assert stats["result_hits"] >= 1
+
+
+def test_rebuilt_index_is_reloaded_and_caches_reset(manager):
+    db, embeddings, path = manager
+    db.search_batch([TEXTS[0]], k=1)
+    version = db.index_version
+    assert not db.reload_if_changed()
+
+    FAISS.from_texts(TEXTS + ["Spring break is in March."], HashEmbeddings()).save_local(path)
+    assert db.reload_if_changed()
+    assert db.index_version != version
+    assert len(db.query_embeddings) == 0 and len(db.search_results) == 0
+    assert db.search_batch(["Spring break is in March."], k=1)[0][0][0] == "Spring break is in March."
+
+
+def test_failed_load_is_not_retried_on_every_call(monkeypatch):
+    loads = []
+
+    def broken_manager():
+        loads.append(1)
+        raise FileNotFoundError("db_faiss missing")
+
+    monkeypatch.setattr(vector_db, "VectorDBManager", broken_manager)
+    monkeypatch.setattr(vector_db, "_vector_db", None)
+    monkeypatch.setattr(vector_db, "_vector_db_failure", None)
+    monkeypatch.setattr(vector_db, "STARTUP_RETRY_INTERVAL", 60)
+
+    with pytest.raises(FileNotFoundError):
+        vector_db.get_vector_db()
+    for _ in range(3):
+        with pytest.raises(RuntimeError, match="db_faiss missing"):
+            vector_db.get_vector_db()
+    assert loads == [1]
+
+    monkeypatch.setattr(vector_db, "STARTUP_RETRY_INTERVAL", 0)
+    with pytest.raises(FileNotFoundError):
+        vector_db.get_vector_db()
+    assert loads == [1, 1]